@@ -0,0 +1,3 @@
+from app.a2a.agent_card import AgentCard, AgentSkill
+from app.a2a.protocol import A2AProtocol, A2AProtocolError
+from app.a2a.transport import HTTPTransport
@@ -0,0 +1,54 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List
+
+
+# ai code begin && nums:48
+@dataclass
+class AgentSkill:
+    """Agent能力（可处理的任务类型）描述"""
+    id: str
+    name: str
+    description: str = ""
+    tags: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AgentCard:
+    """
+    Agent名片
+
+    描述Agent的名称、访问地址、支持的任务类型和传输能力，
+    其他Agent通过 /.well-known/agent.json 获取名片后决定如何调用。
+
+    Args:
+        name: Agent名称
+        description: Agent说明
+        url: Agent服务地址
+        version: 版本号
+        skills: 支持的任务类型列表
+        encodings: 支持的载荷编码（json / msgpack）
+        supports_batch: 是否支持一次请求携带多个任务
+    """
+    name: str
+    description: str = ""
+    url: str = ""
+    version: str = "0.1.0"
+    skills: List[AgentSkill] = field(default_factory=list)
+    encodings: List[str] = field(default_factory=lambda: ["json"])
+    supports_batch: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（用于JSON序列化）"""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentCard":
+        """从字典构建名片，忽略未知字段以兼容新版本"""
+        skills = [AgentSkill(**skill) for skill in data.get("skills", [])]
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__ and k != "skills"}
+        return cls(skills=skills, **known)
+
+    def has_skill(self, skill_id: str) -> bool:
+        """是否支持指定任务类型"""
+        return any(skill.id == skill_id for skill in self.skills)
+# ai code end
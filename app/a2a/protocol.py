@@ -0,0 +1,180 @@
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+
+# msgpack为可选依赖：优先使用ormsgpack，其次msgpack，都没有时只支持JSON
+try:
+    import ormsgpack as _msgpack
+
+    def _msgpack_dumps(obj: Any) -> bytes:
+        return _msgpack.packb(obj)
+
+    def _msgpack_loads(data: bytes) -> Any:
+        return _msgpack.unpackb(data)
+except ImportError:
+    try:
+        import msgpack as _msgpack
+
+        def _msgpack_dumps(obj: Any) -> bytes:
+            return _msgpack.packb(obj, use_bin_type=True)
+
+        def _msgpack_loads(data: bytes) -> Any:
+            return _msgpack.unpackb(data, raw=False)
+    except ImportError:
+        _msgpack = None
+
+
+# ai code begin && nums:152
+class A2AProtocolError(ValueError):
+    """A2A协议帧格式错误"""
+
+
+class A2AProtocol:
+    """
+    Agent间通信协议
+
+    定义任务帧的结构和载荷编码：
+    - 单任务帧：{"version", "task": {...}}
+    - 批量帧：{"version", "tasks": [...]}，一次HTTP请求携带多个任务
+    - 载荷编码：JSON（orjson）或msgpack（二进制，体积更小、编解码更快）
+    """
+
+    VERSION = "1"
+    # 截止时间头：剩余可用的毫秒数，服务端据此放弃已经来不及的任务
+    DEADLINE_HEADER = "X-A2A-Deadline-Ms"
+    CONTENT_TYPES = {
+        "json": "application/json",
+        "msgpack": "application/msgpack",
+    }
+
+    @classmethod
+    def msgpack_available(cls) -> bool:
+        """当前环境是否可用msgpack编码"""
+        return _msgpack is not None
+
+    @classmethod
+    def supported_encodings(cls) -> List[str]:
+        """当前环境支持的载荷编码"""
+        return ["msgpack", "json"] if cls.msgpack_available() else ["json"]
+
+    @classmethod
+    def content_type(cls, encoding: str) -> str:
+        """编码对应的Content-Type"""
+        if encoding not in cls.CONTENT_TYPES:
+            raise A2AProtocolError(f"不支持的编码: {encoding}")
+        return cls.CONTENT_TYPES[encoding]
+
+    @classmethod
+    def encoding_from_content_type(cls, content_type: Optional[str]) -> str:
+        """根据Content-Type判断编码，未知类型按JSON处理"""
+        if content_type and "msgpack" in content_type:
+            return "msgpack"
+        return "json"
+
+    @classmethod
+    def encode(cls, payload: Any, encoding: str = "json") -> bytes:
+        """
+        编码载荷
+
+        Args:
+            payload: 可序列化的对象
+            encoding: json或msgpack
+
+        Returns:
+            bytes: 编码后的字节
+        """
+        if encoding == "msgpack":
+            if _msgpack is None:
+                raise A2AProtocolError("未安装msgpack（pip install ormsgpack）")
+            return _msgpack_dumps(payload)
+        if encoding == "json":
+            return orjson.dumps(payload)
+        raise A2AProtocolError(f"不支持的编码: {encoding}")
+
+    @classmethod
+    def decode(cls, data: bytes, encoding: str = "json") -> Any:
+        """解码载荷"""
+        try:
+            if encoding == "msgpack":
+                if _msgpack is None:
+                    raise A2AProtocolError("未安装msgpack（pip install ormsgpack）")
+                return _msgpack_loads(data)
+            return orjson.loads(data)
+        except A2AProtocolError:
+            raise
+        except Exception as e:
+            raise A2AProtocolError(f"载荷解码失败: {e}")
+
+    @classmethod
+    def build_task(
+        cls,
+        query: str,
+        task_type: str = "risk_check",
+        parameters: Optional[Dict[str, Any]] = None,
+        task_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        构建任务（字段与AgentTask一致）
+
+        Args:
+            query: 查询文本
+            task_type: 任务类型
+            parameters: 任务参数
+            task_id: 任务ID，为空时自动生成
+
+        Returns:
+            Dict: 任务字典
+        """
+        return {
+            "task_id": task_id or uuid.uuid4().hex,
+            "task_type": task_type,
+            "query": query,
+            "parameters": parameters or {}
+        }
+
+    @classmethod
+    def build_frame(cls, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """构建请求帧：单个任务使用task字段，多个任务使用tasks字段"""
+        if len(tasks) == 1:
+            return {"version": cls.VERSION, "task": tasks[0]}
+        return {"version": cls.VERSION, "tasks": tasks}
+
+    @classmethod
+    def parse_frame(cls, frame: Any) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        解析请求帧
+
+        Args:
+            frame: 解码后的请求帧
+
+        Returns:
+            Tuple[List[Dict], bool]: (任务列表, 是否为批量帧)
+        """
+        if not isinstance(frame, dict):
+            raise A2AProtocolError("请求帧必须是对象")
+        if "tasks" in frame:
+            tasks = frame["tasks"]
+            if not isinstance(tasks, list):
+                raise A2AProtocolError("tasks必须是列表")
+            return tasks, True
+        if "task" in frame:
+            return [frame["task"]], False
+        raise A2AProtocolError("请求帧缺少task或tasks字段")
+
+    @classmethod
+    def build_response_frame(cls, responses: List[Dict[str, Any]], batch: bool) -> Dict[str, Any]:
+        """构建响应帧，结构与请求帧对应"""
+        if batch:
+            return {"version": cls.VERSION, "responses": responses}
+        return {"version": cls.VERSION, "response": responses[0]}
+
+    @classmethod
+    def parse_response_frame(cls, frame: Any) -> List[Dict[str, Any]]:
+        """解析响应帧，统一返回响应列表"""
+        if isinstance(frame, dict):
+            if "responses" in frame:
+                return frame["responses"]
+            if "response" in frame:
+                return [frame["response"]]
+        raise A2AProtocolError("响应帧缺少response或responses字段")
+# ai code end
@@ -0,0 +1,203 @@
+import time
+from typing import Any, Dict, List, Optional
+import httpx
+from app.a2a.agent_card import AgentCard
+from app.a2a.protocol import A2AProtocol
+from app.services.single_flight import SingleFlight
+
+
+# ai code begin && nums:193
+class HTTPTransport:
+    """
+    Agent间HTTP传输
+
+    - 所有调用共享一个长连接池（keep-alive），避免每一跳重新建立TCP/TLS连接
+    - 支持msgpack二进制载荷：首次联系对端时获取并缓存其名片，对端声明支持时自动使用
+    - 支持把多个任务打包进一个请求帧
+    - 每次调用都带截止时间，超时立即返回并把剩余时间通过请求头告知对端
+    """
+
+    TASK_PATH = "/a2a/tasks"
+    CARD_PATH = "/.well-known/agent.json"
+    # 告知对端的截止时间占本地超时的比例
+    DEADLINE_RATIO = 0.9
+    # 首次协商时获取名片最多占用本次调用超时的比例
+    CARD_TIMEOUT_RATIO = 0.3
+    # 获取名片失败后间隔多少秒再重新协商（期间按JSON发送）
+    CARD_RETRY_SECONDS = 60.0
+
+    def __init__(
+        self,
+        encoding: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        default_timeout: float = 10.0
+    ):
+        """
+        初始化传输层
+
+        Args:
+            encoding: 载荷编码（json / msgpack），为None时按对端名片和本地环境自动选择
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 连接池保持的空闲长连接数
+            keepalive_expiry: 空闲长连接保留秒数
+            default_timeout: 未指定截止时间时的默认超时秒数
+        """
+        self.encoding = encoding
+        self.default_timeout = default_timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cards: Dict[str, AgentCard] = {}
+        # 对端地址 -> 最近一次获取名片失败的时间
+        self._card_failures: Dict[str, float] = {}
+        # 并发的首次调用只请求一次名片
+        self._card_flight = SingleFlight()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取共享的异步HTTP客户端（首次调用时创建连接池）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self._limits, timeout=self.default_timeout)
+        return self._client
+
+    async def get_agent_card(self, agent_url: str, timeout: Optional[float] = None) -> AgentCard:
+        """
+        获取对端Agent名片（结果缓存，同一对端只请求一次）
+
+        Args:
+            agent_url: 对端Agent服务地址
+            timeout: 超时秒数
+
+        Returns:
+            AgentCard: 对端名片
+        """
+        base_url = agent_url.rstrip("/")
+        if base_url not in self._cards:
+            response = await self._get_client().get(
+                base_url + self.CARD_PATH,
+                timeout=timeout or self.default_timeout
+            )
+            response.raise_for_status()
+            self._cards[base_url] = AgentCard.from_dict(response.json())
+        return self._cards[base_url]
+
+    async def _negotiate_encoding(self, agent_url: str, timeout: float) -> str:
+        """
+        选择载荷编码：显式指定 > 对端名片声明且本地可用的msgpack > JSON
+
+        首次联系对端时获取并缓存名片；获取失败（对端未提供名片、网络错误）时
+        本次按JSON发送，CARD_RETRY_SECONDS秒后再重新尝试。
+
+        Args:
+            agent_url: 对端Agent服务地址
+            timeout: 本次调用的超时秒数，获取名片最多占用其中CARD_TIMEOUT_RATIO
+
+        Returns:
+            str: json或msgpack
+        """
+        if self.encoding:
+            return self.encoding
+        if not A2AProtocol.msgpack_available():
+            return "json"
+        base_url = agent_url.rstrip("/")
+        card = self._cards.get(base_url)
+        failed_at = self._card_failures.get(base_url)
+        if card is None and (failed_at is None or time.monotonic() - failed_at >= self.CARD_RETRY_SECONDS):
+            try:
+                card = await self._card_flight.do(
+                    base_url,
+                    lambda: self.get_agent_card(base_url, timeout * self.CARD_TIMEOUT_RATIO)
+                )
+                self._card_failures.pop(base_url, None)
+            except (httpx.HTTPError, ValueError, TypeError):
+                self._card_failures[base_url] = time.monotonic()
+        return "msgpack" if card and "msgpack" in card.encodings else "json"
+
+    async def send_task(
+        self,
+        agent_url: str,
+        task: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        发送单个任务
+
+        Args:
+            agent_url: 对端Agent服务地址
+            task: 任务字典（可用A2AProtocol.build_task构建）
+            timeout: 本次调用的截止时间（秒）
+
+        Returns:
+            Dict: 任务响应（字段与AgentResponse一致）
+        """
+        responses = await self.send_batch(agent_url, [task], timeout)
+        return responses[0]
+
+    async def send_batch(
+        self,
+        agent_url: str,
+        tasks: List[Dict[str, Any]],
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        把多个任务打包进一个请求帧发送
+
+        Args:
+            agent_url: 对端Agent服务地址
+            tasks: 任务列表
+            timeout: 本次调用的截止时间（秒），整批共用
+
+        Returns:
+            List[Dict]: 与tasks一一对应的响应列表；超时或失败时每个任务返回failed/timeout状态
+        """
+        if not tasks:
+            return []
+
+        timeout = timeout or self.default_timeout
+        start = time.perf_counter()
+        encoding = await self._negotiate_encoding(agent_url, timeout)
+        content_type = A2AProtocol.content_type(encoding)
+        # 协商名片用掉的时间计入本次截止时间
+        remaining = timeout - (time.perf_counter() - start)
+        try:
+            response = await self._get_client().post(
+                agent_url.rstrip("/") + self.TASK_PATH,
+                content=A2AProtocol.encode(A2AProtocol.build_frame(tasks), encoding),
+                headers={
+                    "Content-Type": content_type,
+                    "Accept": content_type,
+                    # 预留一部分时间给网络往返，保证对端超时的任务能以部分结果返回
+                    A2AProtocol.DEADLINE_HEADER: str(int(remaining * 1000 * self.DEADLINE_RATIO))
+                },
+                timeout=remaining
+            )
+            response.raise_for_status()
+            frame = A2AProtocol.decode(
+                response.content,
+                A2AProtocol.encoding_from_content_type(response.headers.get("content-type"))
+            )
+            return A2AProtocol.parse_response_frame(frame)
+        except httpx.TimeoutException:
+            return self._failed_responses(tasks, "timeout", f"调用超时（{timeout}s）", start)
+        except (httpx.HTTPError, ValueError) as e:
+            return self._failed_responses(tasks, "failed", str(e), start)
+
+    @staticmethod
+    def _failed_responses(tasks: List[Dict[str, Any]], status: str, error: str, start: float) -> List[Dict[str, Any]]:
+        """为整批任务生成失败响应"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return [
+            {"task_id": task.get("task_id", ""), "status": status, "result": None, "error": error, "elapsed_ms": elapsed_ms}
+            for task in tasks
+        ]
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+# ai code end
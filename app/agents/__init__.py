@@ -0,0 +1,2 @@
+from app.agents.base_agent import AgentTool, BaseAgent, ToolResult
+from app.agents.risk_search_agent import RiskSearchAgent
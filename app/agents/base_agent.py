@@ -0,0 +1,211 @@
+import abc
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.a2a.agent_card import AgentCard, AgentSkill
+
+
+# ai code begin && nums:200
+# 工具函数签名：(query, parameters) -> 结果
+ToolFunc = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class AgentTool:
+    """
+    Agent可调用的工具（一次独立的查询）
+
+    Args:
+        name: 工具名称，同一Agent内唯一
+        func: 异步工具函数
+        description: 工具说明
+        timeout: 单个工具的超时秒数，为None时只受整体截止时间约束
+    """
+    name: str
+    func: ToolFunc
+    description: str = ""
+    timeout: Optional[float] = None
+
+
+@dataclass
+class ToolResult:
+    """单个工具的执行结果"""
+    name: str
+    status: str
+    result: Any = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "elapsed_ms": self.elapsed_ms
+        }
+
+
+class BaseAgent(abc.ABC):
+    """
+    Agent基类
+
+    子类注册若干相互独立的工具，run_tools并发执行它们，所有工具共享一个截止时间：
+    - 截止时间内完成的工具返回success（或failed）
+    - 到达截止时间仍未完成的工具被取消并标记为timeout，已完成的结果照常返回
+    因此整体耗时取决于最慢的那个工具（且不超过截止时间），而不是所有工具耗时之和。
+    """
+
+    name: str = "BaseAgent"
+    description: str = ""
+    version: str = "0.1.0"
+    # 整体截止时间（秒）
+    default_timeout: float = 5.0
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        """
+        初始化Agent
+
+        Args:
+            default_timeout: 整体截止时间（秒），为None时使用类属性default_timeout
+        """
+        if default_timeout is not None:
+            self.default_timeout = default_timeout
+        self._tools: Dict[str, AgentTool] = {}
+        self.register_tools()
+
+    def register_tools(self):
+        """注册工具，由子类实现"""
+
+    def register_tool(self, tool: AgentTool):
+        """注册一个工具，同名工具会被覆盖"""
+        self._tools[tool.name] = tool
+
+    def list_tools(self) -> List[str]:
+        """返回已注册的工具名称"""
+        return list(self._tools.keys())
+
+    def get_skills(self) -> List[AgentSkill]:
+        """Agent支持的任务类型，由子类实现"""
+        return []
+
+    def build_agent_card(self, url: str = "") -> AgentCard:
+        """构建Agent名片"""
+        return AgentCard(
+            name=self.name,
+            description=self.description,
+            url=url,
+            version=self.version,
+            skills=self.get_skills()
+        )
+
+    def get_agent_card(self) -> Dict[str, Any]:
+        """获取Agent名片（字典形式）"""
+        return self.build_agent_card().to_dict()
+
+    async def _run_tool(self, tool: AgentTool, query: str, parameters: Dict[str, Any]) -> ToolResult:
+        """执行单个工具，捕获异常和单工具超时"""
+        start = time.perf_counter()
+        try:
+            if tool.timeout is not None:
+                result = await asyncio.wait_for(tool.func(query, parameters), tool.timeout)
+            else:
+                result = await tool.func(query, parameters)
+            status, error = "success", None
+        except asyncio.TimeoutError:
+            result, status, error = None, "timeout", f"超过工具超时（{tool.timeout}s）"
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        return ToolResult(tool.name, status, result, error, (time.perf_counter() - start) * 1000)
+
+    async def run_tools(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        tool_names: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, ToolResult]:
+        """
+        在共享截止时间内并发执行多个工具
+
+        Args:
+            query: 查询文本
+            parameters: 传给每个工具的参数
+            tool_names: 需要执行的工具，默认为全部已注册工具
+            timeout: 整体截止时间（秒），默认为default_timeout
+
+        Returns:
+            Dict[str, ToolResult]: 工具名 -> 执行结果，顺序与tool_names一致
+        """
+        names = tool_names or self.list_tools()
+        unknown = [name for name in names if name not in self._tools]
+        if unknown:
+            raise ValueError(f"未注册的工具: {unknown}")
+
+        timeout = timeout if timeout is not None else self.default_timeout
+        parameters = parameters or {}
+        start = time.perf_counter()
+        tasks = {
+            name: asyncio.create_task(self._run_tool(self._tools[name], query, parameters))
+            for name in names
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # 等待取消完成，避免任务在事件循环中残留
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        results = {}
+        for name, task in tasks.items():
+            if task in done:
+                results[name] = task.result()
+            else:
+                results[name] = ToolResult(name, "timeout", None, f"超过截止时间（{timeout}s）", elapsed_ms)
+        return results
+
+    @staticmethod
+    def overall_status(results: Dict[str, ToolResult]) -> str:
+        """
+        根据各工具的结果计算整体状态
+
+        Returns:
+            str: 全部成功为success，部分成功为partial，全部失败为failed
+        """
+        succeeded = sum(1 for result in results.values() if result.status == "success")
+        if succeeded == len(results):
+            return "success"
+        return "partial" if succeeded else "failed"
+
+    @abc.abstractmethod
+    async def execute(self, query: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """执行一次任务并返回结果，由子类实现"""
+
+    async def handle_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        处理一个Agent任务
+
+        Args:
+            task: 任务字典（字段与AgentTask一致）
+
+        Returns:
+            Dict: 字段与AgentResponse一致的响应字典；部分工具超时或失败时status为partial
+        """
+        start = time.perf_counter()
+        task_id = task.get("task_id") or uuid.uuid4().hex
+        try:
+            result = await self.execute(task["query"], task.get("parameters") or {})
+            status, error = result.pop("status", "success"), None
+        except ValueError as e:
+            result, status, error = None, "failed", str(e)
+        return {
+            "task_id": task_id,
+            "status": status,
+            "result": result,
+            "error": error,
+            "elapsed_ms": (time.perf_counter() - start) * 1000
+        }
+# ai code end
@@ -0,0 +1,218 @@
+import asyncio
+import math
+import re
+from typing import Any, Dict, List, Optional
+from app.a2a.agent_card import AgentSkill
+from app.agents.base_agent import AgentTool, BaseAgent
+from app.services.vector_service import VectorService
+from base.config import get_config
+
+
+# ai code begin && nums:206
+# FDA产品代码为3位大写字母，例如"DXN"
+FDA_PRODUCT_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+# 查询文本中可能是产品代码的词（也会匹配LED、USB等缩写，只有库中存在的代码才算命中）
+FDA_PRODUCT_CODE_CANDIDATE = re.compile(r"\b[A-Z]{3}\b")
+# 一次精确查找的产品代码数上限
+MAX_PRODUCT_CODES = 20
+
+
+class RiskSearchAgent(BaseAgent):
+    """
+    商品风险检索Agent
+
+    一次风险检查包含三个相互独立的查询，并发执行、共享截止时间：
+    - regulations：亚马逊法规库检索
+    - product_history：良购历史产品库检索
+    - fda_devices：FDA医疗器械查询（向量检索，查询中包含库中存在的产品代码时精确命中的器械排在最前）
+
+    三个检索使用同一条查询文本，向量化经过共享的微批调度器，只计算一次。
+    """
+
+    name = "RiskSearchAgent"
+    description = "商品风险检索：并发查询法规库、历史产品库和FDA医疗器械库，超时的来源返回部分结果"
+    TASK_TYPE = "risk_search"
+
+    # 工具名 -> 集合名所在的配置项
+    TOOL_COLLECTION_SETTINGS = {
+        "regulations": "REGULATION_COLLECTION",
+        "product_history": "PRODUCT_COLLECTION",
+        "fda_devices": "FDA_COLLECTION"
+    }
+
+    # 显式指定的截止时间，为None时跟随配置AGENT_TOOL_TIMEOUT（热更新后立即生效）
+    _timeout: Optional[float] = None
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        config = get_config()
+        # 工具名 -> 集合名
+        self.tool_collections = {
+            tool_name: getattr(config, setting) for tool_name, setting in self.TOOL_COLLECTION_SETTINGS.items()
+        }
+        # 集合检索服务在首次使用时创建，初始化Agent不连接Milvus
+        self._services: Dict[str, VectorService] = {}
+        super().__init__(default_timeout)
+
+    @property
+    def default_timeout(self) -> float:
+        """整体截止时间（秒）"""
+        return self._timeout if self._timeout is not None else get_config().AGENT_TOOL_TIMEOUT
+
+    @default_timeout.setter
+    def default_timeout(self, value: float):
+        self._timeout = value
+
+    @staticmethod
+    def _top_k(parameters: Dict[str, Any]) -> int:
+        """每个来源返回的结果数量，未指定时使用配置AGENT_TOP_K"""
+        return parameters.get("top_k") or get_config().AGENT_TOP_K
+
+    @staticmethod
+    def _timeout(parameters: Dict[str, Any]) -> Optional[float]:
+        """
+        整体截止时间（秒），未指定时返回None（使用default_timeout）
+
+        Raises:
+            ValueError: timeout不是正数
+        """
+        timeout = parameters.get("timeout")
+        if timeout is None:
+            return None
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not math.isfinite(timeout) or timeout <= 0:
+            raise ValueError(f"timeout必须是大于0的秒数，实际为{timeout!r}")
+        return float(timeout)
+
+    @staticmethod
+    def _sources(parameters: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        需要查询的来源，未指定时返回None（查询全部来源）
+
+        Raises:
+            ValueError: sources不是字符串列表
+        """
+        sources = parameters.get("sources")
+        if sources is None:
+            return None
+        if not isinstance(sources, list) or not all(isinstance(name, str) for name in sources):
+            raise ValueError(f"sources必须是来源名称的列表，实际为{sources!r}")
+        return sources
+
+    def register_tools(self):
+        """注册三个风险检查工具"""
+        self.register_tool(AgentTool("regulations", self._search_regulations, "亚马逊法规库检索"))
+        self.register_tool(AgentTool("product_history", self._search_product_history, "良购历史产品库检索"))
+        self.register_tool(AgentTool("fda_devices", self._lookup_fda_devices, "FDA产品代码查询或器械库检索"))
+
+    def get_skills(self) -> List[AgentSkill]:
+        return [
+            AgentSkill(
+                id=self.TASK_TYPE,
+                name="商品风险检查",
+                description="并发查询法规库、历史产品库和FDA医疗器械库",
+                tags=self.list_tools()
+            )
+        ]
+
+    async def _get_service(self, tool_name: str) -> VectorService:
+        """获取工具对应集合的检索服务（首次访问在线程池中建立连接）"""
+        service = self._services.get(tool_name)
+        if service is None:
+            service = await asyncio.to_thread(VectorService, self.tool_collections[tool_name])
+            self._services[tool_name] = service
+        return service
+
+    async def _vector_search(self, tool_name: str, query: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """在工具对应的集合中做向量检索"""
+        service = await self._get_service(tool_name)
+        search_params = (parameters.get("search_params") or {}).get(tool_name)
+        results = await service.search_with_scores_async(query, self._top_k(parameters), search_params)
+        return service.format_results_with_scores(results)
+
+    async def _search_regulations(self, query: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """亚马逊法规库检索"""
+        return await self._vector_search("regulations", query, parameters)
+
+    async def _search_product_history(self, query: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """良购历史产品库检索"""
+        return await self._vector_search("product_history", query, parameters)
+
+    @staticmethod
+    def _product_codes(query: str, parameters: Dict[str, Any]) -> List[str]:
+        """
+        需要精确查找的FDA产品代码：优先取参数product_codes，否则从查询文本中提取候选
+
+        Raises:
+            ValueError: product_codes不是列表、数量超过上限或含有不是3位大写字母的代码
+        """
+        codes = parameters.get("product_codes")
+        if codes is None:
+            return list(dict.fromkeys(FDA_PRODUCT_CODE_CANDIDATE.findall(query)))[:MAX_PRODUCT_CODES]
+        if not isinstance(codes, list) or len(codes) > MAX_PRODUCT_CODES:
+            raise ValueError(f"product_codes必须是不超过{MAX_PRODUCT_CODES}个产品代码的列表")
+        invalid = [code for code in codes if not isinstance(code, str) or not FDA_PRODUCT_CODE_PATTERN.match(code)]
+        if invalid:
+            raise ValueError(f"无效的FDA产品代码（应为3位大写字母）: {invalid[:5]}")
+        return list(dict.fromkeys(codes))
+
+    async def _lookup_fda_devices(self, query: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        FDA器械查询：向量检索，同时按产品代码精确查找
+
+        只有库中存在的产品代码才算命中，命中的器械（match为product_code）排在最前，
+        其后是去掉重复器械的向量检索结果。
+        """
+        codes = self._product_codes(query, parameters)
+        if not codes:
+            return await self._vector_search("fda_devices", query, parameters)
+        service = await self._get_service("fda_devices")
+        # 代码已校验为3位大写字母，可以安全地拼入过滤表达式
+        expr = "product_code in [{}]".format(", ".join(f'"{code}"' for code in codes))
+        rows, vector_results = await asyncio.gather(
+            asyncio.to_thread(service.query_by_expr, expr, self._top_k(parameters)),
+            self._vector_search("fda_devices", query, parameters)
+        )
+        hit_codes = {row["metadata"].get("product_code") for row in rows}
+        merged = [{**row, "match": "product_code"} for row in rows] + [
+            result for result in vector_results if result["metadata"].get("product_code") not in hit_codes
+        ]
+        return [
+            {"rank": i, **{key: value for key, value in result.items() if key != "rank"}}
+            for i, result in enumerate(merged, 1)
+        ]
+
+    async def execute(self, query: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        执行一次风险检查
+
+        Args:
+            query: 查询文本（商品标题、关键词或FDA产品代码）
+            parameters: 任务参数
+                - top_k: 每个来源返回的结果数量，默认为配置AGENT_TOP_K（5）
+                - timeout: 整体截止时间（秒），默认default_timeout
+                - sources: 需要查询的来源，默认全部
+                - search_params: 按来源指定的检索参数，如{"regulations": {"ef": 64}}
+                - product_codes: 指定的FDA产品代码列表（3位大写字母，最多MAX_PRODUCT_CODES个）
+
+        Returns:
+            Dict: 各来源的结果、各来源的状态和耗时，以及整体状态
+
+        Raises:
+            ValueError: 查询文本为空，或timeout、sources不合法
+        """
+        if not query or not query.strip():
+            raise ValueError("查询文本不能为空")
+
+        results = await self.run_tools(
+            query,
+            parameters,
+            tool_names=self._sources(parameters),
+            timeout=self._timeout(parameters)
+        )
+        response = {name: result.result for name, result in results.items()}
+        response["sources"] = {
+            name: {"status": result.status, "error": result.error, "elapsed_ms": result.elapsed_ms}
+            for name, result in results.items()
+        }
+        response["status"] = self.overall_status(results)
+        return response
+# ai code end
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from app.api.profiling import ProfilingMiddleware
+from app.api.routes import a2a_routes, agent_routes, health_routes, metrics_routes, stream_routes
+from app.services.cache_warmer import cache_warmer
+from app.services.vector_registry import registry
+from base.config import get_config
+
+
+# ai code begin && nums:42
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    服务生命周期：启动时在后台预热向量库，就绪探针在预热完成后才变为可用；
+    同时定期检查config.ini，修改并发上限、缓存大小等配置后无需重启worker；
+    后台按上次运行记录的热点查询预热查询向量缓存和Milvus，并定期保存查询统计
+    """
+    config = get_config()
+    if config.VECTOR_WARMUP:
+        registry.start_warmup()
+    config.start_watching()
+    warm_task = None
+    if config.QUERY_SKETCH_ENABLED or config.CACHE_WARM_TOP_N > 0:
+        warm_task = asyncio.create_task(cache_warmer.run())
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+        await asyncio.gather(warm_task, return_exceptions=True)
+    config.stop_watching()
+
+
+app = FastAPI(
+    title="Risk FDA RAG",
+    description="商品风险检索服务：亚马逊法规库、良购产品库和FDA医疗器械库的向量检索",
+    version="0.1.0",
+    # 默认使用orjson序列化响应
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+app.include_router(health_routes.router)
+app.include_router(agent_routes.router)
+app.include_router(stream_routes.router)
+app.include_router(a2a_routes.router)
+app.include_router(metrics_routes.router)
+
+# 按请求开启的性能剖析：只有配置了DEBUG_PROFILE_TOKEN且请求头X-Debug-Profile携带该令牌时才生效
+app.add_middleware(
+    ProfilingMiddleware,
+    token=get_config().DEBUG_PROFILE_TOKEN,
+    output_dir=get_config().DEBUG_PROFILE_DIR
+)
+# ai code end
@@ -0,0 +1,120 @@
+import asyncio
+import hmac
+import os
+from typing import Any, Dict, List, Optional
+import orjson
+from base.config import PROJECT_ROOT
+from base.profiling import profile_session
+
+
+# ai code begin && nums:110
+# 开启剖析的请求头，值必须与服务端配置的令牌一致
+PROFILE_HEADER = b"x-debug-profile"
+# 剖析结果的输出方式：file写入本地目录（默认），inline随JSON响应返回
+PROFILE_OUTPUT_HEADER = b"x-debug-profile-output"
+PROFILE_OUTPUT_MODES = ("file", "inline")
+
+
+def resolve_profile_dir(path: str) -> str:
+    """剖析结果目录的绝对路径（相对路径按项目根目录解析，与服务的启动目录无关）"""
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(PROJECT_ROOT, path))
+
+
+class ProfilingMiddleware:
+    """
+    按请求开启的性能剖析（ASGI中间件）
+
+    请求携带 X-Debug-Profile: <令牌> 且令牌与服务端配置一致时，记录该请求的span树和cProfile统计：
+    - file（默认）：写入output_dir，响应头X-Debug-Profile-Id给出文件名
+    - inline：JSON响应改为 {"response": 原响应, "debug_profile": 剖析结果}，并附带Server-Timing响应头；
+      非JSON响应（流式结果等）仍写入文件
+
+    未配置令牌或请求未携带请求头时直接透传，不产生额外开销。
+    cProfile统计的是事件循环线程，同一时刻的其他请求也会计入热点，span树只包含本请求。
+    """
+
+    def __init__(self, app, token: Optional[str] = None, output_dir: str = "logs/profiles"):
+        """
+        初始化中间件
+
+        Args:
+            app: 下游ASGI应用
+            token: 开启剖析的令牌，为空时不响应剖析请求头
+            output_dir: 剖析结果写入的目录，相对路径按项目根目录解析
+        """
+        self.app = app
+        self.token = token or ""
+        self.output_dir = resolve_profile_dir(output_dir)
+
+    def _requested_mode(self, scope: Dict[str, Any]) -> Optional[str]:
+        """校验请求头，返回输出方式；未请求剖析或令牌不匹配时返回None"""
+        value = mode = None
+        for name, header_value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                value = header_value.decode("latin-1")
+            elif name == PROFILE_OUTPUT_HEADER:
+                mode = header_value.decode("latin-1").strip().lower()
+        if value is None or not hmac.compare_digest(value.strip(), self.token):
+            return None
+        return mode if mode in PROFILE_OUTPUT_MODES else "file"
+
+    async def __call__(self, scope, receive, send):
+        if not self.token or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = self._requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if mode == "inline":
+            await self._profile_inline(scope, receive, send)
+            return
+
+        with profile_session(f"{scope['method']} {scope['path']}") as profile:
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-debug-profile-id", profile.profile_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
+        await asyncio.to_thread(profile.dump, self.output_dir)
+
+    async def _profile_inline(self, scope, receive, send):
+        """缓存完整响应，剖析结束后与剖析结果一起返回"""
+        start_message: Dict[str, Any] = {}
+        body_parts: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+
+        with profile_session(f"{scope['method']} {scope['path']}") as profile:
+            await self.app(scope, receive, capture)
+
+        headers = [
+            (name, value) for name, value in start_message.get("headers", [])
+            if name != b"content-length"
+        ]
+        content_type = dict(headers).get(b"content-type", b"")
+        body = b"".join(body_parts)
+        if content_type.startswith(b"application/json"):
+            body = orjson.dumps({"response": orjson.loads(body) if body else None, "debug_profile": profile.to_dict()})
+        else:
+            await asyncio.to_thread(profile.dump, self.output_dir)
+        server_timing = ", ".join(
+            f"{name};dur={duration:.2f}" for name, duration in profile.top_level_timings().items()
+        )
+        headers.extend([
+            (b"content-length", str(len(body)).encode()),
+            (b"x-debug-profile-id", profile.profile_id.encode())
+        ])
+        if server_timing:
+            headers.append((b"server-timing", server_timing.encode()))
+        await send({"type": "http.response.start", "status": start_message.get("status", 500), "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+# ai code end
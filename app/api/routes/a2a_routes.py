@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import ValidationError
+from app.a2a.agent_card import AgentCard, AgentSkill
+from app.a2a.protocol import A2AProtocol, A2AProtocolError
+from app.api.routes.agent_routes import execute_task, risk_search_agent
+from app.api.schemas.agent_schemas import AgentTask
+from base.config import get_config
+
+
+# ai code begin && nums:93
+router = APIRouter(tags=["a2a"])
+
+
+def build_agent_card(base_url: str = "") -> AgentCard:
+    """构建本服务的Agent名片：RiskSearchAgent的名片加上检索接口支持的任务类型"""
+    card = risk_search_agent.build_agent_card(base_url)
+    card.skills.extend([
+        AgentSkill(id="search", name="单集合检索", description="在指定集合中检索相似文档"),
+        AgentSkill(id="risk_check", name="多集合检索", description="并发检索多个集合并合并排序"),
+    ])
+    card.encodings = A2AProtocol.supported_encodings()
+    card.supports_batch = True
+    return card
+
+
+def _parse_deadline(value: Optional[str]) -> Optional[float]:
+    """解析截止时间请求头（毫秒），返回秒数；缺失或非法时不设截止时间"""
+    try:
+        return max(int(value), 0) / 1000 if value else None
+    except ValueError:
+        return None
+
+
+def _task_error(task_id: str, status: str, error: str, start: float) -> Dict[str, Any]:
+    """构建失败的任务响应"""
+    return {
+        "task_id": task_id,
+        "status": status,
+        "result": None,
+        "error": error,
+        "elapsed_ms": (time.perf_counter() - start) * 1000
+    }
+
+
+async def _run_one(raw_task: Any, semaphore: asyncio.Semaphore, deadline: Optional[float]) -> Dict[str, Any]:
+    """
+    校验并执行帧中的单个任务，超过截止时间的任务返回timeout状态，执行出错的任务返回failed状态
+
+    单个任务的异常不向外抛出，批量帧中的其他任务照常返回。超时取消的只是本任务对检索结果的等待，
+    与HTTP请求合并的同一次检索（SingleFlight）会继续为其他调用方执行。
+    """
+    start = time.perf_counter()
+    task_id = raw_task.get("task_id", "") if isinstance(raw_task, dict) else ""
+    try:
+        task = AgentTask.model_validate(raw_task)
+    except ValidationError as e:
+        return _task_error(task_id, "failed", f"任务格式错误: {e.errors()[0]['msg']}", start)
+
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(execute_task(task), deadline)
+        except asyncio.TimeoutError:
+            return _task_error(task_id, "timeout", f"超过截止时间（{deadline}s）", start)
+        except Exception as e:
+            return _task_error(task_id, "failed", f"{type(e).__name__}: {e}", start)
+
+
+def _encoded_response(payload: Dict[str, Any], encoding: str, status_code: int = 200) -> Response:
+    """按请求使用的编码返回响应"""
+    if encoding == "json":
+        return ORJSONResponse(payload, status_code=status_code)
+    return Response(
+        A2AProtocol.encode(payload, encoding),
+        status_code=status_code,
+        media_type=A2AProtocol.content_type(encoding)
+    )
+
+
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    """Agent名片"""
+    return ORJSONResponse(build_agent_card(str(request.base_url).rstrip("/")).to_dict())
+
+
+@router.post("/a2a/tasks")
+async def a2a_tasks(request: Request):
+    """
+    A2A任务入口
+
+    请求体为单任务帧或批量帧，编码由Content-Type决定（JSON或msgpack），
+    响应使用相同编码；批量帧中的任务并发执行，共用请求头中的截止时间。
+    """
+    encoding = A2AProtocol.encoding_from_content_type(request.headers.get("content-type"))
+    deadline = _parse_deadline(request.headers.get(A2AProtocol.DEADLINE_HEADER))
+    try:
+        tasks, batch = A2AProtocol.parse_frame(A2AProtocol.decode(await request.body(), encoding))
+    except A2AProtocolError as e:
+        return ORJSONResponse({"detail": str(e)}, status_code=400)
+
+    # 批量帧中同时执行的任务数上限，每个请求读取一次配置，热更新后的新请求即按新值执行
+    semaphore = asyncio.Semaphore(get_config().A2A_MAX_CONCURRENCY)
+    responses = await asyncio.gather(*(_run_one(task, semaphore, deadline) for task in tasks))
+    return _encoded_response(A2AProtocol.build_response_frame(list(responses), batch), encoding)
+# ai code end
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+from app.agents.risk_search_agent import RiskSearchAgent
+from app.api.schemas.agent_schemas import (
+    AgentResponse,
+    AgentTask,
+    RiskCheckRequest,
+    SearchPageRequest,
+    SearchPageResponse,
+    SearchRequest,
+    SearchResponse,
+)
+from app.services.fanout_search import FanoutSearchService
+from app.services.search_cursor import SearchCursor
+from app.services.single_flight import SingleFlight
+from app.services.vector_service import VectorService
+
+
+# ai code begin && nums:206
+router = APIRouter(prefix="/api/agents", tags=["agents"])
+
+# 相同查询的并发请求合并为一次后端调用
+single_flight = SingleFlight()
+
+_fanout_service: Optional[FanoutSearchService] = None
+_fanout_lock = threading.Lock()
+
+# 风险检查Agent（并发查询多个来源，共享截止时间）
+risk_search_agent = RiskSearchAgent()
+
+
+def _get_fanout_service() -> FanoutSearchService:
+    """获取进程内共享的多集合检索服务（首次调用时创建）"""
+    global _fanout_service
+    if _fanout_service is None:
+        with _fanout_lock:
+            if _fanout_service is None:
+                _fanout_service = FanoutSearchService()
+    return _fanout_service
+
+
+def _params_key(params: Optional[Dict[str, Any]]) -> str:
+    """把检索参数转换为可哈希的key"""
+    return json.dumps(params, sort_keys=True) if params else ""
+
+
+def _get_vector_service(collection_name: str) -> VectorService:
+    """获取集合的检索服务（句柄由注册表共享，首次访问时在线程池中建立连接）"""
+    return VectorService(collection_name=collection_name)
+
+
+async def run_search(request: SearchRequest) -> List[Dict[str, Any]]:
+    """
+    执行单集合检索，相同参数的并发请求只调用一次后端
+
+    Args:
+        request: 检索请求
+
+    Returns:
+        List[Dict]: 格式化后的检索结果
+    """
+    key = ("search", request.collection, request.query.strip(), request.top_k, _params_key(request.search_params))
+
+    async def _call():
+        service = await asyncio.to_thread(_get_vector_service, request.collection)
+        results = await service.search_with_scores_async(request.query, request.top_k, request.search_params)
+        return service.format_results_with_scores(results)
+
+    return await single_flight.do(key, _call)
+
+
+async def run_search_page(request: SearchPageRequest) -> Dict[str, Any]:
+    """
+    执行分页检索：没有cursor时向量化查询并返回首页，有cursor时用游标中的查询向量取下一页
+
+    Args:
+        request: 分页检索请求
+
+    Returns:
+        Dict: query、results（排名接续之前的页）和next_cursor
+    """
+    if request.cursor:
+        cursor = SearchCursor.decode(request.cursor)
+        start_rank = cursor.returned + 1
+        service = await asyncio.to_thread(_get_vector_service, cursor.collection)
+        results, next_cursor = await asyncio.to_thread(service.fetch_page, cursor)
+        query = cursor.query
+    else:
+        if not request.query:
+            raise ValueError("首页检索需要提供query")
+        start_rank = 1
+        service = await asyncio.to_thread(_get_vector_service, request.collection)
+        results, next_cursor = await service.search_page_async(request.query, request.page_size, request.search_params)
+        query = request.query
+    return {
+        "query": query,
+        "results": service.format_results_with_scores(results, start_rank),
+        "next_cursor": next_cursor.encode() if next_cursor is not None else None
+    }
+
+
+async def run_risk_check(request: RiskCheckRequest) -> List[Dict[str, Any]]:
+    """
+    执行多集合风险检查，相同参数的并发请求只调用一次后端
+
+    Args:
+        request: 风险检查请求
+
+    Returns:
+        List[Dict]: 合并排序后的检索结果，每条标注来源集合
+    """
+    key = (
+        "risk_check",
+        tuple(request.collections or ()),
+        request.query.strip(),
+        request.top_k,
+        request.per_collection_k,
+        _params_key(request.search_params)
+    )
+
+    async def _call():
+        service = await asyncio.to_thread(_get_fanout_service)
+        return await service.search_async(
+            request.query,
+            top_k=request.top_k,
+            collection_names=request.collections,
+            per_collection_k=request.per_collection_k,
+            search_params=request.search_params
+        )
+
+    return await single_flight.do(key, _call)
+
+
+def _search_response(query: str, results: List[Dict[str, Any]], start: float) -> ORJSONResponse:
+    """构建检索响应（直接使用orjson序列化，跳过响应模型校验）"""
+    return ORJSONResponse({
+        "query": query,
+        "total": len(results),
+        "results": results,
+        "elapsed_ms": (time.perf_counter() - start) * 1000
+    })
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """单集合向量检索"""
+    start = time.perf_counter()
+    try:
+        results = await run_search(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _search_response(request.query, results, start)
+
+
+@router.post("/search/page", response_model=SearchPageResponse)
+async def search_page(request: SearchPageRequest):
+    """分页向量检索：首页返回next_cursor，翻页时只传cursor，不重复向量化"""
+    start = time.perf_counter()
+    try:
+        page = await run_search_page(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse({
+        "query": page["query"],
+        "total": len(page["results"]),
+        "results": page["results"],
+        "next_cursor": page["next_cursor"],
+        "elapsed_ms": (time.perf_counter() - start) * 1000
+    })
+
+
+@router.post("/risk-check", response_model=SearchResponse)
+async def risk_check(request: RiskCheckRequest):
+    """多集合风险检查：并发检索法规库、产品库和FDA库并合并排序"""
+    start = time.perf_counter()
+    try:
+        results = await run_risk_check(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _search_response(request.query, results, start)
+
+
+async def execute_task(task: AgentTask) -> Dict[str, Any]:
+    """
+    执行一个Agent任务（HTTP入口和A2A入口共用）
+
+    task_type为"search"时执行单集合检索，为"risk_check"时执行多集合风险检查，
+    parameters中的字段与对应请求体的字段一致；
+    为"risk_search"时交给RiskSearchAgent分来源并发查询，部分来源超时时status为partial。
+
+    Args:
+        task: Agent任务
+
+    Returns:
+        Dict: 字段与AgentResponse一致的响应字典
+    """
+    if task.task_type == RiskSearchAgent.TASK_TYPE:
+        return await risk_search_agent.handle_task(task.model_dump())
+
+    start = time.perf_counter()
+    task_id = task.task_id or uuid.uuid4().hex
+    try:
+        if task.task_type == "search":
+            result = await run_search(SearchRequest(query=task.query, **task.parameters))
+        elif task.task_type == "risk_check":
+            result = await run_risk_check(RiskCheckRequest(query=task.query, **task.parameters))
+        else:
+            raise ValueError(f"不支持的任务类型: {task.task_type}")
+        status, error = "success", None
+    except (ValueError, TypeError) as e:
+        # TypeError：parameters中含有与请求体固定字段重复的键（如query）
+        result, status, error = None, "failed", str(e)
+    return {
+        "task_id": task_id,
+        "status": status,
+        "result": result,
+        "error": error,
+        "elapsed_ms": (time.perf_counter() - start) * 1000
+    }
+
+
+@router.post("/task", response_model=AgentResponse)
+async def run_task(task: AgentTask):
+    """通用Agent任务入口"""
+    return ORJSONResponse(await execute_task(task))
+# ai code end
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from app.api.schemas.agent_schemas import HealthResponse
+from app.services.vector_registry import registry
+
+
+# ai code begin && nums:26
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health", response_model=HealthResponse)
+async def health():
+    """存活探针：进程能响应即返回200"""
+    return ORJSONResponse({"status": "ok", "ready": registry.is_ready(), "collections": {}})
+
+
+@router.get("/health/ready", response_model=HealthResponse)
+async def ready():
+    """
+    就绪探针：已入库的集合全部预热完成后返回200，否则返回503
+
+    已声明但尚未入库的集合不阻塞就绪，此时status为degraded（检索这些集合会失败）。
+    """
+    is_ready = registry.is_ready()
+    status = ("degraded" if registry.missing_collections() else "ready") if is_ready else "warming"
+    return ORJSONResponse(
+        {
+            "status": status,
+            "ready": is_ready,
+            "collections": registry.warmup_status()
+        },
+        status_code=200 if is_ready else 503
+    )
+# ai code end
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from base.metrics import metrics
+
+
+# ai code begin && nums:12
+router = APIRouter(tags=["metrics"])
+
+# Prometheus文本格式的Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus指标：检索各阶段耗时、Embedding合批与缓存、入库与情感分析调用统计"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+# ai code end
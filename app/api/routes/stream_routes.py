@@ -0,0 +1,165 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Set, Type
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
+from app.api.routes.agent_routes import _get_vector_service
+from app.api.schemas.agent_schemas import SearchRequest
+from app.api.streaming import STREAM_MEDIA_TYPES, encode_stream, resolve_stream_format
+from base.config import get_config
+
+
+# ai code begin && nums:151
+router = APIRouter(prefix="/api/agents", tags=["agents-stream"])
+
+
+def _streaming_response(
+    items: AsyncIterator[Dict[str, Any]],
+    fmt: str,
+    response_class: Type[StreamingResponse] = StreamingResponse
+) -> StreamingResponse:
+    """构建流式响应"""
+    return response_class(
+        encode_stream(items, fmt),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        # 关闭反向代理缓冲，保证结果到达即发送
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _resolve_format(fmt: str, request: Request) -> str:
+    """确定流式格式，参数不合法时返回400"""
+    try:
+        return resolve_stream_format(fmt, request.headers.get("accept", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/search/stream")
+async def search_stream(
+    body: SearchRequest,
+    request: Request,
+    fmt: str = Query("", alias="format", description="ndjson或sse，为空时按Accept头判断")
+):
+    """单集合检索，逐条流式返回检索结果"""
+    stream_format = _resolve_format(fmt, request)
+
+    async def _items():
+        service = await asyncio.to_thread(_get_vector_service, body.collection)
+        results = await service.search_with_scores_async(body.query, body.top_k, body.search_params)
+        for item in service.iter_results_with_scores(results):
+            yield item
+
+    return _streaming_response(_items(), stream_format)
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    边读取请求体边输出结果的流式响应
+
+    StreamingResponse在ASGI spec_version低于2.4时会在发送期间并发调用receive监听客户端断开，
+    会和生成器争抢请求体消息；这里只负责发送，客户端断开由生成器自行检测
+    （读取请求体时抛出ClientDisconnect，读完之后通过request.is_disconnected检查）。
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+async def _aiter_query_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    逐行读取请求体中的查询（每行一个商品标题/关键词）
+
+    边接收边按行切分，块末尾不完整的一行留到下一块拼接，
+    内存占用只与单行长度有关，与请求体大小无关；自动去掉UTF-8 BOM和空行。
+
+    Args:
+        chunks: 请求体数据块（request.stream()）
+
+    Returns:
+        AsyncIterator[str]: 非空的查询文本
+    """
+    first_line = True
+    remainder = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        *lines, remainder = (remainder + chunk).split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8", errors="replace")
+            if first_line:
+                text, first_line = text.removeprefix("\ufeff"), False
+            text = text.strip()
+            if text:
+                yield text
+    text = remainder.decode("utf-8", errors="replace")
+    if first_line:
+        text = text.removeprefix("\ufeff")
+    text = text.strip()
+    if text:
+        yield text
+
+
+@router.post("/screen/stream")
+async def screen_stream(
+    request: Request,
+    collection: str = Query("liangou_regulations", description="检索的集合名称"),
+    top_k: int = Query(5, ge=1, le=100, description="每条查询返回的结果数量"),
+    max_concurrency: Optional[int] = Query(
+        None, ge=1, le=64, description="同时在途的查询数，默认为配置SCREEN_MAX_CONCURRENCY"
+    ),
+    fmt: str = Query("", alias="format", description="ndjson或sse，为空时按Accept头判断")
+):
+    """
+    批量筛查：请求体为逐行的查询列表（如整份商品清单的标题列），
+    每条查询完成后立即返回其结果，而不是等整批处理完。
+
+    每条输出包含index（查询在输入中的行序号）、query和results，输出顺序为完成顺序。
+    """
+    stream_format = _resolve_format(fmt, request)
+    # 同时在途的查询数上限，决定了单个请求的内存占用上限
+    max_concurrency = max_concurrency or get_config().SCREEN_MAX_CONCURRENCY
+
+    async def _items():
+        service = await asyncio.to_thread(_get_vector_service, collection)
+
+        async def _search_one(index: int, query: str) -> Dict[str, Any]:
+            try:
+                results = await service.search_with_scores_async(query, top_k)
+                return {"index": index, "query": query, "results": service.format_results_with_scores(results)}
+            except Exception as e:
+                return {"index": index, "query": query, "error": str(e)}
+
+        pending: Set[asyncio.Task] = set()
+        index = 0
+        try:
+            async for query in _aiter_query_lines(request.stream()):
+                pending.add(asyncio.create_task(_search_one(index, query)))
+                index += 1
+                # 在途查询达到上限时，先把已完成的结果发出去再继续读取输入
+                if len(pending) >= max_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    # 上传较慢时也及时发出已完成的结果
+                    done = {task for task in pending if task.done()}
+                    pending -= done
+                for task in done:
+                    yield task.result()
+            # 请求体已读完，之后才能通过receive检查客户端是否断开
+            while pending and not await request.is_disconnected():
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # 客户端提前断开时取消剩余查询
+            for task in pending:
+                task.cancel()
+
+    return _streaming_response(_items(), stream_format, _UploadStreamingResponse)
+# ai code end
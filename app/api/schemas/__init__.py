@@ -0,0 +1,9 @@
+from app.api.schemas.agent_schemas import (
+    AgentResponse,
+    AgentTask,
+    HealthResponse,
+    RiskCheckRequest,
+    SearchHit,
+    SearchRequest,
+    SearchResponse,
+)
@@ -0,0 +1,86 @@
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+
+
+# ai code begin && nums:98
+class SearchRequest(BaseModel):
+    """单集合检索请求"""
+    query: str = Field(..., min_length=1, description="查询文本")
+    collection: str = Field("liangou_regulations", description="检索的集合名称")
+    top_k: int = Field(10, ge=1, le=1000, description="返回结果数量")
+    search_params: Optional[Dict[str, Any]] = Field(None, description="本次检索的索引参数，如{\"ef\": 128}")
+
+
+class SearchPageRequest(BaseModel):
+    """分页检索请求：首页提供query，之后每页只需提供上一页返回的cursor"""
+    query: Optional[str] = Field(None, min_length=1, description="查询文本（提供cursor时忽略）")
+    collection: str = Field("liangou_regulations", description="检索的集合名称（提供cursor时忽略）")
+    page_size: int = Field(10, ge=1, le=100, description="每页结果数（提供cursor时沿用首页的设置）")
+    search_params: Optional[Dict[str, Any]] = Field(None, description="本次检索的索引参数，翻页时沿用")
+    cursor: Optional[str] = Field(None, description="上一页返回的next_cursor")
+
+
+class RiskCheckRequest(BaseModel):
+    """多集合风险检查请求"""
+    query: str = Field(..., min_length=1, description="查询文本（商品标题、关键词等）")
+    collections: Optional[List[str]] = Field(None, description="检索的集合，默认为法规库、产品库和FDA库")
+    top_k: int = Field(10, ge=1, le=1000, description="合并后返回的结果数量")
+    per_collection_k: Optional[int] = Field(None, ge=1, le=1000, description="每个集合检索的数量")
+    search_params: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="按集合名指定的检索参数")
+
+
+class SearchHit(BaseModel):
+    """单条检索结果"""
+    rank: int
+    content: str
+    metadata: Dict[str, Any]
+    score: Optional[float] = None
+    raw_score: Optional[float] = None
+    collection: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    """检索响应"""
+    query: str
+    total: int
+    results: List[SearchHit]
+    elapsed_ms: float
+
+
+class SearchPageResponse(BaseModel):
+    """分页检索响应"""
+    query: str
+    total: int
+    results: List[SearchHit]
+    next_cursor: Optional[str] = Field(None, description="下一页的游标，没有更多结果时为空")
+    elapsed_ms: float
+
+
+class AgentTask(BaseModel):
+    """
+    Agent任务
+
+    task_type决定任务的处理方式，例如"search"（单集合检索）或"risk_check"（多集合风险检查），
+    parameters中携带任务相关的参数（collection、top_k、search_params等）。
+    """
+    task_id: Optional[str] = Field(None, description="任务ID，为空时由服务端生成")
+    task_type: str = Field("risk_check", description="任务类型")
+    query: str = Field(..., min_length=1, description="查询文本")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="任务参数")
+
+
+class AgentResponse(BaseModel):
+    """Agent任务响应"""
+    task_id: str
+    status: str = Field(..., description="任务状态：success / failed / partial / timeout")
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+class HealthResponse(BaseModel):
+    """健康检查响应"""
+    status: str
+    ready: bool
+    collections: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+# ai code end
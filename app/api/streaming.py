@@ -0,0 +1,54 @@
+from typing import Any, AsyncIterator, Dict
+import orjson
+
+
+# ai code begin && nums:48
+# 支持的流式格式及其Content-Type
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def resolve_stream_format(fmt: str, accept: str = "") -> str:
+    """
+    确定流式响应格式
+
+    Args:
+        fmt: 请求参数指定的格式（ndjson / sse），为空时根据Accept头判断
+        accept: 请求的Accept头
+
+    Returns:
+        str: "ndjson"或"sse"
+    """
+    if fmt:
+        if fmt not in STREAM_MEDIA_TYPES:
+            raise ValueError(f"不支持的流式格式: {fmt}")
+        return fmt
+    return "sse" if "text/event-stream" in accept else "ndjson"
+
+
+def encode_event(item: Dict[str, Any], fmt: str, event: str = "result") -> bytes:
+    """把单条结果编码为一行NDJSON或一个SSE事件"""
+    payload = orjson.dumps(item)
+    if fmt == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+    return payload + b"\n"
+
+
+async def encode_stream(items: AsyncIterator[Dict[str, Any]], fmt: str) -> AsyncIterator[bytes]:
+    """
+    把结果异步迭代器编码为字节流
+
+    任何异常（参数错误、Milvus RPC错误、超时等）都发送error事件后正常结束，
+    流总是以done事件结尾：客户端收到done说明流完整结束，没有done说明连接被截断。
+    """
+    try:
+        async for item in items:
+            yield encode_event(item, fmt)
+    except ValueError as e:
+        yield encode_event({"error": str(e)}, fmt, event="error")
+    except Exception as e:
+        yield encode_event({"error": f"{type(e).__name__}: {e}"}, fmt, event="error")
+    yield encode_event({"done": True}, fmt, event="done")
+# ai code end
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+from base.config import PROJECT_ROOT, get_config
+from base.metrics import metrics
+from app.services.query_sketch import QuerySketch, query_sketch as default_sketch
+from app.services.vector_registry import VectorServiceRegistry, registry as default_registry
+
+
+# ai code begin && nums:169
+WARM_QUERIES = metrics.counter(
+    "risk_rag_cache_warm_queries_total", "缓存预热处理的查询数：embedded / searched / failed", ["result"]
+)
+SKETCH_SIZE = metrics.gauge("risk_rag_query_sketch_size", "高频查询统计中的热点候选数")
+# 启动预热前等待向量库预热（连接、加载集合）的最长时间（秒）
+READY_TIMEOUT = 60.0
+
+
+def resolve_sketch_file(path: Optional[str] = None) -> str:
+    """热点查询统计文件的绝对路径（默认取配置QUERY_SKETCH_FILE，相对路径按项目根目录解析）"""
+    path = path or get_config().QUERY_SKETCH_FILE
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(PROJECT_ROOT, path))
+
+
+class _RateLimiter:
+    """按固定速率放行（每秒rate个），批量操作按条数占用配额"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    async def acquire(self, count: int = 1):
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(self._next, now) + self.interval * count
+
+
+class CacheWarmer:
+    """
+    基于查询日志的缓存预热
+
+    服务运行时VectorService把每次检索的 (集合, 查询) 记录到QuerySketch，定期保存到文件；
+    重启后（或按CACHE_WARM_INTERVAL周期性地）在后台按限定速率：
+    1. 批量向量化热点查询，写入查询向量LRU缓存
+    2. 逐条执行一次检索，让Milvus把相关分段和索引数据加载到内存
+    热点查询的首批真实请求不再承担冷缓存的延迟。
+
+    多个worker进程共用同一个统计文件时，以最后保存的为准（各worker看到的查询分布基本一致）。
+    """
+
+    def __init__(
+        self,
+        sketch: Optional[QuerySketch] = None,
+        registry: Optional[VectorServiceRegistry] = None,
+        sketch_file: Optional[str] = None
+    ):
+        """
+        初始化预热器
+
+        Args:
+            sketch: 查询统计，默认使用进程内共享的统计
+            registry: 句柄注册表，默认使用进程内共享的注册表
+            sketch_file: 统计文件路径，默认取配置QUERY_SKETCH_FILE
+        """
+        self.sketch = sketch or default_sketch
+        self.registry = registry or default_registry
+        self.sketch_file = resolve_sketch_file(sketch_file)
+        self._services: Dict[str, Any] = {}
+        self.last_result: Dict[str, Any] = {}
+
+    def _search(self, collection: str, embedding: List[float]):
+        """在线程池中执行一次预热检索（首次访问集合时创建VectorService）"""
+        from app.services.vector_service import VectorService
+
+        service = self._services.get(collection)
+        if service is None:
+            service = self._services[collection] = VectorService(collection, registry=self.registry)
+        service.search_with_scores_by_vector(embedding)
+
+    async def warm(self, top_n: Optional[int] = None, rate: Optional[float] = None) -> Dict[str, Any]:
+        """
+        预热热点查询
+
+        Args:
+            top_n: 预热的查询数，默认取配置CACHE_WARM_TOP_N
+            rate: 每秒向量化/检索的查询数，默认取配置CACHE_WARM_RATE
+
+        Returns:
+            Dict: queries（预热的查询数）、embedded（新向量化数）、searched、failed、elapsed
+        """
+        config = get_config()
+        top_n = config.CACHE_WARM_TOP_N if top_n is None else top_n
+        limiter = _RateLimiter(config.CACHE_WARM_RATE if rate is None else rate)
+        entries = self.sketch.top(top_n)
+        batcher = self.registry.get_embedding_batcher()
+        result = {"queries": len(entries), "embedded": 0, "searched": 0, "failed": 0}
+        start = time.perf_counter()
+
+        texts = list(dict.fromkeys(query for _, query, _ in entries))
+        for i in range(0, len(texts), batcher.max_batch_size):
+            chunk = texts[i:i + batcher.max_batch_size]
+            await limiter.acquire(len(chunk))
+            try:
+                embedded = await batcher.prime(chunk)
+            except Exception:
+                result["failed"] += len(chunk)
+                WARM_QUERIES.inc(len(chunk), result="failed")
+                continue
+            result["embedded"] += embedded
+            WARM_QUERIES.inc(embedded, result="embedded")
+
+        for collection, query, _ in entries:
+            await limiter.acquire()
+            try:
+                embedding = await batcher.embed(query)
+                await asyncio.to_thread(self._search, collection, embedding)
+            except Exception:
+                result["failed"] += 1
+                WARM_QUERIES.inc(result="failed")
+                continue
+            result["searched"] += 1
+            WARM_QUERIES.inc(result="searched")
+
+        result["elapsed"] = time.perf_counter() - start
+        self.last_result = result
+        return result
+
+    def load(self) -> bool:
+        """从文件恢复查询统计"""
+        loaded = self.sketch.load(self.sketch_file)
+        SKETCH_SIZE.set(len(self.sketch))
+        return loaded
+
+    def save(self):
+        """衰减计数后保存查询统计"""
+        self.sketch.decay()
+        self.sketch.save(self.sketch_file)
+        SKETCH_SIZE.set(len(self.sketch))
+
+    async def run(self):
+        """
+        后台任务：恢复统计 → 等待向量库就绪 → 启动预热 → 周期保存（和周期预热），取消时保存统计
+
+        服务生命周期中用asyncio.create_task启动。
+        """
+        config = get_config()
+        await asyncio.to_thread(self.load)
+        try:
+            if config.CACHE_WARM_TOP_N > 0 and len(self.sketch):
+                if config.VECTOR_WARMUP:
+                    await asyncio.to_thread(self.registry.wait_ready, READY_TIMEOUT)
+                await self.warm()
+            last_warm = time.monotonic()
+            while True:
+                await asyncio.sleep(max(config.QUERY_SKETCH_SAVE_INTERVAL, 1.0))
+                await asyncio.to_thread(self.save)
+                interval = config.CACHE_WARM_INTERVAL
+                if interval > 0 and config.CACHE_WARM_TOP_N > 0 and time.monotonic() - last_warm >= interval:
+                    await self.warm()
+                    last_warm = time.monotonic()
+        finally:
+            # 取消时（服务退出）在当前线程同步保存，事件循环即将关闭
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        """当前统计规模和最近一次预热结果"""
+        return {
+            "sketch_size": len(self.sketch),
+            "sketch_total": self.sketch.total,
+            "last_warm": dict(self.last_result)
+        }
+
+
+# 进程内共享的预热器
+cache_warmer = CacheWarmer()
+# ai code end
@@ -0,0 +1,277 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+# pymilvus导入较慢，只在真正建表/建索引时才导入，保证服务冷启动速度
+if TYPE_CHECKING:
+    from pymilvus import Collection, CollectionSchema, FieldSchema
+
+
+# ai code begin && nums:255
+@dataclass(frozen=True)
+class ScalarFieldSpec:
+    """
+    标量字段定义
+
+    Args:
+        name: 字段名（Milvus要求以字母或下划线开头）
+        dtype: Milvus数据类型名称，如"VARCHAR"、"INT64"、"BOOL"
+        max_length: VARCHAR字段的最大长度
+        description: 字段说明
+    """
+    name: str
+    dtype: str = "VARCHAR"
+    max_length: Optional[int] = 1024
+    description: str = ""
+
+    def to_field_schema(self) -> "FieldSchema":
+        """转换为pymilvus的FieldSchema"""
+        from pymilvus import DataType, FieldSchema
+
+        dtype = DataType[self.dtype]
+        if dtype == DataType.VARCHAR:
+            return FieldSchema(self.name, dtype, description=self.description, max_length=self.max_length)
+        return FieldSchema(self.name, dtype, description=self.description)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    向量索引定义
+
+    Args:
+        index_type: 索引类型，如"HNSW"、"IVF_FLAT"
+        metric_type: 距离度量，如"L2"、"IP"、"COSINE"
+        params: 建索引参数，如HNSW的M/efConstruction，IVF的nlist
+        search_params: 检索时的默认参数，如HNSW的ef，IVF的nprobe
+    """
+    index_type: str = "HNSW"
+    metric_type: str = "L2"
+    params: Dict[str, Any] = field(default_factory=lambda: {"M": 16, "efConstruction": 200})
+    search_params: Dict[str, Any] = field(default_factory=lambda: {"ef": 64})
+
+    def to_index_params(self) -> Dict[str, Any]:
+        """转换为create_index使用的参数字典"""
+        return {
+            "index_type": self.index_type,
+            "metric_type": self.metric_type,
+            "params": dict(self.params)
+        }
+
+
+@dataclass(frozen=True)
+class CollectionSpec:
+    """
+    集合结构定义
+
+    字段命名与LangChain Milvus保持一致（pk/text/vector），
+    这样显式创建的集合可以直接被VectorService和入库脚本复用。
+
+    Args:
+        name: 集合名称
+        scalar_fields: 标量（元数据）字段列表
+        primary_field: 主键字段名，存放SKU等业务唯一标识
+        primary_max_length: 主键最大长度
+        text_field: 文本字段名
+        vector_field: 向量字段名
+        dim: 向量维度
+        index: 向量索引定义
+        description: 集合说明
+    """
+    name: str
+    scalar_fields: List[ScalarFieldSpec] = field(default_factory=list)
+    primary_field: str = "pk"
+    primary_max_length: int = 128
+    text_field: str = "text"
+    vector_field: str = "vector"
+    dim: int = 1536
+    index: IndexSpec = field(default_factory=IndexSpec)
+    description: str = ""
+
+    @property
+    def output_fields(self) -> List[str]:
+        """检索时需要返回的字段（不含向量）"""
+        return [self.primary_field, self.text_field] + [f.name for f in self.scalar_fields]
+
+    def build_schema(self, dim: Optional[int] = None) -> "CollectionSchema":
+        """
+        构建pymilvus的CollectionSchema
+
+        Args:
+            dim: 向量维度，为None时使用spec中的dim
+
+        Returns:
+            CollectionSchema对象
+        """
+        from pymilvus import CollectionSchema, DataType, FieldSchema
+
+        fields = [f.to_field_schema() for f in self.scalar_fields]
+        fields.append(FieldSchema(self.text_field, DataType.VARCHAR, max_length=65_535))
+        fields.append(
+            FieldSchema(
+                self.primary_field,
+                DataType.VARCHAR,
+                is_primary=True,
+                auto_id=False,
+                max_length=self.primary_max_length
+            )
+        )
+        fields.append(FieldSchema(self.vector_field, DataType.FLOAT_VECTOR, dim=dim or self.dim))
+        return CollectionSchema(fields, description=self.description, enable_dynamic_field=False)
+
+
+# 各业务集合的默认结构
+DEFAULT_COLLECTION_SPECS: List[CollectionSpec] = [
+    CollectionSpec(
+        name="amazon_regulations",
+        scalar_fields=[
+            ScalarFieldSpec("source", max_length=512),
+            ScalarFieldSpec("row_index", dtype="INT64"),
+            ScalarFieldSpec("restricted_product", max_length=1024),
+            ScalarFieldSpec("url", max_length=2048),
+        ],
+        # 法规库数据量小，使用较小的图即可保证召回
+        index=IndexSpec(params={"M": 8, "efConstruction": 64}, search_params={"ef": 32}),
+        description="亚马逊法规库"
+    ),
+    CollectionSpec(
+        name="liangou_regulations",
+        scalar_fields=[
+            ScalarFieldSpec("source", max_length=512),
+            ScalarFieldSpec("row_index", dtype="INT64"),
+            ScalarFieldSpec("lib_main_sku", max_length=128),
+            ScalarFieldSpec("title_cn", max_length=2048),
+            # 近似重复标题的分组ID（代表标题的SKU），同组SKU共用同一个向量
+            ScalarFieldSpec("dup_group", max_length=128),
+        ],
+        index=IndexSpec(params={"M": 16, "efConstruction": 200}, search_params={"ef": 64}),
+        description="良购产品库标题"
+    ),
+    CollectionSpec(
+        name="fda_devices",
+        scalar_fields=[
+            ScalarFieldSpec("source", max_length=512),
+            ScalarFieldSpec("row_index", dtype="INT64"),
+            ScalarFieldSpec("product_code", max_length=32),
+            ScalarFieldSpec("device_name", max_length=1024),
+            ScalarFieldSpec("device_class", max_length=16),
+            ScalarFieldSpec("specialty", max_length=256),
+            ScalarFieldSpec("regulation_number", max_length=64),
+            ScalarFieldSpec("product_type", max_length=256),
+            ScalarFieldSpec("is_implant", dtype="BOOL"),
+            ScalarFieldSpec("is_life_sustain", dtype="BOOL"),
+        ],
+        index=IndexSpec(params={"M": 16, "efConstruction": 128}, search_params={"ef": 64}),
+        description="美国FDA医疗器械"
+    ),
+]
+
+
+class CollectionSchemaManager:
+    """
+    集合结构管理器
+
+    统一声明每个集合的标量字段、主键、向量字段以及索引/检索参数，
+    负责显式创建集合与索引，并为每次检索生成检索参数。
+    """
+
+    def __init__(self, specs: Optional[List[CollectionSpec]] = None):
+        """
+        初始化集合结构管理器
+
+        Args:
+            specs: 集合结构列表，默认为DEFAULT_COLLECTION_SPECS
+        """
+        self._specs: Dict[str, CollectionSpec] = {}
+        for spec in (specs if specs is not None else DEFAULT_COLLECTION_SPECS):
+            self.register(spec)
+
+    def register(self, spec: CollectionSpec):
+        """注册（或覆盖）一个集合结构"""
+        self._specs[spec.name] = spec
+
+    def has_spec(self, collection_name: str) -> bool:
+        """是否声明过该集合"""
+        return collection_name in self._specs
+
+    def get_spec(self, collection_name: str) -> CollectionSpec:
+        """
+        获取集合结构
+
+        Raises:
+            KeyError: 集合未声明
+        """
+        if collection_name not in self._specs:
+            raise KeyError(f"未声明的集合: {collection_name}")
+        return self._specs[collection_name]
+
+    def list_collections(self) -> List[str]:
+        """返回所有已声明的集合名称"""
+        return list(self._specs.keys())
+
+    def index_params(self, collection_name: str) -> Dict[str, Any]:
+        """获取集合的建索引参数"""
+        return self.get_spec(collection_name).index.to_index_params()
+
+    def search_params(
+        self,
+        collection_name: str,
+        overrides: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        生成检索参数
+
+        Args:
+            collection_name: 集合名称
+            overrides: 本次检索覆盖的参数，如{"ef": 128}或{"nprobe": 32}
+            top_k: 本次检索返回数量，HNSW要求ef不小于top_k
+
+        Returns:
+            Dict: 传给Collection.search的param，包含metric_type和params
+        """
+        index = self.get_spec(collection_name).index
+        params = dict(index.search_params)
+        if overrides:
+            params.update(overrides)
+        if top_k is not None and index.index_type == "HNSW" and params.get("ef", 0) < top_k:
+            params["ef"] = top_k
+        return {"metric_type": index.metric_type, "params": params}
+
+    def ensure_collection(
+        self,
+        collection_name: str,
+        using: str = "default",
+        dim: Optional[int] = None,
+        spec: Optional[CollectionSpec] = None
+    ) -> "Collection":
+        """
+        按声明创建集合和向量索引（已存在则直接返回）
+
+        Args:
+            collection_name: 集合名称
+            using: pymilvus连接别名
+            dim: 向量维度，为None时使用spec中的dim
+            spec: 集合结构，默认为collection_name声明的结构（重建版本集合时传入业务集合的结构）
+
+        Returns:
+            Collection对象
+        """
+        from pymilvus import Collection, utility
+
+        spec = spec or self.get_spec(collection_name)
+        if utility.has_collection(collection_name, using=using):
+            collection = Collection(collection_name, using=using)
+        else:
+            collection = Collection(
+                name=collection_name,
+                schema=spec.build_schema(dim),
+                using=using
+            )
+        if not any(index.field_name == spec.vector_field for index in collection.indexes):
+            collection.create_index(spec.vector_field, index_params=spec.index.to_index_params())
+        return collection
+
+
+# 进程内共享的默认管理器
+schema_manager = CollectionSchemaManager()
+# ai code end
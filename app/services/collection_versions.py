@@ -0,0 +1,336 @@
+import random
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+import numpy as np
+import orjson
+from base.config import get_config
+from app.services.collection_schema import CollectionSchemaManager, schema_manager as default_schema_manager
+
+if TYPE_CHECKING:
+    from pymilvus import Collection
+
+
+# ai code begin && nums:321
+# 版本集合名 = 业务集合名 + 分隔符 + 版本号（创建时间），业务集合名本身是指向当前版本的别名
+VERSION_SEPARATOR = "__v"
+# 已有的非版本化集合首次切换时改名为该版本
+LEGACY_VERSION = "0"
+# 校验未通过的版本改名为 业务集合名 + 该分隔符 + 版本号，不再参与版本排序，保留到下次清理
+FAILED_SEPARATOR = "__failed_v"
+
+
+@dataclass
+class ValidationReport:
+    """新版本集合切换前的校验结果"""
+    collection: str
+    rows: int = 0
+    expected_rows: Optional[int] = None
+    previous_rows: Optional[int] = None
+    sample_size: int = 0
+    recall: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        """全部校验通过"""
+        return not self.errors
+
+
+class CollectionVersionManager:
+    """
+    版本化集合与别名切换（蓝绿重建）
+
+    每次重建写入一个新的版本集合（如liangou_regulations__v20261019120000），
+    建好索引、加载到内存并校验行数和抽样召回后，才把业务集合名这个Milvus别名原子地指向新版本。
+    检索服务始终按业务集合名访问，由Milvus解析别名，切换前检索不会碰到写了一半的集合或未建完的索引；
+    旧版本保留若干个用于回滚，上一个版本保持加载，回滚即时生效。
+    """
+
+    def __init__(self, schema_manager: Optional[CollectionSchemaManager] = None, using: str = "default"):
+        """
+        初始化管理器
+
+        Args:
+            schema_manager: 集合结构管理器，默认使用进程内共享的管理器
+            using: pymilvus连接别名
+        """
+        self.schema_manager = schema_manager or default_schema_manager
+        self.using = using
+
+    @staticmethod
+    def version_name(name: str, version: str) -> str:
+        """版本集合名"""
+        return f"{name}{VERSION_SEPARATOR}{version}"
+
+    def list_versions(self, name: str) -> List[str]:
+        """业务集合的全部版本集合，按版本从旧到新排列"""
+        from pymilvus import utility
+
+        prefix = f"{name}{VERSION_SEPARATOR}"
+        return sorted(
+            (c for c in utility.list_collections(using=self.using) if c.startswith(prefix)),
+            key=lambda c: c[len(prefix):].rjust(14, "0")
+        )
+
+    def current_version(self, name: str) -> Optional[str]:
+        """
+        别名当前指向的版本集合
+
+        Returns:
+            Optional[str]: 版本集合名；name是普通集合（尚未版本化）时返回name；不存在时返回None
+        """
+        from pymilvus import utility
+
+        for version in reversed(self.list_versions(name)):
+            if name in utility.list_aliases(version, using=self.using):
+                return version
+        if name in utility.list_collections(using=self.using):
+            return name
+        return None
+
+    def create_version(self, name: str, dim: Optional[int] = None) -> "Collection":
+        """
+        按业务集合的结构创建一个新的版本集合（含向量索引声明）
+
+        Args:
+            name: 业务集合名（须已声明结构）
+            dim: 向量维度，为None时使用spec中的dim
+
+        Returns:
+            Collection: 新版本集合
+        """
+        spec = self.schema_manager.get_spec(name)
+        version = self.version_name(name, time.strftime("%Y%m%d%H%M%S"))
+        return self.schema_manager.ensure_collection(
+            version, using=self.using, dim=dim, spec=replace(spec, name=version)
+        )
+
+    def build_and_load(self, collection: "Collection"):
+        """落盘、等待索引构建完成并加载到内存（阻塞直到全部完成）"""
+        from pymilvus import utility
+
+        collection.flush()
+        utility.wait_for_index_building_complete(collection.name, using=self.using)
+        collection.load()
+
+    @staticmethod
+    def sample_ids(collection: "Collection", primary_field: str, sample_size: int) -> List[Any]:
+        """
+        从整个集合中随机抽取主键（蓄水池抽样）
+
+        用主键迭代器只读主键列遍历全部分段，每行被抽中的概率相同；
+        query(limit=N)返回的是某个分段按存储顺序的前N行，不能代表整个集合。
+
+        Args:
+            collection: 已加载的集合
+            primary_field: 主键字段名
+            sample_size: 抽样条数
+
+        Returns:
+            List: 抽中的主键（集合行数不足时为全部主键）
+        """
+        rng = random.Random()
+        sample: List[Any] = []
+        seen = 0
+        iterator = collection.query_iterator(batch_size=10000, expr="", output_fields=[primary_field])
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                for row in rows:
+                    seen += 1
+                    if len(sample) < sample_size:
+                        sample.append(row[primary_field])
+                    else:
+                        slot = rng.randrange(seen)
+                        if slot < sample_size:
+                            sample[slot] = row[primary_field]
+        finally:
+            iterator.close()
+        return sample
+
+    def validate(
+        self,
+        name: str,
+        collection: "Collection",
+        expected_rows: Optional[int] = None,
+        sample_size: Optional[int] = None,
+        top_k: int = 10
+    ) -> ValidationReport:
+        """
+        校验新版本：行数与写入数一致、不明显少于当前版本，随机抽样的向量能检索到自身
+
+        同组近似重复的SKU共用同一个向量，自身不在前top_k时以首条结果分数等于自身分数视为命中。
+
+        Args:
+            name: 业务集合名
+            collection: 已加载的新版本集合
+            expected_rows: 应写入的行数，为None时不校验
+            sample_size: 抽样条数，默认取配置REBUILD_SAMPLE_SIZE
+            top_k: 每条抽样检索的数量
+
+        Returns:
+            ValidationReport: 校验结果
+        """
+        from pymilvus import Collection
+
+        config = get_config()
+        spec = self.schema_manager.get_spec(name)
+        report = ValidationReport(collection=collection.name, expected_rows=expected_rows)
+        report.rows = collection.num_entities
+        if expected_rows is not None and report.rows != expected_rows:
+            report.errors.append(f"行数{report.rows}与写入数{expected_rows}不一致")
+        current = self.current_version(name)
+        if current is not None and current != collection.name:
+            report.previous_rows = Collection(current, using=self.using).num_entities
+            if report.rows < report.previous_rows * config.REBUILD_MIN_ROW_RATIO:
+                report.errors.append(
+                    f"行数{report.rows}低于当前版本{current}（{report.previous_rows}）的{config.REBUILD_MIN_ROW_RATIO:.0%}"
+                )
+
+        sample = self.sample_ids(collection, spec.primary_field, sample_size or config.REBUILD_SAMPLE_SIZE)
+        rows = []
+        if sample:
+            rows = collection.query(
+                expr=f"{spec.primary_field} in {orjson.dumps(sample).decode()}",
+                output_fields=[spec.primary_field, spec.vector_field]
+            )
+        report.sample_size = len(rows)
+        if rows:
+            vectors = np.asarray([row[spec.vector_field] for row in rows], dtype=np.float32)
+            results = collection.search(
+                data=vectors,
+                anns_field=spec.vector_field,
+                param=self.schema_manager.search_params(name, top_k=top_k),
+                limit=top_k
+            )
+            metric = spec.index.metric_type.upper()
+            hits = 0
+            for row, vector, result in zip(rows, vectors, results):
+                ids = [hit.id for hit in result]
+                expected = 0.0 if metric == "L2" else 1.0 if metric == "COSINE" else float(np.dot(vector, vector))
+                if row[spec.primary_field] in ids or (
+                    len(result) and abs(result[0].distance - expected) <= 1e-3 * max(1.0, abs(expected))
+                ):
+                    hits += 1
+            report.recall = hits / len(rows)
+            if report.recall < config.REBUILD_MIN_RECALL:
+                report.errors.append(f"抽样召回率{report.recall:.3f}低于{config.REBUILD_MIN_RECALL}")
+        elif report.rows:
+            report.errors.append("无法抽样新版本数据")
+        return report
+
+    def swap(self, name: str, version: str):
+        """
+        把业务集合名（别名）原子地指向version
+
+        业务集合名目前是普通集合时，先把它改名为版本LEGACY_VERSION（保留用于回滚）再创建别名，
+        改名到创建别名之间的瞬间检索会失败，只在首次切换时发生一次。
+        """
+        from pymilvus import utility
+
+        current = self.current_version(name)
+        if current == name:
+            legacy = self.version_name(name, LEGACY_VERSION)
+            print(f"⚠️  {name}是普通集合，改名为{legacy}后创建别名")
+            utility.rename_collection(name, legacy, using=self.using)
+            current = legacy
+            utility.create_alias(version, name, using=self.using)
+        elif current is None:
+            utility.create_alias(version, name, using=self.using)
+        else:
+            utility.alter_alias(version, name, using=self.using)
+        print(f"✅ {name} 已切换: {current} → {version}")
+
+    def prune(self, name: str, keep: Optional[int] = None) -> List[str]:
+        """
+        清理旧版本：保留当前版本之前最近的keep-1个版本，上一个版本保持加载以便即时回滚，更早的释放内存
+
+        Args:
+            name: 业务集合名
+            keep: 保留的版本数，默认取配置REBUILD_KEEP_VERSIONS
+
+        Returns:
+            List[str]: 删除的版本集合
+        """
+        from pymilvus import Collection, utility
+
+        keep = max(keep or get_config().REBUILD_KEEP_VERSIONS, 1)
+        current = self.current_version(name)
+        versions = self.list_versions(name)
+        position = versions.index(current) if current in versions else len(versions)
+        # 上次校验未通过的版本，以及比当前版本新的（已回滚掉的）版本，直接删除
+        failed = [c for c in utility.list_collections(using=self.using) if c.startswith(f"{name}{FAILED_SEPARATOR}")]
+        dropped = []
+        for version in failed + versions[position + 1:]:
+            utility.drop_collection(version, using=self.using)
+            dropped.append(version)
+        for index, version in enumerate(reversed(versions[:position])):
+            if index >= keep - 1:
+                utility.drop_collection(version, using=self.using)
+                dropped.append(version)
+            elif index > 0:
+                Collection(version, using=self.using).release()
+        return dropped
+
+    def rollback(self, name: str) -> str:
+        """
+        切回当前版本之前的一个版本
+
+        Returns:
+            str: 切换后的版本集合
+
+        Raises:
+            ValueError: 没有可回滚的版本
+        """
+        from pymilvus import Collection
+
+        current = self.current_version(name)
+        versions = self.list_versions(name)
+        if current not in versions or versions.index(current) == 0:
+            raise ValueError(f"{name}没有可回滚的旧版本")
+        previous = versions[versions.index(current) - 1]
+        Collection(previous, using=self.using).load()
+        self.swap(name, previous)
+        return previous
+
+    def rebuild(
+        self,
+        name: str,
+        populate: Callable[["Collection"], Optional[int]],
+        dim: Optional[int] = None
+    ) -> ValidationReport:
+        """
+        蓝绿重建：创建新版本 → 写入数据 → 建索引并加载 → 校验 → 切换别名 → 清理旧版本
+
+        校验不通过时不切换，新版本释放内存并改名为 业务集合名__failed_v版本号 保留以便排查，下次重建成功后清理。
+
+        Args:
+            name: 业务集合名
+            populate: 向新版本集合写入数据，返回应写入的行数（None表示不校验行数）
+            dim: 向量维度
+
+        Returns:
+            ValidationReport: 校验结果，passed为True时已完成切换
+        """
+        collection = self.create_version(name, dim)
+        print(f"重建 {name}: 写入新版本 {collection.name}")
+        expected_rows = populate(collection)
+        self.build_and_load(collection)
+        report = self.validate(name, collection, expected_rows)
+        if not report.passed:
+            from pymilvus import utility
+
+            collection.release()
+            failed = collection.name.replace(VERSION_SEPARATOR, FAILED_SEPARATOR, 1)
+            utility.rename_collection(collection.name, failed, using=self.using)
+            print(f"✗ 新版本 {collection.name} 校验未通过，保持当前版本（新版本已改名为{failed}）: {report.errors}")
+            return report
+        self.swap(name, collection.name)
+        dropped = self.prune(name)
+        if dropped:
+            print(f"已删除旧版本: {dropped}")
+        return report
+# ai code end
@@ -0,0 +1,184 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+import numpy as np
+
+# pymilvus导入较慢，只在真正写入时才导入
+if TYPE_CHECKING:
+    from pymilvus import Collection
+    from pymilvus.client.abstract import MutationResult
+    from pymilvus.grpc_gen.milvus_pb2 import InsertRequest
+
+
+# ai code begin && nums:172
+def _varint(value: int) -> bytes:
+    """protobuf的varint编码"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def packed_float_array(vectors: np.ndarray) -> bytes:
+    """
+    把向量矩阵编码为protobuf FloatArray消息的序列化字节
+
+    FloatArray只有一个字段（1: packed repeated float），序列化结果就是
+    标签 + 长度 + 小端float32原始字节，矩阵内存直接拼接，不产生逐个元素的Python float。
+
+    Args:
+        vectors: 形状为(行数, 维度)的矩阵
+
+    Returns:
+        bytes: 可以直接MergeFromString到FieldData.vectors.float_vector的字节
+    """
+    data = np.ascontiguousarray(vectors, dtype="<f4")
+    return b"".join([b"\x0a", _varint(data.nbytes), memoryview(data).cast("B")])
+
+
+class ColumnInserter:
+    """
+    按列写入Milvus
+
+    LangChain的add_texts和行式insert会把每条记录转换为dict和逐个Python float的向量列表，
+    pymilvus序列化时再逐个元素拷贝一次；按列写入时：
+    - 向量保持为连续的float32矩阵，直接编码为protobuf的packed float字节（一次内存拷贝）
+    - 标量字段按列交给pymilvus校验（类型、max_length等）和序列化，不构建逐行dict
+    - 非nullable的VARCHAR字段中的缺失值（None）写为空字符串，与批量导入（bulk_import）的处理一致
+
+    组装好的InsertRequest通过Collection.insert的insert_param参数发送，
+    连接、重试和时间戳更新仍走pymilvus原有流程。
+    """
+
+    def __init__(self, collection: "Collection", vector_field: Optional[str] = None):
+        """
+        初始化写入器
+
+        Args:
+            collection: 目标集合
+            vector_field: 向量字段名，为None时使用集合中唯一的FLOAT_VECTOR字段
+
+        Raises:
+            ValueError: 集合中没有（或有多个而未指定）FLOAT_VECTOR字段
+        """
+        from pymilvus import DataType
+
+        self.collection = collection
+        schema = collection.schema
+        self._fields_info = schema.to_dict()["fields"]
+        # 需要写入的字段（不含自增主键和函数输出字段），顺序与集合结构一致
+        fields = [
+            f for f in schema.fields
+            if not (f.is_primary and f.auto_id) and not getattr(f, "is_function_output", False)
+        ]
+        vector_fields = [f for f in fields if f.dtype == DataType.FLOAT_VECTOR]
+        if vector_field is None:
+            if len(vector_fields) != 1:
+                raise ValueError(f"集合{collection.name}有{len(vector_fields)}个FLOAT_VECTOR字段，需要指定vector_field")
+            vector_field = vector_fields[0].name
+        vector_schema = next((f for f in vector_fields if f.name == vector_field), None)
+        if vector_schema is None:
+            raise ValueError(f"集合{collection.name}中没有FLOAT_VECTOR字段{vector_field}")
+
+        self.vector_field = vector_field
+        self.dim = int(vector_schema.params["dim"])
+        self._scalar_fields = [(f.name, f.dtype) for f in fields if f.name != vector_field]
+        # 缺失值需要写为空字符串的字段（pymilvus对非nullable字段中的None直接报ParamError）
+        self._empty_string_fields = {
+            f.name for f in fields if f.dtype == DataType.VARCHAR and not getattr(f, "nullable", False)
+        }
+        self._vector_type = vector_schema.dtype
+        # Collection.insert会先按集合结构检查列数，再使用insert_param中已组装好的请求
+        self._placeholder: List[Any] = [
+            np.empty((0, self.dim), dtype=np.float32) if f.name == vector_field else []
+            for f in fields
+        ]
+
+    @property
+    def scalar_fields(self) -> List[str]:
+        """除向量外需要提供的字段名（按集合结构顺序）"""
+        return [name for name, _ in self._scalar_fields]
+
+    @property
+    def field_types(self) -> Dict[str, Any]:
+        """除向量外各字段的pymilvus DataType"""
+        return dict(self._scalar_fields)
+
+    def build_request(
+        self,
+        columns: Dict[str, Sequence[Any]],
+        vectors: np.ndarray,
+        partition_name: Optional[str] = None
+    ) -> "InsertRequest":
+        """
+        组装按列写入的InsertRequest
+
+        Args:
+            columns: 标量字段 {字段名: 整列取值}，须包含scalar_fields中的全部字段，多余的字段忽略
+            vectors: 形状为(行数, dim)的向量矩阵
+            partition_name: 分区名，为None时写入默认分区
+
+        Returns:
+            InsertRequest
+
+        Raises:
+            ValueError: 缺少字段、行数不一致或向量维度不匹配
+        """
+        from pymilvus.client.prepare import Prepare
+
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"向量矩阵形状{vectors.shape}与字段{self.vector_field}的维度{self.dim}不匹配")
+        missing = [name for name in self.scalar_fields if name not in columns]
+        if missing:
+            raise ValueError(f"缺少字段: {missing}")
+
+        num_rows = len(vectors)
+        entities = []
+        for name, dtype in self._scalar_fields:
+            values = columns[name]
+            values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+            if len(values) != num_rows:
+                raise ValueError(f"字段{name}的行数{len(values)}与向量数{num_rows}不一致")
+            if name in self._empty_string_fields and None in values:
+                values = ["" if value is None else value for value in values]
+            entities.append({"name": name, "type": dtype, "values": values})
+        # 向量先以空列表交给pymilvus（只设置维度），再直接填入packed字节
+        entities.append({"name": self.vector_field, "type": self._vector_type, "values": []})
+
+        request = Prepare.batch_insert_param(
+            self.collection.name, entities, partition_name or "", self._fields_info
+        )
+        vector_data = next(fd for fd in request.fields_data if fd.field_name == self.vector_field)
+        vector_data.vectors.dim = self.dim
+        vector_data.vectors.float_vector.MergeFromString(packed_float_array(vectors))
+        request.num_rows = num_rows
+        return request
+
+    def insert(
+        self,
+        columns: Dict[str, Sequence[Any]],
+        vectors: np.ndarray,
+        partition_name: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> "MutationResult":
+        """
+        按列写入一批数据
+
+        Args:
+            columns: 标量字段 {字段名: 整列取值}
+            vectors: 形状为(行数, dim)的float32向量矩阵
+            partition_name: 分区名
+            timeout: RPC超时时间（秒）
+
+        Returns:
+            MutationResult: 写入结果（insert_count、primary_keys）
+        """
+        request = self.build_request(columns, vectors, partition_name)
+        return self.collection.insert(
+            self._placeholder, partition_name=partition_name, timeout=timeout, insert_param=request
+        )
+# ai code end
@@ -0,0 +1,262 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from base.metrics import metrics
+
+
+# ai code begin && nums:254
+# 批大小分布统计的分桶上界
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+BATCH_SIZE = metrics.histogram(
+    "risk_rag_embedding_batch_size", "每次合批Embedding请求的去重文本数", buckets=BATCH_SIZE_BUCKETS
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "risk_rag_embedding_queue_wait_seconds", "查询文本在微批队列中的等待时间（秒）"
+)
+BATCH_REQUEST_SECONDS = metrics.histogram(
+    "risk_rag_embedding_batch_request_seconds", "合批Embedding请求耗时（秒）"
+)
+CACHE_HITS = metrics.counter(
+    "risk_rag_embedding_cache_hits_total", "查询向量LRU缓存命中次数"
+)
+
+
+class EmbeddingMicroBatcher:
+    """
+    查询向量化微批调度器
+
+    并发请求各自提交单条查询文本，调度器在一个很短的时间窗口内（默认几毫秒）
+    或攒够max_batch_size条后，把它们合并成一次批量Embedding请求，
+    再把每条向量分发回对应调用方。这样同样的Azure配额可以支撑更高的QPS。
+
+    同一窗口内的重复文本只向量化一次；另外保留一个小的LRU缓存，
+    近期查询过的文本直接命中缓存，不再进入队列。
+    """
+
+    def __init__(
+        self,
+        embeddings_provider: Callable[[], Any],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        cache_size: int = 2048
+    ):
+        """
+        初始化微批调度器
+
+        Args:
+            embeddings_provider: 返回LangChain Embeddings对象的无参函数（延迟获取共享客户端）
+            max_batch_size: 单次批量请求的最大文本数
+            max_wait_ms: 第一条文本入队后最多等待的毫秒数
+            cache_size: 查询向量LRU缓存条数，0表示不缓存
+        """
+        self._embeddings_provider = embeddings_provider
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 进行中的批量请求任务（事件循环只持有弱引用，需自行保留直到完成）
+        self._flush_tasks: Set[asyncio.Task] = set()
+        # 统计信息
+        self.batches = 0
+        self.items = 0
+        self.cache_hits = 0
+        self.batch_size_counts: Dict[int, int] = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def configure(
+        self,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        cache_size: Optional[int] = None
+    ):
+        """
+        运行中调整合批参数和缓存大小（配置热更新时调用），下一批起生效
+
+        可以在任意线程调用（配置监听线程）：LRU缓存只在调度器的事件循环中读写，
+        缩小缓存时的淘汰通过call_soon_threadsafe交给该事件循环执行，
+        不会与请求中的缓存读取（get与move_to_end之间）交错。
+
+        Args:
+            max_batch_size: 单次批量请求的最大文本数
+            max_wait_ms: 第一条文本入队后最多等待的毫秒数
+            cache_size: 查询向量LRU缓存条数，缩小时淘汰多出的条目
+        """
+        if max_batch_size is not None:
+            self.max_batch_size = max_batch_size
+        if max_wait_ms is not None:
+            self.max_wait_ms = max_wait_ms
+        if cache_size is not None:
+            self.cache_size = cache_size
+            loop = self._loop
+            if loop is not None and loop.is_running() and not self._in_loop(loop):
+                loop.call_soon_threadsafe(self._trim_cache)
+            else:
+                self._trim_cache()
+
+    @staticmethod
+    def _in_loop(loop: asyncio.AbstractEventLoop) -> bool:
+        """当前线程是否正在运行loop"""
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    def _trim_cache(self):
+        """淘汰超出cache_size的最久未使用条目"""
+        while len(self._cache) > max(self.cache_size, 0):
+            self._cache.popitem(last=False)
+
+    def _ensure_worker(self):
+        """在当前事件循环中启动后台批处理任务（事件循环变化时重建队列）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        向量化单条查询文本（与其他并发调用合批）
+
+        Args:
+            text: 查询文本
+
+        Returns:
+            List[float]: 查询向量
+        """
+        if not text or not text.strip():
+            raise ValueError("查询文本不能为空")
+
+        cached = self._cache_get(text)
+        if cached is not None:
+            self.cache_hits += 1
+            CACHE_HITS.inc()
+            return cached
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def prime(self, texts: List[str]) -> int:
+        """
+        预热缓存：一次批量请求向量化尚未缓存的文本并写入LRU缓存
+
+        不经过合批队列，也不计入命中统计；texts按热度从高到低排列时，
+        最热的文本最后写入，在LRU中最晚被淘汰。
+
+        Args:
+            texts: 待预热的查询文本
+
+        Returns:
+            int: 实际向量化的文本数
+        """
+        if self.cache_size <= 0:
+            return 0
+        missing = [text for text in dict.fromkeys(texts) if text and text.strip() and text not in self._cache]
+        if not missing:
+            return 0
+        with BATCH_REQUEST_SECONDS.time():
+            vectors = await self._embeddings_provider().aembed_documents(missing)
+        for text, vector in reversed(list(zip(missing, vectors))):
+            self._cache_put(text, vector)
+        return len(missing)
+
+    async def _run(self):
+        """后台批处理循环：收集一个窗口内的请求并批量向量化"""
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # 批量请求在独立任务中执行，不阻塞下一批的收集
+            task = self._loop.create_task(self._flush(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        """发送一次批量Embedding请求，并把结果分发给各调用方"""
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            wait = now - enqueued_at
+            QUEUE_WAIT_SECONDS.observe(wait)
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+
+        # 同一批内的重复文本只请求一次
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self._record_batch(len(unique_texts), len(batch))
+        try:
+            with BATCH_REQUEST_SECONDS.time():
+                vectors = await self._embeddings_provider().aembed_documents(unique_texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, vector in by_text.items():
+            self._cache_put(text, vector)
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def _record_batch(self, request_size: int, item_count: int):
+        """记录批大小分布"""
+        self.batches += 1
+        self.items += item_count
+        BATCH_SIZE.observe(request_size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if request_size <= bucket:
+                self.batch_size_counts[bucket] += 1
+                return
+        self.batch_size_counts[BATCH_SIZE_BUCKETS[-1]] += 1
+
+    def _cache_get(self, text: str) -> Optional[List[float]]:
+        """读取LRU缓存"""
+        vector = self._cache.get(text)
+        if vector is not None:
+            self._cache.move_to_end(text)
+        return vector
+
+    def _cache_put(self, text: str, vector: List[float]):
+        """写入LRU缓存，超出容量时淘汰最久未使用的条目"""
+        if self.cache_size <= 0:
+            return
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取调度器统计信息
+
+        Returns:
+            Dict: 批次数、文本数、平均批大小、批大小分布、排队等待时间和缓存命中数
+        """
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_counts": dict(self.batch_size_counts),
+            "queue_wait_avg_ms": self.queue_wait_total / self.items * 1000 if self.items else 0.0,
+            "queue_wait_max_ms": self.queue_wait_max * 1000,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._cache)
+        }
+# ai code end
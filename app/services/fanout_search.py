@@ -0,0 +1,179 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from app.services.vector_service import VectorService
+from base.config import get_config
+
+
+# ai code begin && nums:148
+
+def normalize_score(score: float, metric_type: str) -> float:
+    """
+    将不同度量的原始分数统一换算为[0, 1]区间的相似度（越大越相似）
+
+    所有集合使用同一个Embedding模型且向量已归一化，
+    因此L2距离可以换算为余弦相似度，不同集合之间的分数可以直接比较。
+
+    Args:
+        score: Milvus返回的原始分数
+        metric_type: 距离度量类型（L2/IP/COSINE）
+
+    Returns:
+        float: 归一化后的相似度
+    """
+    if metric_type == "L2":
+        # Milvus的L2返回平方欧氏距离，单位向量下 d = 2 - 2cos
+        cosine = 1.0 - float(score) / 2.0
+    else:
+        cosine = float(score)
+    return max(0.0, min(1.0, (cosine + 1.0) / 2.0))
+
+
+class FanoutSearchService:
+    """
+    多集合并发检索服务
+
+    查询文本只向量化一次，然后并发检索多个集合，
+    按归一化分数合并排序，每条结果标注来源集合。
+    """
+
+    def __init__(
+        self,
+        collection_names: Optional[List[str]] = None,
+        max_workers: Optional[int] = None
+    ):
+        """
+        初始化多集合检索服务
+
+        Args:
+            collection_names: 需要检索的集合列表，默认为配置FANOUT_COLLECTIONS（法规库、产品库和FDA库）
+            max_workers: 并发检索线程数，默认与集合数量相同
+        """
+        self.collection_names = list(collection_names or get_config().FANOUT_COLLECTIONS)
+        # 每个集合持有一个检索服务，句柄和Embedding客户端由注册表共享
+        self._services: Dict[str, VectorService] = {
+            name: VectorService(collection_name=name) for name in self.collection_names
+        }
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(self.collection_names),
+            thread_name_prefix="fanout-search"
+        )
+
+    def _search_one(
+        self,
+        collection_name: str,
+        embedding: List[float],
+        top_k: int,
+        search_params: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """检索单个集合，并为每条结果标注来源和归一化分数"""
+        service = self._services[collection_name]
+        metric_type = service.get_metric_type()
+        hits = []
+        for doc, score in service.search_with_scores_by_vector(embedding, top_k, search_params):
+            hits.append({
+                "collection": collection_name,
+                "content": doc.page_content,
+                "metadata": doc.metadata,
+                "score": normalize_score(score, metric_type),
+                "raw_score": float(score)
+            })
+        return hits
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        collection_names: Optional[List[str]] = None,
+        per_collection_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        并发检索多个集合并合并排序
+
+        Args:
+            query: 查询文本
+            top_k: 合并后返回的结果数量，默认10
+            collection_names: 本次检索的集合，默认为初始化时的全部集合
+            per_collection_k: 每个集合检索的数量，默认与top_k相同
+            search_params: 按集合名指定的检索参数，如{"liangou_regulations": {"ef": 128}}
+
+        Returns:
+            List[Dict]: 合并后的结果列表，每个字典包含rank、collection、content、metadata、score和raw_score
+        """
+        names = self._resolve_collections(collection_names)
+        # 查询只向量化一次，所有集合共用
+        embedding = self._services[names[0]].embed_query(query)
+        return self.search_by_vector(embedding, top_k, names, per_collection_k, search_params)
+
+    def search_by_vector(
+        self,
+        embedding: List[float],
+        top_k: int = 10,
+        collection_names: Optional[List[str]] = None,
+        per_collection_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        使用已计算好的查询向量并发检索多个集合并合并排序
+
+        参数与返回值同search，query替换为查询向量
+        """
+        names = self._resolve_collections(collection_names)
+        k = per_collection_k or top_k
+        params = search_params or {}
+
+        futures = [
+            self._executor.submit(self._search_one, name, embedding, k, params.get(name))
+            for name in names
+        ]
+        hits = []
+        for future in futures:
+            hits.extend(future.result())
+        return self._merge(hits, top_k)
+
+    async def search_async(
+        self,
+        query: str,
+        top_k: int = 10,
+        collection_names: Optional[List[str]] = None,
+        per_collection_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        异步并发检索多个集合
+
+        查询向量化经过微批调度器与其他并发请求合批，检索在线程池中执行，不阻塞事件循环。
+        参数与返回值同search
+        """
+        names = self._resolve_collections(collection_names)
+        if not query or not query.strip():
+            raise ValueError("查询文本不能为空")
+
+        embedding = await self._services[names[0]].registry.get_embedding_batcher().embed(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.search_by_vector(embedding, top_k, names, per_collection_k, search_params)
+        )
+
+    def _resolve_collections(self, collection_names: Optional[List[str]]) -> List[str]:
+        """确定本次检索的集合，并检查是否都已初始化"""
+        names = collection_names or self.collection_names
+        unknown = [name for name in names if name not in self._services]
+        if unknown:
+            raise ValueError(f"未初始化的集合: {unknown}")
+        return names
+
+    @staticmethod
+    def _merge(hits: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """按归一化分数降序合并，并重新编号rank"""
+        merged = sorted(hits, key=lambda hit: hit["score"], reverse=True)[:top_k]
+        for i, hit in enumerate(merged, 1):
+            hit["rank"] = i
+        return merged
+
+    def close(self):
+        """关闭检索线程池"""
+        self._executor.shutdown(wait=False)
+# ai code end
@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+from base.config import get_config
+
+
+# ai code begin && nums:166
+# 超过该长度的查询（整段商品描述等）不计入统计，它们几乎不会重复
+MAX_QUERY_LENGTH = 512
+
+
+class QuerySketch:
+    """
+    高频查询统计（count-min sketch + top-K）
+
+    count-min sketch用固定大小的计数表估计任意查询的出现次数（只会高估，不会低估），
+    另外保留估计次数最高的capacity个 (集合, 查询) 作为热点候选。
+    内存占用固定（默认4x4096的计数表加上候选表），与查询总量无关；
+    支持按半衰期衰减，使统计偏向近期的热点；可以保存到文件，重启后用于缓存预热。
+    """
+
+    def __init__(self, capacity: int = 1000, width: int = 4096, depth: int = 4, half_life: float = 86400.0):
+        """
+        初始化统计
+
+        Args:
+            capacity: 保留的热点查询数
+            width: 计数表每行的宽度，越大估计越准
+            depth: 计数表行数（独立哈希函数个数）
+            half_life: 计数衰减一半所需的秒数，0表示不衰减
+        """
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self._table = np.zeros((depth, width), dtype=np.float64)
+        self._rows = np.arange(depth)
+        self._top: Dict[Tuple[str, str], float] = {}
+        # 候选表中最小计数的下界：新查询的估计值不超过它时无需查找最小值
+        self._min_count = 0.0
+        self._lock = threading.Lock()
+        self._decayed_at = time.time()
+        self.total = 0.0
+
+    def _cells(self, collection: str, query: str) -> List[int]:
+        """每行的计数位置（稳定哈希，保存到文件后重启仍然有效）"""
+        digest = hashlib.blake2b(f"{collection}\x1f{query}".encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * i:4 * i + 4], "little") % self.width for i in range(self.depth)]
+
+    def record(self, collection: str, query: str, count: float = 1.0):
+        """
+        记录一次查询
+
+        Args:
+            collection: 集合名称
+            query: 查询文本（与查询向量缓存一样按原文计数）
+            count: 计数
+        """
+        if not query or len(query) > MAX_QUERY_LENGTH or self.capacity <= 0:
+            return
+        cells = self._cells(collection, query)
+        key = (collection, query)
+        with self._lock:
+            self._table[self._rows, cells] += count
+            estimate = float(self._table[self._rows, cells].min())
+            self.total += count
+            if key in self._top or len(self._top) < self.capacity:
+                self._top[key] = estimate
+                if len(self._top) == self.capacity and self._min_count == 0.0:
+                    self._min_count = min(self._top.values())
+                return
+            if estimate <= self._min_count:
+                return
+            coldest = min(self._top, key=self._top.__getitem__)
+            self._min_count = self._top[coldest]
+            if estimate > self._min_count:
+                del self._top[coldest]
+                self._top[key] = estimate
+                self._min_count = min(self._top.values())
+
+    def estimate(self, collection: str, query: str) -> float:
+        """估计查询的出现次数"""
+        cells = self._cells(collection, query)
+        with self._lock:
+            return float(self._table[self._rows, cells].min())
+
+    def top(self, n: int) -> List[Tuple[str, str, float]]:
+        """
+        出现次数最多的n个查询
+
+        Returns:
+            List: [(集合, 查询, 估计次数), ...]，按次数从高到低
+        """
+        with self._lock:
+            items = sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(collection, query, count) for (collection, query), count in items]
+
+    def decay(self, now: Optional[float] = None):
+        """按距离上次衰减经过的时间和半衰期衰减所有计数"""
+        now = time.time() if now is None else now
+        with self._lock:
+            elapsed = now - self._decayed_at
+            self._decayed_at = now
+            if self.half_life <= 0 or elapsed <= 0:
+                return
+            factor = 0.5 ** (elapsed / self.half_life)
+            self._table *= factor
+            for key in self._top:
+                self._top[key] *= factor
+            self._min_count *= factor
+            self.total *= factor
+
+    def __len__(self) -> int:
+        return len(self._top)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化（计数表按float32保存）"""
+        with self._lock:
+            return {
+                "width": self.width,
+                "depth": self.depth,
+                "decayed_at": self._decayed_at,
+                "total": self.total,
+                "table": base64.b64encode(self._table.astype(np.float32).tobytes()).decode("ascii"),
+                "top": [[collection, query, count] for (collection, query), count in self._top.items()]
+            }
+
+    def load_dict(self, data: Dict[str, Any]):
+        """
+        从序列化结果恢复（计数表尺寸不同时只恢复热点候选）
+
+        Args:
+            data: to_dict的结果
+        """
+        with self._lock:
+            if data.get("width") == self.width and data.get("depth") == self.depth:
+                table = np.frombuffer(base64.b64decode(data["table"]), dtype=np.float32)
+                self._table = table.reshape(self.depth, self.width).astype(np.float64)
+            top = sorted(data.get("top", []), key=lambda item: item[2], reverse=True)[:self.capacity]
+            self._top = {(collection, query): float(count) for collection, query, count in top}
+            self._min_count = min(self._top.values()) if len(self._top) >= self.capacity else 0.0
+            self._decayed_at = float(data.get("decayed_at", time.time()))
+            self.total = float(data.get("total", 0.0))
+
+    def save(self, path: str):
+        """原子写入文件（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(self.to_dict()))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        从文件恢复
+
+        Returns:
+            bool: 文件存在且读取成功
+        """
+        try:
+            with open(path, "rb") as f:
+                data = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return False
+        self.load_dict(data)
+        return True
+
+
+# 进程内共享的查询统计，VectorService检索时记录，CacheWarmer读取
+query_sketch = QuerySketch(
+    capacity=get_config().QUERY_SKETCH_TOP_K,
+    half_life=get_config().QUERY_SKETCH_HALF_LIFE
+)
+# ai code end
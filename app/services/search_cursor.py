@@ -0,0 +1,188 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import orjson
+from base.config import get_config
+
+
+# ai code begin && nums:173
+# 游标格式版本，格式变化后旧游标直接判为无效
+CURSOR_VERSION = 1
+# 分数越大越相似的度量，其余（L2等）分数越小越相似
+SIMILARITY_METRICS = ("IP", "COSINE")
+# 范围检索必须同时指定radius（外边界），取float32能表示的极值表示不限制
+_FAR_BOUND = 3.0e38
+# 每页结果数上限（与SearchPageRequest.page_size的上限一致）
+MAX_PAGE_SIZE = 100
+# 未配置SEARCH_CURSOR_SECRET时本进程使用的随机签名密钥（游标只能由签发它的进程解析）
+_PROCESS_SECRET = os.urandom(32)
+
+
+def _signing_key() -> bytes:
+    """游标签名密钥：配置SEARCH_CURSOR_SECRET，未配置时为本进程的随机密钥"""
+    secret = get_config().SEARCH_CURSOR_SECRET
+    return secret.encode("utf-8") if secret else _PROCESS_SECRET
+
+
+def _sign(body: bytes) -> str:
+    """对游标内容做HMAC-SHA256签名"""
+    digest = hmac.new(_signing_key(), body, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def _is_scalar_id(value: Any) -> bool:
+    """主键只能是字符串或整数"""
+    return isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+class SearchCursor:
+    """
+    分页检索游标
+
+    游标自包含翻页需要的全部状态，编码为带HMAC签名的不透明字符串交给客户端（客户端无法改写）：
+    - 首页计算好的查询向量（float32），翻页时不再向量化
+    - 已返回的结果数、上一页最后一条结果的分数（边界）和分数恰好等于边界的主键
+
+    翻页时用范围检索（range_filter=边界）只取边界之后的结果，并排除边界上已返回的主键，
+    每页只取一页的数据；offset分页每页都要重新取出并丢弃前面的全部结果，深翻页总开销是平方级的。
+    服务端不保存状态，翻页请求可以由任意worker处理。
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        query: str,
+        vector: Sequence[float],
+        page_size: int,
+        search_params: Optional[Dict[str, Any]] = None,
+        returned: int = 0,
+        bound: Optional[float] = None,
+        boundary_ids: Optional[List[Any]] = None,
+        expires_at: Optional[float] = None
+    ):
+        """
+        初始化游标
+
+        Args:
+            collection: 集合名称
+            query: 查询文本（只用于响应中回显）
+            vector: 查询向量
+            page_size: 每页结果数
+            search_params: 检索参数，每页沿用
+            returned: 已返回的结果数
+            bound: 上一页最后一条结果的分数，首页为None
+            boundary_ids: 分数等于bound且已返回的主键
+            expires_at: 过期时间（时间戳），默认为当前时间加配置SEARCH_CURSOR_TTL
+        """
+        self.collection = collection
+        self.query = query
+        self.vector = np.asarray(vector, dtype=np.float32)
+        self.page_size = page_size
+        self.search_params = search_params
+        self.returned = returned
+        self.bound = bound
+        self.boundary_ids = list(boundary_ids or [])
+        self.expires_at = expires_at if expires_at is not None else time.time() + get_config().SEARCH_CURSOR_TTL
+
+    def range_params(self, metric_type: str) -> Dict[str, float]:
+        """
+        翻页的范围检索参数：只取比边界更不相似（或相同）的结果
+
+        L2：range_filter <= 距离 < radius；IP/COSINE：radius < 分数 <= range_filter
+        """
+        if metric_type.upper() in SIMILARITY_METRICS:
+            radius = -1.0 if metric_type.upper() == "COSINE" else -_FAR_BOUND
+        else:
+            radius = _FAR_BOUND
+        return {"radius": radius, "range_filter": self.bound}
+
+    def advance(self, results: List[tuple], pk_field: str):
+        """
+        按本页结果推进游标
+
+        Args:
+            results: 本页的 (Document, score) 列表（按相似度从高到低）
+            pk_field: 主键字段名（结果元数据中的主键）
+        """
+        if not results:
+            return
+        self.returned += len(results)
+        last = float(results[-1][1])
+        ids = [doc.metadata.get(pk_field) for doc, score in results if float(score) == last]
+        ids = [pk for pk in ids if pk is not None]
+        # 整页分数相同时边界不变，需要继续排除之前边界上的结果
+        self.boundary_ids = self.boundary_ids + ids if last == self.bound else ids
+        self.bound = last
+
+    def encode(self) -> str:
+        """编码为签名的游标字符串 内容.签名（每次编码顺延有效期）"""
+        self.expires_at = time.time() + get_config().SEARCH_CURSOR_TTL
+        payload = {
+            "v": CURSOR_VERSION,
+            "c": self.collection,
+            "q": self.query,
+            "p": self.page_size,
+            "s": self.search_params,
+            "n": self.returned,
+            "b": self.bound,
+            "i": self.boundary_ids,
+            "e": self.expires_at,
+            "x": base64.b64encode(self.vector.astype("<f4").tobytes()).decode("ascii")
+        }
+        body = base64.urlsafe_b64encode(orjson.dumps(payload)).decode("ascii").rstrip("=")
+        return f"{body}.{_sign(body.encode('ascii'))}"
+
+    @classmethod
+    def decode(cls, token: str) -> "SearchCursor":
+        """
+        解析游标字符串
+
+        Args:
+            token: encode的结果
+
+        Returns:
+            SearchCursor: 游标
+
+        Raises:
+            ValueError: 游标无效（格式错误、签名不匹配、字段越界）或已过期
+        """
+        try:
+            body, signature = token.split(".")
+            if not hmac.compare_digest(signature, _sign(body.encode("ascii"))):
+                raise ValueError
+            payload = orjson.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+            if payload.get("v") != CURSOR_VERSION:
+                raise ValueError
+            vector = np.frombuffer(base64.b64decode(payload["x"]), dtype="<f4")
+            cursor = cls(
+                collection=payload["c"],
+                query=payload["q"],
+                vector=vector,
+                page_size=int(payload["p"]),
+                search_params=payload.get("s"),
+                returned=int(payload["n"]),
+                bound=payload.get("b"),
+                boundary_ids=payload.get("i"),
+                expires_at=float(payload["e"])
+            )
+            # 签名之外再校验字段范围，防止密钥泄露或旧版本签发的游标越界
+            if (
+                not 1 <= cursor.page_size <= MAX_PAGE_SIZE
+                or cursor.returned < 0
+                or (cursor.bound is not None and not math.isfinite(cursor.bound))
+                or not all(_is_scalar_id(pk) for pk in cursor.boundary_ids)
+                or (cursor.search_params is not None and not isinstance(cursor.search_params, dict))
+            ):
+                raise ValueError
+        except (ValueError, KeyError, TypeError, UnicodeEncodeError, binascii.Error, orjson.JSONDecodeError):
+            raise ValueError("无效的分页游标")
+        if cursor.expires_at < time.time():
+            raise ValueError("分页游标已过期，请重新检索")
+        return cursor
+# ai code end
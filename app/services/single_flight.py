@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+# ai code begin && nums:77
+class _Flight:
+    """一次正在执行的调用：执行任务和当前等待者数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    单飞请求合并器
+
+    同一时刻相同key的并发请求只会真正执行一次后端调用，
+    其余请求等待并共享同一个结果（或同一个异常）。
+    调用完成后key立即释放，后续请求会重新执行。
+
+    后端调用在独立的任务中执行，不属于任何一个调用方：某个等待者（包括首个请求）
+    被取消（客户端断开、超时）时只有它自己退出，其余等待者照常拿到结果；
+    最后一个等待者离开时才取消后端调用。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        # 统计信息：真正执行的次数和被合并的次数
+        self.calls = 0
+        self.shared = 0
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        """后端调用结束：释放key，并取走异常避免"exception was never retrieved"告警"""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行（或合并）一次调用
+
+        Args:
+            key: 请求去重的key，相同key的并发请求会被合并
+            func: 无参协程工厂函数，只有第一个请求会调用它
+
+        Returns:
+            后端调用的结果
+        """
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            # shield：等待者被取消时不取消共享的后端调用
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 最后一个等待者也离开了，结果不再有人需要
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                flight.task.cancel()
+
+    def inflight_count(self) -> int:
+        """当前正在执行的不同请求数量"""
+        return len(self._inflight)
+# ai code end
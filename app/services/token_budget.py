@@ -0,0 +1,282 @@
+import asyncio
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from base.metrics import metrics
+
+
+# ai code begin && nums:272
+# Azure OpenAI Embedding接口的限制：单条输入最多8191个token，单次请求最多2048条输入
+MAX_TOKENS_PER_TEXT = 8191
+MAX_ITEMS_PER_REQUEST = 2048
+# 单次请求的token预算（所有输入之和），请求越大单位token的请求开销越小
+DEFAULT_TOKENS_PER_REQUEST = 100_000
+OVERFLOW_POLICIES = ("split", "truncate")
+
+EMBEDDING_REQUESTS = metrics.counter("risk_rag_embedding_requests_total", "发送的Embedding请求数")
+EMBEDDING_TOKENS = metrics.counter("risk_rag_embedding_tokens_total", "发送的Embedding token数（估算或精确计数）")
+EMBEDDING_OVERFLOW = metrics.counter("risk_rag_embedding_overflow_total", "超长文本处理次数", ["policy"])
+
+
+class TokenCounter:
+    """
+    Token计数器
+
+    优先使用tiktoken（与Embedding模型相同的cl100k_base编码）；
+    未安装tiktoken或编码文件无法下载时退化为保守估算：
+    中日韩字符按UTF-8字节数计（cl100k_base是字节级BPE，一个字符的token数不会超过其字节数，
+    常用汉字约1个token，生僻字会拆成2~3个），其余字符按每3个字节1个token（英文平均约4个字节1个token）。
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        try:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception:
+            self._encoding = None
+
+    @property
+    def exact(self) -> bool:
+        """是否使用tiktoken精确计数"""
+        return self._encoding is not None
+
+    @staticmethod
+    def _char_cost(ch: str) -> float:
+        """估算模式下单个字符的token数：中日韩字符取上界（UTF-8字节数），其余按字节数/3"""
+        size = len(ch.encode("utf-8"))
+        return size if ord(ch) >= 0x2E80 else size / 3
+
+    @staticmethod
+    def _estimate(text: str) -> int:
+        """估算token数（中日韩字符取上界，生僻字较多时也不会低估）"""
+        total_bytes = len(text.encode("utf-8"))
+        cjk_bytes = sum(len(ch.encode("utf-8")) for ch in text if ord(ch) >= 0x2E80)
+        return cjk_bytes + math.ceil((total_bytes - cjk_bytes) / 3)
+
+    def count(self, text: str) -> int:
+        """计算文本的token数"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return self._estimate(text)
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """
+        把超长文本切成不超过max_tokens的若干段
+
+        Args:
+            text: 原始文本
+            max_tokens: 每段最大token数
+
+        Returns:
+            List[str]: 切分后的文本段
+        """
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return [self._encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+        # 估算模式下按字符累加（与_estimate的计法一致），段内估算值不超过上限
+        chunks, start, used = [], 0, 0.0
+        for i, ch in enumerate(text):
+            cost = self._char_cost(ch)
+            if used + cost > max_tokens and i > start:
+                chunks.append(text[start:i])
+                start, used = i, 0.0
+            used += cost
+        chunks.append(text[start:])
+        return chunks
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """截断到不超过max_tokens"""
+        return self.split(text, max_tokens)[0]
+
+
+class TokenBudgetEmbeddings(Embeddings):
+    """
+    按token预算打包请求的Embedding包装器
+
+    - 按原始顺序把文本装进请求，直到达到单次请求的token预算或条数上限，
+      短标题不再按固定条数浪费请求次数，长文本也不会让整批超限失败
+    - 超过单条上限的文本按策略处理：split切段后按token数加权平均并归一化，truncate直接截断
+    - 统计请求数、文本数、token数以及切分/截断次数
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_tokens_per_request: int = DEFAULT_TOKENS_PER_REQUEST,
+        max_items_per_request: int = MAX_ITEMS_PER_REQUEST,
+        max_tokens_per_text: int = MAX_TOKENS_PER_TEXT,
+        overflow: str = "split",
+        counter: Optional[TokenCounter] = None
+    ):
+        """
+        初始化包装器
+
+        Args:
+            embeddings: 实际发送请求的Embedding模型
+            max_tokens_per_request: 单次请求的token预算
+            max_items_per_request: 单次请求的最大条数
+            max_tokens_per_text: 单条输入的最大token数
+            overflow: 超长文本的处理策略，split或truncate
+            counter: token计数器，默认使用cl100k_base
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的超长文本策略: {overflow}")
+        self.embeddings = embeddings
+        self.max_tokens_per_request = max(max_tokens_per_request, max_tokens_per_text)
+        self.max_items_per_request = max_items_per_request
+        self.max_tokens_per_text = max_tokens_per_text
+        self.overflow = overflow
+        self.counter = counter or TokenCounter()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.tokens = 0
+        self.split_texts = 0
+        self.truncated_texts = 0
+
+    def _prepare(self, texts: List[str]) -> Tuple[List[str], List[int], List[List[int]]]:
+        """
+        处理超长文本
+
+        Returns:
+            Tuple: (实际发送的文本段, 每段token数, 每条原始文本对应的文本段下标)
+        """
+        pieces: List[str] = []
+        piece_tokens: List[int] = []
+        owners: List[List[int]] = []
+        split_count = truncated_count = 0
+        for text in texts:
+            tokens = self.counter.count(text)
+            if tokens <= self.max_tokens_per_text:
+                chunks = [text]
+            elif self.overflow == "truncate":
+                chunks = [self.counter.truncate(text, self.max_tokens_per_text)]
+                truncated_count += 1
+            else:
+                chunks = self.counter.split(text, self.max_tokens_per_text)
+                split_count += 1
+            owner = []
+            for chunk in chunks:
+                owner.append(len(pieces))
+                pieces.append(chunk)
+                piece_tokens.append(tokens if len(chunks) == 1 and chunk is text else self.counter.count(chunk))
+            owners.append(owner)
+        with self._lock:
+            self.split_texts += split_count
+            self.truncated_texts += truncated_count
+        if split_count:
+            EMBEDDING_OVERFLOW.inc(split_count, policy="split")
+        if truncated_count:
+            EMBEDDING_OVERFLOW.inc(truncated_count, policy="truncate")
+        return pieces, piece_tokens, owners
+
+    def pack(self, token_counts: List[int]) -> List[List[int]]:
+        """
+        按token预算和条数上限把输入装进请求（保持原始顺序）
+
+        Args:
+            token_counts: 每条输入的token数
+
+        Returns:
+            List[List[int]]: 每次请求包含的输入下标
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for i, tokens in enumerate(token_counts):
+            if current and (used + tokens > self.max_tokens_per_request or len(current) >= self.max_items_per_request):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def pack_texts(self, texts: List[str]) -> List[List[int]]:
+        """按token预算打包文本，返回每次请求包含的文本下标（超长文本按单条上限计）"""
+        return self.pack([min(self.counter.count(text), self.max_tokens_per_text) for text in texts])
+
+    def _record(self, batch_tokens: List[int]):
+        """记录一次请求"""
+        with self._lock:
+            self.requests += 1
+            self.texts += len(batch_tokens)
+            self.tokens += sum(batch_tokens)
+        EMBEDDING_REQUESTS.inc()
+        EMBEDDING_TOKENS.inc(sum(batch_tokens))
+
+    def _combine(self, vectors: List[List[float]], piece_tokens: List[int], owners: List[List[int]]) -> List[List[float]]:
+        """把切分后的多段向量按token数加权平均并归一化，还原为每条原始文本一个向量"""
+        results = []
+        for owner in owners:
+            if len(owner) == 1:
+                results.append(vectors[owner[0]])
+                continue
+            total = sum(piece_tokens[i] for i in owner) or 1
+            combined = [0.0] * len(vectors[owner[0]])
+            for i in owner:
+                weight = piece_tokens[i] / total
+                for dim, value in enumerate(vectors[i]):
+                    combined[dim] += value * weight
+            norm = math.sqrt(sum(value * value for value in combined)) or 1.0
+            results.append([value / norm for value in combined])
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """按token预算分批向量化"""
+        pieces, piece_tokens, owners = self._prepare(texts)
+        vectors: List[List[float]] = [[] for _ in pieces]
+        for batch in self.pack(piece_tokens):
+            result = self.embeddings.embed_documents([pieces[i] for i in batch])
+            self._record([piece_tokens[i] for i in batch])
+            for i, vector in zip(batch, result):
+                vectors[i] = vector
+        return self._combine(vectors, piece_tokens, owners)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """按token预算分批异步向量化，各批并发发送"""
+        pieces, piece_tokens, owners = self._prepare(texts)
+        batches = self.pack(piece_tokens)
+        results = await asyncio.gather(
+            *(self.embeddings.aembed_documents([pieces[i] for i in batch]) for batch in batches)
+        )
+        vectors: List[List[float]] = [[] for _ in pieces]
+        for batch, result in zip(batches, results):
+            self._record([piece_tokens[i] for i in batch])
+            for i, vector in zip(batch, result):
+                vectors[i] = vector
+        return self._combine(vectors, piece_tokens, owners)
+
+    def embed_query(self, text: str) -> List[float]:
+        """向量化查询文本（超长时同样按策略处理）"""
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """异步向量化查询文本"""
+        return (await self.aembed_documents([text]))[0]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取请求统计
+
+        Returns:
+            Dict: 请求数、文本数、token数、平均每次请求的条数和token数、切分/截断次数
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "tokens": self.tokens,
+                "avg_texts_per_request": self.texts / self.requests if self.requests else 0.0,
+                "avg_tokens_per_request": self.tokens / self.requests if self.requests else 0.0,
+                "split_texts": self.split_texts,
+                "truncated_texts": self.truncated_texts,
+                "exact_token_count": self.counter.exact
+            }
+# ai code end
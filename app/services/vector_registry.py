@@ -0,0 +1,310 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from dotenv import load_dotenv
+from base.config import Config, get_config
+from app.services.collection_schema import CollectionSchemaManager, schema_manager as default_schema_manager
+from app.services.collection_versions import CollectionVersionManager
+from app.services.embedding_batcher import EmbeddingMicroBatcher
+
+# langchain_openai / langchain_community / pymilvus 导入耗时较长，
+# 推迟到第一次真正创建客户端时再导入，缩短服务冷启动时间
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Milvus
+    from app.services.token_budget import TokenBudgetEmbeddings
+
+# 加载环境变量
+load_dotenv()
+
+
+# ai code begin && nums:203
+def get_milvus_connection_args() -> Dict[str, Any]:
+    """从环境变量读取Milvus连接参数"""
+    return {
+        "host": os.getenv("MILVUS_HOST"),
+        "port": os.getenv("MILVUS_PORT"),
+        "user": os.getenv("MILVUS_USER"),
+        "password": os.getenv("MILVUS_PASSWORD"),
+        "db_name": os.getenv("MILVUS_DB_NAME")
+    }
+
+
+class VectorServiceRegistry:
+    """
+    进程级向量检索句柄注册表
+
+    整个进程共享一个Embedding客户端和一个Milvus连接（gRPC通道本身支持并发复用），
+    每个集合保留一个常驻的向量库句柄，切换集合只需一次字典查找。
+    所有方法都是线程安全的，可供并发的API处理函数直接调用。
+    """
+
+    # Milvus连接别名，整个进程共用
+    CONNECTION_ALIAS = "risk_rag"
+
+    def __init__(self, schema_manager: Optional[CollectionSchemaManager] = None):
+        """
+        初始化注册表
+
+        Args:
+            schema_manager: 集合结构管理器，默认使用进程内共享的管理器
+        """
+        self.schema_manager = schema_manager or default_schema_manager
+        self._lock = threading.Lock()
+        self._embeddings: Optional["TokenBudgetEmbeddings"] = None
+        self._connected = False
+        self._stores: Dict[str, "Milvus"] = {}
+        # 每个集合一把锁，避免不同集合的句柄创建相互阻塞
+        self._store_locks: Dict[str, threading.Lock] = {}
+        # 预热状态：全部集合预热完成后才对外报告就绪
+        self._ready = threading.Event()
+        self._warmup_status: Dict[str, Dict[str, Any]] = {}
+        # 查询向量化微批调度器，所有异步检索共用；合批参数和缓存大小随配置热更新
+        config = get_config()
+        self._batcher = EmbeddingMicroBatcher(
+            self.get_embeddings,
+            max_batch_size=config.EMBED_BATCHER_MAX_BATCH_SIZE,
+            max_wait_ms=config.EMBED_BATCHER_MAX_WAIT_MS,
+            cache_size=config.EMBED_QUERY_CACHE_SIZE
+        )
+        config.on_reload(self._apply_config)
+
+    def _apply_config(self, config: Config, changes: Dict[str, Any]):
+        """配置热更新：调整微批调度器和Embedding请求打包参数"""
+        self._batcher.configure(
+            max_batch_size=config.EMBED_BATCHER_MAX_BATCH_SIZE,
+            max_wait_ms=config.EMBED_BATCHER_MAX_WAIT_MS,
+            cache_size=config.EMBED_QUERY_CACHE_SIZE
+        )
+        embeddings = self._embeddings
+        if embeddings is not None:
+            embeddings.max_tokens_per_request = max(config.EMBED_TOKENS_PER_REQUEST, embeddings.max_tokens_per_text)
+            embeddings.max_items_per_request = config.EMBED_MAX_ITEMS_PER_REQUEST
+
+    def get_embeddings(self) -> "TokenBudgetEmbeddings":
+        """获取共享的Embedding客户端（首次调用时创建）"""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from langchain_openai import AzureOpenAIEmbeddings
+                    from app.services.token_budget import TokenBudgetEmbeddings
+
+                    # 与存储时使用相同的模型，外层按token预算打包请求并处理超长文本
+                    config = get_config()
+                    self._embeddings = TokenBudgetEmbeddings(
+                        AzureOpenAIEmbeddings(
+                            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                            azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
+                            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                            api_version=os.getenv("AZURE_OPENAI_API_VERSION")
+                        ),
+                        max_tokens_per_request=config.EMBED_TOKENS_PER_REQUEST,
+                        max_items_per_request=config.EMBED_MAX_ITEMS_PER_REQUEST
+                    )
+        return self._embeddings
+
+    def get_embedding_batcher(self) -> EmbeddingMicroBatcher:
+        """获取共享的查询向量化微批调度器"""
+        return self._batcher
+
+    def get_connection_alias(self) -> str:
+        """获取共享的Milvus连接别名（首次调用时建立连接）"""
+        if not self._connected:
+            with self._lock:
+                if not self._connected:
+                    from pymilvus import connections
+
+                    connections.connect(alias=self.CONNECTION_ALIAS, **get_milvus_connection_args())
+                    self._connected = True
+        return self.CONNECTION_ALIAS
+
+    def get_vector_store(self, collection_name: str) -> "Milvus":
+        """
+        获取集合的常驻向量库句柄
+
+        Args:
+            collection_name: 集合名称
+
+        Returns:
+            Milvus: 该集合的向量库句柄（同一进程内复用同一个对象）
+        """
+        store = self._stores.get(collection_name)
+        if store is not None:
+            return store
+
+        with self._lock:
+            store_lock = self._store_locks.setdefault(collection_name, threading.Lock())
+        with store_lock:
+            store = self._stores.get(collection_name)
+            if store is None:
+                store = self._create_vector_store(collection_name)
+                self._stores[collection_name] = store
+        return store
+
+    def _create_vector_store(self, collection_name: str) -> "Milvus":
+        """创建集合的向量库句柄，复用共享的Embedding客户端和Milvus连接"""
+        from langchain_community.vectorstores import Milvus
+
+        # 先建立共享连接，LangChain会按地址和用户名复用已有连接而不再新建
+        self.get_connection_alias()
+
+        # 已声明结构的集合使用声明的字段名和索引参数，未声明的沿用LangChain默认值
+        store_kwargs = {}
+        if self.schema_manager.has_spec(collection_name):
+            spec = self.schema_manager.get_spec(collection_name)
+            store_kwargs = {
+                "index_params": spec.index.to_index_params(),
+                "search_params": self.schema_manager.search_params(collection_name),
+                "primary_field": spec.primary_field,
+                "text_field": spec.text_field,
+                "vector_field": spec.vector_field
+            }
+        return Milvus(
+            embedding_function=self.get_embeddings(),
+            connection_args=get_milvus_connection_args(),
+            collection_name=collection_name,
+            **store_kwargs
+        )
+
+    def resolve_collection(self, collection_name: str) -> Optional[str]:
+        """
+        集合名当前实际对应的集合
+
+        检索始终按业务集合名进行，集合名是别名时由Milvus解析到当前版本（蓝绿重建切换别名后立即生效），
+        这里只用于在就绪探针中展示当前服务的版本。
+
+        Returns:
+            Optional[str]: 版本集合名；普通集合返回自身；不存在时返回None
+        """
+        versions = CollectionVersionManager(self.schema_manager, using=self.get_connection_alias())
+        return versions.current_version(collection_name)
+
+    def list_collections(self) -> List[str]:
+        """返回已创建句柄的集合名称"""
+        return list(self._stores.keys())
+
+    def evict(self, collection_name: str):
+        """移除集合句柄（例如集合被重建后），下次访问时重新创建"""
+        with self._lock:
+            self._stores.pop(collection_name, None)
+
+    def warmup(
+        self,
+        collection_names: Optional[List[str]] = None,
+        warm_query: str = "warmup"
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        预热：建立连接、加载集合到内存并执行一次预热检索
+
+        Milvus在集合首次被检索时才把数据和索引加载进内存，
+        预热后第一条真实请求不再承担连接建立、集合加载和HTTPS握手的开销。
+
+        默认预热所有已声明的集合，其中Milvus中不存在（从未入库）的集合跳过并标记为missing，
+        不影响就绪（就绪探针报告为degraded）；显式指定的集合不存在时视为预热失败。
+
+        Args:
+            collection_names: 需要预热的集合，默认为所有已声明的集合
+            warm_query: 预热检索使用的查询文本
+
+        Returns:
+            Dict: 每个集合的预热结果，包含ok、elapsed以及失败时的error，跳过的集合missing为True
+        """
+        explicit = bool(collection_names)
+        names = collection_names or self.schema_manager.list_collections()
+        self._ready.clear()
+
+        # 预热查询向量只计算一次，同时完成到Azure的连接握手
+        embedding = self.get_embeddings().embed_query(warm_query)
+        all_ok = True
+        for name in names:
+            start = time.perf_counter()
+            try:
+                if not explicit and self.resolve_collection(name) is None:
+                    self._warmup_status[name] = {
+                        "ok": False,
+                        "missing": True,
+                        "elapsed": time.perf_counter() - start,
+                        "error": f"集合不存在（尚未入库），已跳过: {name}"
+                    }
+                    continue
+                store = self.get_vector_store(name)
+                if store.col is None:
+                    raise RuntimeError(f"集合不存在: {name}")
+                # 显式加载集合（已加载时为空操作），再执行一次检索预热查询节点
+                store.col.load()
+                store.similarity_search_with_score_by_vector(embedding, k=1)
+                self._warmup_status[name] = {
+                    "ok": True,
+                    "elapsed": time.perf_counter() - start,
+                    "collection": self.resolve_collection(name)
+                }
+            except Exception as e:
+                all_ok = False
+                self._warmup_status[name] = {
+                    "ok": False,
+                    "elapsed": time.perf_counter() - start,
+                    "error": str(e)
+                }
+        if all_ok:
+            self._ready.set()
+        return dict(self._warmup_status)
+
+    def start_warmup(
+        self,
+        collection_names: Optional[List[str]] = None,
+        warm_query: str = "warmup"
+    ) -> threading.Thread:
+        """
+        在后台线程中预热，不阻塞服务启动
+
+        Args:
+            collection_names: 需要预热的集合，默认为所有已声明的集合
+            warm_query: 预热检索使用的查询文本
+
+        Returns:
+            threading.Thread: 预热线程
+        """
+        def _run():
+            try:
+                self.warmup(collection_names, warm_query)
+            except Exception as e:
+                self._warmup_status["_error"] = {"ok": False, "error": str(e)}
+
+        thread = threading.Thread(target=_run, name="vector-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self) -> bool:
+        """是否已完成预热（就绪探针使用）"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待预热完成，返回是否就绪"""
+        return self._ready.wait(timeout)
+
+    def warmup_status(self) -> Dict[str, Dict[str, Any]]:
+        """返回各集合的预热结果"""
+        return dict(self._warmup_status)
+
+    def missing_collections(self) -> List[str]:
+        """预热时因不存在而跳过的已声明集合（服务降级：检索这些集合会失败）"""
+        return [name for name, status in self._warmup_status.items() if status.get("missing")]
+
+    def clear(self):
+        """清空所有句柄和共享客户端，并断开Milvus连接"""
+        with self._lock:
+            self._stores.clear()
+            self._store_locks.clear()
+            self._embeddings = None
+            self._ready.clear()
+            self._warmup_status.clear()
+            if self._connected:
+                from pymilvus import connections
+
+                connections.disconnect(self.CONNECTION_ALIAS)
+                self._connected = False
+
+
+# 进程内共享的默认注册表
+registry = VectorServiceRegistry()
+# ai code end
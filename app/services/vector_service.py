@@ -1,15 +1,33 @@
-import os
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
-from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.vectorstores import Milvus
-from langchain_core.documents import Document
+import asyncio
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+import orjson
+from base.config import get_config
+from base.metrics import metrics
+from base.profiling import span
+from app.services.collection_schema import CollectionSchemaManager
+from app.services.query_sketch import query_sketch
+from app.services.search_cursor import SearchCursor
+from app.services.vector_registry import VectorServiceRegistry, registry as default_registry
+# 兼容入库脚本从vector_service导入连接参数
+from app.services.vector_registry import get_milvus_connection_args
 
-# 加载环境变量
-load_dotenv()
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# ai code begin && nums:245
+# 检索各阶段耗时：向量化、Milvus检索、结果格式化
+EMBED_SECONDS = metrics.histogram(
+    "risk_rag_embed_seconds", "查询向量化耗时（秒）", ["collection", "mode"]
+)
+SEARCH_SECONDS = metrics.histogram(
+    "risk_rag_vector_search_seconds", "Milvus向量检索耗时（秒）", ["collection"]
+)
+FORMAT_SECONDS = metrics.histogram(
+    "risk_rag_format_seconds", "检索结果格式化耗时（秒）", ["collection"]
+)
 
 
-# ai code begin && nums:95
 class VectorService:
     """
     向量检索服务
@@ -18,91 +36,288 @@ class VectorService:
     封装了Milvus向量数据库的连接和检索逻辑。
     """
     
-    def __init__(self, collection_name: str = "liangou_regulations"):
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        schema_manager: Optional[CollectionSchemaManager] = None,
+        registry: Optional[VectorServiceRegistry] = None
+    ):
         """
         初始化向量检索服务
         
         Args:
-            collection_name: Milvus集合名称，默认为"liangou_regulations"
+            collection_name: Milvus集合名称，默认为配置DEFAULT_COLLECTION（liangou_regulations）
+            schema_manager: 集合结构管理器，默认使用注册表的管理器
+            registry: 句柄注册表，默认使用进程内共享的注册表
         """
-        self.collection_name = collection_name
+        self.collection_name = collection_name or get_config().DEFAULT_COLLECTION
+        self.registry = registry or default_registry
+        self.schema_manager = schema_manager or self.registry.schema_manager
         self._embeddings = None
         self._vector_store = None
         self._initialize()
     
     def _initialize(self):
-        """初始化Embedding模型和向量数据库连接"""
-        # 创建Azure OpenAI Embedding模型（与存储时使用相同的模型）
-        self._embeddings = AzureOpenAIEmbeddings(
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-        )
+        """从注册表获取共享的Embedding模型和集合的常驻向量库句柄"""
+        # Embedding客户端和Milvus连接在进程内共享，只在首次使用时创建
+        self._embeddings = self.registry.get_embeddings()
+        self._vector_store = self.registry.get_vector_store(self.collection_name)
+    
+    def _build_search_params(self, top_k: int, search_params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        生成本次检索的参数
         
-        # 连接到已存在的Milvus向量数据库
-        self._vector_store = Milvus(
-            embedding_function=self._embeddings,
-            connection_args={
-                "host": os.getenv("MILVUS_HOST"),
-                "port": os.getenv("MILVUS_PORT"),
-                "user": os.getenv("MILVUS_USER"),
-                "password": os.getenv("MILVUS_PASSWORD"),
-                "db_name": os.getenv("MILVUS_DB_NAME")
-            },
-            collection_name=self.collection_name
-        )
+        Args:
+            top_k: 返回结果数量
+            search_params: 本次检索覆盖的索引参数，如{"ef": 128}或{"nprobe": 32}
+            
+        Returns:
+            Optional[Dict]: 完整检索参数；集合未声明且没有覆盖参数时返回None（使用默认值）
+        """
+        # 配置SEARCH_PARAMS是所有集合的默认覆盖参数，本次检索指定的参数优先
+        search_params = {**get_config().SEARCH_PARAMS, **(search_params or {})}
+        if self.schema_manager.has_spec(self.collection_name):
+            return self.schema_manager.search_params(self.collection_name, search_params, top_k)
+        if search_params:
+            param = dict(self._vector_store.search_params or {})
+            param["params"] = {**param.get("params", {}), **search_params}
+            return param
+        return None
     
-    def search(self, query: str, top_k: int = 10) -> List[Document]:
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> List["Document"]:
         """
         同步检索向量数据库
         
         Args:
             query: 查询文本
-            top_k: 返回结果数量，默认10
+            top_k: 返回结果数量，默认为配置SEARCH_TOP_K（10）
+            search_params: 本次检索的索引参数，如{"ef": 128}，用于在召回率和速度之间取舍
             
         Returns:
-            List[Document]: 检索结果文档列表
+            List["Document"]: 检索结果文档列表
         """
         if not query or not query.strip():
             raise ValueError("查询文本不能为空")
         
-        results = self._vector_store.similarity_search(query, k=top_k)
-        return results
+        return [doc for doc, _ in self.search_with_scores(query, top_k, search_params)]
     
-    async def search_async(self, query: str, top_k: int = 10) -> List[Document]:
+    async def search_async(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> List["Document"]:
         """
         异步检索向量数据库
         
         Args:
             query: 查询文本
-            top_k: 返回结果数量，默认10
+            top_k: 返回结果数量，默认为配置SEARCH_TOP_K（10）
+            search_params: 本次检索的索引参数
             
         Returns:
             List[Document]: 检索结果文档列表
         """
-        # 由于Milvus的similarity_search是同步方法，这里使用同步调用
-        # 如果需要真正的异步，可以考虑使用线程池
-        return self.search(query, top_k)
+        results = await self.search_with_scores_async(query, top_k, search_params)
+        return [doc for doc, _ in results]
     
-    def search_with_scores(self, query: str, top_k: int = 10) -> List[tuple]:
+    async def search_with_scores_async(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
+        """
+        异步检索并返回相似度分数
+        
+        查询向量化经过微批调度器与其他并发请求合批，
+        Milvus检索是同步调用，放到线程池中执行以免阻塞事件循环。
+        
+        Args:
+            query: 查询文本
+            top_k: 返回结果数量，默认为配置SEARCH_TOP_K（10）
+            search_params: 本次检索的索引参数
+            
+        Returns:
+            List[tuple]: (Document, score) 元组列表
+        """
+        if not query or not query.strip():
+            raise ValueError("查询文本不能为空")
+        self._record_query(query)
+        
+        with EMBED_SECONDS.time(collection=self.collection_name, mode="batched"), \
+                span("embed", collection=self.collection_name, mode="batched"):
+            embedding = await self.registry.get_embedding_batcher().embed(query)
+        return await asyncio.to_thread(self.search_with_scores_by_vector, embedding, top_k, search_params)
+    
+    def search_with_scores(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
         """
         检索并返回相似度分数
         
         Args:
             query: 查询文本
-            top_k: 返回结果数量，默认10
+            top_k: 返回结果数量，默认为配置SEARCH_TOP_K（10）
+            search_params: 本次检索的索引参数，如{"ef": 128}
             
         Returns:
             List[tuple]: (Document, score) 元组列表
         """
         if not query or not query.strip():
             raise ValueError("查询文本不能为空")
+        self._record_query(query)
         
-        results = self._vector_store.similarity_search_with_score(query, k=top_k)
-        return results
+        embedding = self.embed_query(query)
+        return self.search_with_scores_by_vector(embedding, top_k, search_params)
+
+    def _record_query(self, query: str):
+        """记录查询频次（重启后CacheWarmer据此预热热点查询）"""
+        if get_config().QUERY_SKETCH_ENABLED:
+            query_sketch.record(self.collection_name, query)
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        将查询文本转换为向量
+
+        Args:
+            query: 查询文本
+
+        Returns:
+            List[float]: 查询向量
+        """
+        if not query or not query.strip():
+            raise ValueError("查询文本不能为空")
+
+        with EMBED_SECONDS.time(collection=self.collection_name, mode="sync"), \
+                span("embed", collection=self.collection_name, mode="sync"):
+            return self._embeddings.embed_query(query)
+
+    def search_with_scores_by_vector(
+        self,
+        embedding: List[float],
+        top_k: Optional[int] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
+        """
+        使用已计算好的查询向量检索并返回相似度分数
+
+        Args:
+            embedding: 查询向量
+            top_k: 返回结果数量，默认为配置SEARCH_TOP_K（10）
+            search_params: 本次检索的索引参数
+
+        Returns:
+            List[tuple]: (Document, score) 元组列表
+        """
+        top_k = top_k or get_config().SEARCH_TOP_K
+        param = self._build_search_params(top_k, search_params)
+        with SEARCH_SECONDS.time(collection=self.collection_name), \
+                span("search", collection=self.collection_name, top_k=top_k):
+            return self._vector_store.similarity_search_with_score_by_vector(embedding, k=top_k, param=param)
+
+    async def search_page_async(
+        self,
+        query: str,
+        page_size: int,
+        search_params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[tuple], Optional[SearchCursor]]:
+        """
+        分页检索的首页：向量化查询并返回第一页和翻页游标
+
+        Args:
+            query: 查询文本
+            page_size: 每页结果数
+            search_params: 本次检索的索引参数，翻页时沿用
+
+        Returns:
+            Tuple: ((Document, score) 列表, 下一页的游标；没有更多结果时为None)
+        """
+        if not query or not query.strip():
+            raise ValueError("查询文本不能为空")
+        self._record_query(query)
+
+        with EMBED_SECONDS.time(collection=self.collection_name, mode="batched"), \
+                span("embed", collection=self.collection_name, mode="batched"):
+            embedding = await self.registry.get_embedding_batcher().embed(query)
+        cursor = SearchCursor(self.collection_name, query, embedding, page_size, search_params)
+        return await asyncio.to_thread(self.fetch_page, cursor)
+
+    def fetch_page(self, cursor: SearchCursor) -> Tuple[List[tuple], Optional[SearchCursor]]:
+        """
+        按游标取下一页（使用游标中的查询向量，不再向量化）
+
+        首页之后每页都是以上一页最后一条结果的分数为边界的范围检索，
+        检索量只与页大小有关，不随已翻过的页数增长。
+
+        Args:
+            cursor: 分页游标，会被原地推进
+
+        Returns:
+            Tuple: ((Document, score) 列表, 下一页的游标；没有更多结果或到达SEARCH_PAGE_MAX_DEPTH时为None)
+        """
+        max_depth = get_config().SEARCH_PAGE_MAX_DEPTH
+        limit = min(cursor.page_size, max_depth - cursor.returned)
+        if limit <= 0:
+            return [], None
+        param = self._build_search_params(limit, cursor.search_params) or dict(self._vector_store.search_params or {})
+        expr = None
+        pk_field = self._vector_store._primary_field
+        if cursor.bound is not None:
+            param = {**param, "params": {**param.get("params", {}), **cursor.range_params(self.get_metric_type())}}
+            if cursor.boundary_ids:
+                expr = f"{pk_field} not in {orjson.dumps(cursor.boundary_ids).decode()}"
+
+        with SEARCH_SECONDS.time(collection=self.collection_name), \
+                span("search_page", collection=self.collection_name, offset=cursor.returned, limit=limit):
+            results = self._vector_store.similarity_search_with_score_by_vector(
+                cursor.vector.tolist(), k=limit, param=param, expr=expr
+            )
+        cursor.advance(results, pk_field)
+        has_more = len(results) == limit and cursor.returned < max_depth
+        return results, cursor if has_more else None
+
+    def query_by_expr(self, expr: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        按标量条件精确查询（不做向量检索），例如按FDA产品代码查找器械
+
+        Args:
+            expr: Milvus过滤表达式，如'product_code in ["DXN"]'
+            limit: 返回结果数量上限
+
+        Returns:
+            List[Dict]: 结果列表，每个字典包含content和metadata
+        """
+        col = self._vector_store.col
+        if col is None:
+            raise ValueError(f"集合不存在: {self.collection_name}")
+        text_field = self._vector_store._text_field
+        vector_field = self._vector_store._vector_field
+        output_fields = [field.name for field in col.schema.fields if field.name != vector_field]
+        rows = col.query(expr=expr, output_fields=output_fields, limit=limit)
+        return [
+            {
+                "content": row.get(text_field, ""),
+                "metadata": {k: v for k, v in row.items() if k != text_field}
+            }
+            for row in rows
+        ]
+
+    def get_metric_type(self) -> str:
+        """获取当前集合的距离度量类型"""
+        if self.schema_manager.has_spec(self.collection_name):
+            return self.schema_manager.get_spec(self.collection_name).index.metric_type
+        return (self._vector_store.search_params or {}).get("metric_type", "L2")
     
-    def format_results(self, results: List[Document]) -> List[Dict[str, Any]]:
+    def format_results(self, results: List["Document"]) -> List[Dict[str, Any]]:
         """
         格式化检索结果为字典列表
         
@@ -121,25 +336,39 @@ class VectorService:
             })
         return formatted_results
     
-    def format_results_with_scores(self, results: List[tuple]) -> List[Dict[str, Any]]:
+    def format_results_with_scores(self, results: List[tuple], start_rank: int = 1) -> List[Dict[str, Any]]:
         """
         格式化带分数的检索结果为字典列表
         
         Args:
             results: (Document, score) 元组列表
+            start_rank: 第一条结果的排名（分页检索时为之前已返回的结果数加1）
             
         Returns:
             List[Dict]: 格式化后的结果列表，每个字典包含content、metadata和score
         """
-        formatted_results = []
-        for i, (doc, score) in enumerate(results, 1):
-            formatted_results.append({
+        with FORMAT_SECONDS.time(collection=self.collection_name), \
+                span("format", collection=self.collection_name, count=len(results)):
+            return list(self.iter_results_with_scores(results, start_rank))
+    
+    def iter_results_with_scores(self, results: Iterable[tuple], start_rank: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        逐条格式化带分数的检索结果（流式响应使用，不在内存中构建完整列表）
+        
+        Args:
+            results: (Document, score) 元组的可迭代对象
+            start_rank: 第一条结果的排名
+            
+        Yields:
+            Dict: 包含rank、content、metadata和score的结果字典
+        """
+        for i, (doc, score) in enumerate(results, start_rank):
+            yield {
                 "rank": i,
                 "content": doc.page_content,
                 "metadata": doc.metadata,
                 "score": float(score)
-            })
-        return formatted_results
+            }
     
     def get_collection_name(self) -> str:
         """获取当前使用的集合名称"""
@@ -149,6 +378,8 @@ class VectorService:
         """
         切换向量数据库集合
         
+        集合句柄由注册表常驻缓存，切换只需一次查找，不会重建Embedding客户端和连接
+        
         Args:
             collection_name: 新的集合名称
         """
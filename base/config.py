@@ -2,78 +2,321 @@
 import configparser
 # 导入路径操作库
 import os
+# ai code begin && nums:11
+import copy
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# 项目根目录：相对路径的配置文件按项目根目录解析，不受启动目录影响
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_FILE = os.path.join(PROJECT_ROOT, "config.ini")
+# ai code end
+
+
+# ai code begin && nums:138
+@dataclass(frozen=True)
+class Setting:
+    """
+    一项配置
+
+    Args:
+        name: Config上的属性名，同时也是覆盖它的环境变量名
+        section: config.ini中的节
+        key: config.ini中的键
+        type: 值类型（str / int / float / bool / list / dict），list和dict在文件和环境变量中写JSON
+        default: 默认值
+        description: 说明
+    """
+    name: str
+    section: str
+    key: str
+    type: type
+    default: Any
+    description: str = ""
+
+    def parse(self, raw: str) -> Any:
+        """把文件或环境变量中的字符串解析为声明的类型，非法时抛出ValueError"""
+        if self.type is bool:
+            value = raw.strip().lower()
+            if value in ("1", "true", "yes", "on"):
+                return True
+            if value in ("0", "false", "no", "off"):
+                return False
+            raise ValueError(f"{self.name}不是合法的布尔值: {raw}")
+        if self.type in (list, dict):
+            value = json.loads(raw)
+            if not isinstance(value, self.type):
+                raise ValueError(f"{self.name}应为JSON {self.type.__name__}: {raw}")
+            return value
+        return self.type(raw.strip())
+
+    @property
+    def sensitive(self) -> bool:
+        """密钥类配置（名称中含TOKEN/SECRET/KEY/PASSWORD一词），输出时隐藏取值"""
+        return not SENSITIVE_NAME_PARTS.isdisjoint(self.name.split("_"))
+
+    def display(self, value: Any) -> Any:
+        """用于输出的取值，敏感项（非空时）显示为***"""
+        return "***" if self.sensitive and value else value
+
+
+# 配置名中出现这些词（按下划线分隔，TOKENS等不算）的配置视为敏感项
+SENSITIVE_NAME_PARTS = frozenset({"TOKEN", "SECRET", "KEY", "PASSWORD"})
+
+# 所有配置项：优先级为 环境变量 > config.ini > 默认值
+SETTINGS: List[Setting] = [
+    # Milvus 配置
+    Setting("MILVUS_HOST", "milvus", "host", str, "localhost", "Milvus主机地址"),
+    Setting("MILVUS_PORT", "milvus", "port", str, "19530", "Milvus端口"),
+    Setting("MILVUS_DATABASE_NAME", "milvus", "database_name", str, "itcast", "Milvus数据库名"),
+    Setting("MILVUS_COLLECTION_NAME", "milvus", "collection_name", str, "edurag_final", "Milvus集合名"),
+    # 日志配置
+    Setting("LOG_FILE", "logger", "log_file", str, "logs/app.log", "日志文件路径，相对路径按项目根目录解析"),
+    Setting("LOG_LEVEL", "logger", "level", str, "INFO", "日志级别"),
+    Setting("LOG_MAX_BYTES", "logger", "max_bytes", int, 50 * 1024 * 1024, "单个日志文件大小上限"),
+    Setting("LOG_BACKUP_COUNT", "logger", "backup_count", int, 10, "保留的历史日志文件数"),
+    Setting("LOG_ROTATE_INTERVAL", "logger", "rotate_interval", int, 24 * 3600, "按时间轮转的周期（秒）"),
+    # 集合
+    Setting("DEFAULT_COLLECTION", "collections", "default", str, "liangou_regulations", "VectorService默认集合"),
+    Setting("REGULATION_COLLECTION", "collections", "regulations", str, "amazon_regulations", "亚马逊法规库"),
+    Setting("PRODUCT_COLLECTION", "collections", "products", str, "liangou_regulations", "良购产品库"),
+    Setting("FDA_COLLECTION", "collections", "fda_devices", str, "fda_devices", "FDA医疗器械库"),
+    Setting(
+        "FANOUT_COLLECTIONS", "collections", "fanout", list,
+        ["amazon_regulations", "liangou_regulations", "fda_devices"], "多集合检索的默认集合"
+    ),
+    # 检索
+    Setting("SEARCH_TOP_K", "search", "top_k", int, 10, "未指定时的检索返回数量"),
+    Setting("AGENT_TOP_K", "search", "agent_top_k", int, 5, "风险检查Agent每个来源的返回数量"),
+    Setting("SEARCH_PARAMS", "search", "params", dict, {}, "所有集合默认覆盖的索引检索参数，如{\"ef\": 64}"),
+    Setting("SEARCH_PAGE_MAX_DEPTH", "search", "page_max_depth", int, 10000, "分页检索最多可翻到的结果数"),
+    Setting("SEARCH_CURSOR_TTL", "search", "cursor_ttl", float, 1800.0, "分页游标的有效期（秒）"),
+    Setting("SEARCH_CURSOR_SECRET", "search", "cursor_secret", str, "", "分页游标的签名密钥，为空时每个进程随机生成（多worker部署必须配置）"),
+    # 查询向量化微批调度和缓存
+    Setting("EMBED_BATCHER_MAX_BATCH_SIZE", "batcher", "max_batch_size", int, 64, "单次合批的最大文本数"),
+    Setting("EMBED_BATCHER_MAX_WAIT_MS", "batcher", "max_wait_ms", float, 5.0, "合批窗口（毫秒）"),
+    Setting("EMBED_QUERY_CACHE_SIZE", "batcher", "cache_size", int, 2048, "查询向量LRU缓存条数"),
+    # Embedding请求打包
+    Setting("EMBED_TOKENS_PER_REQUEST", "embedding", "tokens_per_request", int, 100_000, "单次请求的token预算"),
+    Setting("EMBED_MAX_ITEMS_PER_REQUEST", "embedding", "max_items_per_request", int, 2048, "单次请求的最大条数"),
+    # 并发与超时
+    Setting("A2A_MAX_CONCURRENCY", "concurrency", "a2a_max_concurrency", int, 16, "A2A批量帧同时执行的任务数"),
+    Setting("SCREEN_MAX_CONCURRENCY", "concurrency", "screen_max_concurrency", int, 16, "流式批量筛查同时在途的查询数"),
+    Setting("AGENT_TOOL_TIMEOUT", "concurrency", "agent_tool_timeout", float, 5.0, "Agent工具整体截止时间（秒）"),
+    # 入库
+    Setting("INGEST_EMBED_BATCH_SIZE", "ingest", "embed_batch_size", int, 2048, "入库时每次Embedding请求的最大条数"),
+    Setting("INGEST_INSERT_BATCH_SIZE", "ingest", "insert_batch_size", int, 500, "每次写入Milvus的条数"),
+    Setting("INGEST_MAX_RETRIES", "ingest", "max_retries", int, 3, "每批最大重试次数"),
+    Setting("INGEST_RETRY_DELAY", "ingest", "retry_delay", float, 5.0, "重试前等待秒数"),
+    Setting("DEDUP_THRESHOLD", "ingest", "dedup_threshold", float, 0.8, "标题近似去重的Jaccard阈值"),
+    # 版本化重建（蓝绿切换）
+    Setting("REBUILD_KEEP_VERSIONS", "rebuild", "keep_versions", int, 3, "保留的集合版本数（含当前版本），用于回滚"),
+    Setting("REBUILD_SAMPLE_SIZE", "rebuild", "sample_size", int, 200, "切换前校验召回率的抽样条数"),
+    Setting("REBUILD_MIN_RECALL", "rebuild", "min_recall", float, 0.95, "抽样向量检索到自身的最低比例"),
+    Setting("REBUILD_MIN_ROW_RATIO", "rebuild", "min_row_ratio", float, 0.9, "新版本行数不得低于当前版本的比例"),
+    # 通过对象存储批量导入（全量重建）
+    Setting("BULK_IMPORT_ENDPOINT", "bulk_import", "endpoint", str, "localhost:9000", "Milvus使用的MinIO地址"),
+    Setting("BULK_IMPORT_ACCESS_KEY", "bulk_import", "access_key", str, "minioadmin", "MinIO访问密钥"),
+    Setting("BULK_IMPORT_SECRET_KEY", "bulk_import", "secret_key", str, "minioadmin", "MinIO私有密钥"),
+    Setting("BULK_IMPORT_SECURE", "bulk_import", "secure", bool, False, "是否使用HTTPS访问MinIO"),
+    Setting("BULK_IMPORT_BUCKET", "bulk_import", "bucket", str, "a-bucket", "Milvus的存储桶（milvus.yaml中minio.bucketName）"),
+    Setting("BULK_IMPORT_FORMAT", "bulk_import", "format", str, "parquet", "导入文件格式：parquet / numpy"),
+    Setting("BULK_IMPORT_CHUNK_ROWS", "bulk_import", "chunk_rows", int, 200_000, "每个导入任务（文件）的行数"),
+    Setting("BULK_IMPORT_POLL_INTERVAL", "bulk_import", "poll_interval", float, 2.0, "查询导入进度的间隔（秒）"),
+    Setting("BULK_IMPORT_TIMEOUT", "bulk_import", "timeout", float, 3600.0, "等待导入完成的最长时间（秒）"),
+    # 情感分析
+    Setting("SENTIMENT_MAX_RETRIES", "sentiment", "max_retries", int, 3, "Coze调用重试次数"),
+    Setting("SENTIMENT_TIMEOUT", "sentiment", "timeout", float, 60.0, "Coze调用超时（秒）"),
+    Setting("SENTIMENT_REQUEST_DELAY", "sentiment", "request_delay", float, 0.1, "批量分析时的调用间隔（秒）"),
+    Setting("SENTIMENT_PREFILTER_ENABLED", "sentiment", "prefilter_enabled", bool, True, "是否先用本地分类器判定（模型文件存在时生效）"),
+    Setting("SENTIMENT_PREFILTER_MODEL", "sentiment", "prefilter_model", str, "models/sentiment_prefilter.npz", "本地分类器模型文件，相对路径按项目根目录解析"),
+    Setting("SENTIMENT_PREFILTER_THRESHOLD", "sentiment", "prefilter_threshold", float, 0.9, "本地判定的置信度阈值，低于阈值的评论交给Coze"),
+    Setting("SENTIMENT_BATCH_SIZE", "sentiment", "batch_size", int, 1, "每次Coze调用合并的评论数，1表示逐条调用"),
+    Setting("SENTIMENT_BATCH_MAX_CHARS", "sentiment", "batch_max_chars", int, 3000, "合并调用时评论的总字符数上限（控制提示词长度）"),
+    # 服务
+    Setting("VECTOR_WARMUP", "service", "vector_warmup", bool, True, "启动时是否预热向量库"),
+    Setting("DEBUG_PROFILE_TOKEN", "service", "debug_profile_token", str, "", "按请求剖析的令牌，为空时关闭"),
+    Setting("DEBUG_PROFILE_DIR", "service", "debug_profile_dir", str, "logs/profiles", "剖析结果目录，相对路径按项目根目录解析"),
+    Setting("CONFIG_WATCH_INTERVAL", "service", "config_watch_interval", float, 5.0, "配置文件变更检查间隔（秒），0表示不检查"),
+    # 高频查询统计与缓存预热
+    Setting("QUERY_SKETCH_ENABLED", "warming", "sketch_enabled", bool, True, "是否统计高频查询"),
+    Setting("QUERY_SKETCH_TOP_K", "warming", "sketch_top_k", int, 1000, "保留的热点查询数"),
+    Setting("QUERY_SKETCH_HALF_LIFE", "warming", "sketch_half_life", float, 86400.0, "查询计数的半衰期（秒）"),
+    Setting("QUERY_SKETCH_FILE", "warming", "sketch_file", str, "logs/query_sketch.json", "热点查询统计文件，相对路径按项目根目录解析"),
+    Setting("QUERY_SKETCH_SAVE_INTERVAL", "warming", "sketch_save_interval", float, 300.0, "统计保存间隔（秒）"),
+    Setting("CACHE_WARM_TOP_N", "warming", "top_n", int, 200, "启动后预热的热点查询数，0表示不预热"),
+    Setting("CACHE_WARM_RATE", "warming", "rate", float, 50.0, "预热速率（每秒向量化/检索的查询数）"),
+    Setting("CACHE_WARM_INTERVAL", "warming", "interval", float, 0.0, "周期预热间隔（秒），0表示只在启动时预热"),
+]
+
+SETTINGS_BY_NAME: Dict[str, Setting] = {setting.name: setting for setting in SETTINGS}
+
+ReloadCallback = Callable[["Config", Dict[str, Tuple[Any, Any]]], None]
+# ai code end
 
 
 class Config:
     # 初始化配置，加载 config.ini 文件
-    def __init__(self, config_file="../config.ini"):
+    # ai code begin && nums:133
+    def __init__(self, config_file: Optional[str] = None):
+        """
+        加载配置
+
+        Args:
+            config_file: 配置文件路径，默认取环境变量CONFIG_FILE，再默认为项目根目录下的config.ini；
+                文件不存在时只使用环境变量和默认值
+        """
+        path = config_file or os.getenv("CONFIG_FILE") or DEFAULT_CONFIG_FILE
+        self.config_file = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
         # 创建配置解析器
         self.config = configparser.ConfigParser()
-        # # 读取配置文件
-        # self.config.read(config_file)  # windows包gbk错误，增加encoding=utf-8
-        #
-        # # MySQL 配置
-        # # MySQL 主机地址
-        # self.MYSQL_HOST = self.config.get('mysql', 'host', fallback='localhost')
-        #
-        # # MySQL 用户名
-        # self.MYSQL_USER = self.config.get('mysql', 'user', fallback='root')
-        # # MySQL 密码
-        # self.MYSQL_PASSWORD = self.config.get('mysql', 'password', fallback='123456')
-        # # MySQL 数据库名
-        # self.MYSQL_DATABASE = self.config.get('mysql', 'database', fallback='subjects_kg')
-        #
-        # # Redis 配置
-        # # Redis 主机地址
-        # self.REDIS_HOST = self.config.get('redis', 'host', fallback='localhost')
-        # # Redis 端口
-        # self.REDIS_PORT = self.config.getint('redis', 'port', fallback=6379)
-        # # Redis 密码
-        # self.REDIS_PASSWORD = self.config.get('redis', 'password', fallback='1234')
-        # # Redis 数据库编号
-        # self.REDIS_DB = self.config.getint('redis', 'db', fallback=0)
-
-        # Milvus 配置
-        # Milvus 主机地址
-        self.MILVUS_HOST = self.config.get('milvus', 'host', fallback='localhost')
-        # Milvus 端口
-        self.MILVUS_PORT = self.config.get('milvus', 'port', fallback='19530')
-        # Milvus 数据库名
-        self.MILVUS_DATABASE_NAME = self.config.get('milvus', 'database_name', fallback='itcast')
-        # Milvus 集合名
-        self.MILVUS_COLLECTION_NAME = self.config.get('milvus', 'collection_name', fallback='edurag_final')
-        #
-        # # LLM 配置
-        # # LLM 模型名
-        # self.LLM_MODEL = self.config.get('llm', 'model', fallback='qwen-plus')
-        # # DashScope API 密钥
-        # self.DASHSCOPE_API_KEY = self.config.get('llm', 'dashscope_api_key')
-        # # DashScope API 地址
-        # self.DASHSCOPE_BASE_URL = self.config.get('llm', 'dashscope_base_url',
-        #                                           fallback='https://dashscope.aliyuncs.com/compatible-mode/v1')
-        #
-        # # 检索参数
-        # # 父块大小
-        # self.PARENT_CHUNK_SIZE = self.config.getint('retrieval', 'parent_chunk_size', fallback=1200)
-        # # 子块大小
-        # self.CHILD_CHUNK_SIZE = self.config.getint('retrieval', 'child_chunk_size', fallback=300)
-        # # 块重叠大小
-        # self.CHUNK_OVERLAP = self.config.getint('retrieval', 'chunk_overlap', fallback=50)
-        # # 检索返回数量
-        # self.RETRIEVAL_K = self.config.getint('retrieval', 'retrieval_k', fallback=5)
-        # # 最终候选数量
-        # self.CANDIDATE_M = self.config.getint('retrieval', 'candidate_m', fallback=2)
-        #
-        # # 应用配置
-        # # 有效来源列表
-        # self.VALID_SOURCES = eval(
-        #     self.config.get('app', 'valid_sources', fallback='["ai", "java", "test", "ops", "bigdata"]'))
-        # # 客服电话
-        # self.CUSTOMER_SERVICE_PHONE = self.config.get('app', 'customer_service_phone', fallback='12345678')
-        # 日志文件路径
-        self.LOG_FILE = self.config.get('logger', 'log_file', fallback='../logs/app.log')
+        self._lock = threading.Lock()
+        self._callbacks: List[ReloadCallback] = []
+        self._mtime: Optional[float] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._load(strict=True)
+
+    def _file_mtime(self) -> Optional[float]:
+        """配置文件的修改时间，文件不存在时返回None"""
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    def _load(self, strict: bool) -> Dict[str, Tuple[Any, Any]]:
+        """
+        读取配置文件和环境变量并更新属性
+
+        Args:
+            strict: 为True时非法取值直接抛出ValueError（启动时）；
+                为False时保留旧值并打印警告（热更新时不因一处笔误影响运行中的服务）
+
+        Returns:
+            Dict: 发生变化的配置 {属性名: (旧值, 新值)}
+        """
+        parser = configparser.ConfigParser()
+        self._mtime = self._file_mtime()
+        if self._mtime is not None:
+            try:
+                # 显式指定utf-8，避免windows下按gbk读取报错
+                parser.read(self.config_file, encoding="utf-8")
+            except configparser.Error as e:
+                if strict:
+                    raise ValueError(f"配置文件格式错误: {self.config_file}（{e}）") from e
+                print(f"⚠️  配置文件格式错误，保留当前配置: {e}")
+                return {}
+        changes: Dict[str, Tuple[Any, Any]] = {}
+        for setting in SETTINGS:
+            raw = os.getenv(setting.name)
+            if raw is None:
+                raw = parser.get(setting.section, setting.key, fallback=None)
+            try:
+                value = copy.deepcopy(setting.default) if raw is None else setting.parse(raw)
+            except (ValueError, TypeError) as e:
+                if strict:
+                    raise ValueError(f"配置项{setting.name}取值非法: {raw!r}（{e}）") from e
+                print(f"⚠️  配置项{setting.name}取值非法，保留原值: {setting.display(raw)!r}（{e}）")
+                continue
+            old = getattr(self, setting.name, None)
+            if not hasattr(self, setting.name) or old != value:
+                changes[setting.name] = (old, value)
+                setattr(self, setting.name, value)
+        self.config = parser
+        return changes
+
+    def reload(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        重新加载配置，并把变化通知给订阅者（调整并发上限、缓存大小等运行中的对象）
+
+        Returns:
+            Dict: 发生变化的配置 {属性名: (旧值, 新值)}
+        """
+        with self._lock:
+            changes = self._load(strict=False)
+            callbacks = list(self._callbacks)
+        if changes:
+            print(f"🔄 配置已重新加载: {', '.join(f'{name}={SETTINGS_BY_NAME[name].display(new)!r}' for name, (_, new) in changes.items())}")
+            for callback in callbacks:
+                try:
+                    callback(self, changes)
+                except Exception as e:
+                    print(f"⚠️  配置更新回调执行失败: {e}")
+        return changes
+
+    def on_reload(self, callback: ReloadCallback):
+        """
+        订阅配置变化
+
+        Args:
+            callback: 回调函数 callback(config, changes)，changes为 {属性名: (旧值, 新值)}
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def start_watching(self, interval: Optional[float] = None) -> Optional[threading.Thread]:
+        """
+        在后台线程中定期检查配置文件，修改时间变化时自动reload
+
+        多个worker进程各自检查同一个文件，修改config.ini即可在不重启的情况下生效；
+        环境变量在进程启动后无法修改，被环境变量覆盖的配置项不会随文件变化。
+
+        Args:
+            interval: 检查间隔（秒），默认使用CONFIG_WATCH_INTERVAL，不大于0时不启动
+
+        Returns:
+            Optional[threading.Thread]: 检查线程，未启动时返回None
+        """
+        interval = self.CONFIG_WATCH_INTERVAL if interval is None else interval
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return self._watcher
+        self._stop_watching.clear()
+
+        def _watch():
+            while not self._stop_watching.wait(interval):
+                if self._file_mtime() != self._mtime:
+                    self.reload()
+
+        self._watcher = threading.Thread(target=_watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self):
+        """停止检查配置文件"""
+        self._stop_watching.set()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """当前全部配置（用于排查问题，敏感项已隐藏）"""
+        return {
+            setting.name: setting.display(getattr(self, setting.name))
+            for setting in SETTINGS
+        }
+    # ai code end
+
+
+# ai code begin && nums:14
+_config: Optional[Config] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> Config:
+    """获取进程内共享的配置（首次调用时加载.env和config.ini）"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                load_dotenv()
+                _config = Config()
+    return _config
+# ai code end
 
 
 if __name__ == '__main__':
-    conf = Config()
-    print(conf.CHILD_CHUNK_SIZE)
+    # ai code begin && nums:3
+    conf = get_config()
+    for name, value in conf.as_dict().items():
+        print(f"{name} = {value!r}")
+    # ai code end
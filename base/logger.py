@@ -2,47 +2,228 @@
 import logging
 # 导入路径操作库
 import os
+# ai code begin && nums:9
+import atexit
+import copy
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+import orjson
+# ai code end
 # 导入配置类
-from base.config import Config
-
-
-def setup_logging(log_file=Config().LOG_FILE):
-    # 创建日志目录
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    # 获取日志器
-    logger = logging.getLogger("RiskRAG")
-    # 设置日志级别
-    logger.setLevel(logging.INFO)
-    # 避免重复添加处理器
-    if not logger.handlers:
-        # 创建文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        # 设置文件处理器级别
-        file_handler.setLevel(logging.INFO)
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        # 设置控制台处理器级别
-        console_handler.setLevel(logging.INFO)
-        # 设置日志格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(pathname)s[line:%(lineno)d] - %(name)s - %(levelname)s - %(message)s')
-        # 为文件处理器设置格式
-        file_handler.setFormatter(formatter)
-        # 为控制台处理器设置格式
-        console_handler.setFormatter(formatter)
-        # 添加文件处理器
-        logger.addHandler(file_handler)
-        # 添加控制台处理器
-        logger.addHandler(console_handler)
-    # 返回日志器
+from base.config import PROJECT_ROOT, get_config
+
+
+# ai code begin && nums:200
+# 根日志器名称，各模块使用 get_logger("模块名") 得到 RiskRAG.模块名 子日志器
+ROOT_LOGGER_NAME = "RiskRAG"
+# 单个日志文件上限、保留的历史文件数和轮转周期的默认值（实际取值见配置LOG_MAX_BYTES等）
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 10
+DEFAULT_ROTATE_INTERVAL = 24 * 3600
+
+# LogRecord自带的属性，其余属性视为通过extra传入的结构化字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_setup_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    结构化（JSON行）日志格式
+
+    只使用LogRecord上已有的字段（不读取pathname做路径格式化），
+    通过 logger.info("...", extra={"collection": "xxx"}) 传入的字段原样输出。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = record.stack_info
+        return orjson.dumps(payload, default=str).decode()
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    按大小和时间轮转的文件处理器
+
+    文件超过max_bytes，或跨过一个rotate_interval周期（按UTC时间对齐，默认每天）时轮转，
+    历史文件按 app.log.1、app.log.2 ... 编号，最多保留backup_count个。
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        rotate_interval: int = DEFAULT_ROTATE_INTERVAL,
+        encoding: str = "utf-8"
+    ):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.rotate_interval = rotate_interval
+        # 已有日志文件时从其修改时间所在周期开始计算，重启后不会把前一天的日志接着写
+        last = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.next_rollover = self._period_end(last)
+
+    def _period_end(self, timestamp: float) -> float:
+        """timestamp所在周期的结束时刻"""
+        if self.rotate_interval <= 0:
+            return float("inf")
+        return (int(timestamp) // self.rotate_interval + 1) * self.rotate_interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if record.created >= self.next_rollover:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.next_rollover = self._period_end(time.time())
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    进程内队列处理器
+
+    业务线程只合并消息参数（参数对象之后可能被修改），
+    异常堆栈的格式化和JSON序列化都留给后台线程。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _resolve_log_file(log_file: Optional[str]) -> str:
+    """确定日志文件的绝对路径（配置LOG_FILE可被同名环境变量覆盖）"""
+    path = log_file or get_config().LOG_FILE
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(PROJECT_ROOT, path))
+
+
+def setup_logging(
+    log_file: Optional[str] = None,
+    level: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    rotate_interval: Optional[int] = None,
+    console: bool = True,
+    json_format: bool = True
+) -> logging.Logger:
+    """
+    初始化日志（只执行一次，重复调用返回同一个日志器）
+
+    业务线程只把日志记录放入内存队列，格式化和文件/控制台写入由后台线程（QueueListener）完成，
+    日志I/O不再计入请求耗时。进程退出时自动停止后台线程并写完队列中的日志。
+
+    Args:
+        log_file: 日志文件路径，默认取配置LOG_FILE，相对路径按项目根目录解析
+        level: 日志级别，默认取配置LOG_LEVEL
+        max_bytes: 单个日志文件的大小上限，默认取配置LOG_MAX_BYTES
+        backup_count: 保留的历史日志文件数，默认取配置LOG_BACKUP_COUNT
+        rotate_interval: 按时间轮转的周期（秒），0表示只按大小轮转，默认取配置LOG_ROTATE_INTERVAL
+        console: 是否同时输出到控制台
+        json_format: 文件日志是否使用JSON行格式（控制台始终为文本格式）
+
+    Returns:
+        logging.Logger: RiskRAG根日志器
+    """
+    global _listener
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    with _setup_lock:
+        if _listener is not None:
+            return logger
+
+        config = get_config()
+        path = _resolve_log_file(log_file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = SizeAndTimeRotatingFileHandler(
+            path,
+            config.LOG_MAX_BYTES if max_bytes is None else max_bytes,
+            config.LOG_BACKUP_COUNT if backup_count is None else backup_count,
+            config.LOG_ROTATE_INTERVAL if rotate_interval is None else rotate_interval
+        )
+        file_handler.setFormatter(
+            JsonFormatter() if json_format
+            else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+        handlers = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            handlers.append(console_handler)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        logger.setLevel(config.LOG_LEVEL.upper() if level is None else level)
+        logger.handlers = [_InProcessQueueHandler(log_queue)]
+        # 不向root日志器传播，避免被其他库配置的处理器重复同步输出
+        logger.propagate = False
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
     return logger
 
 
-# 初始化日志器
-logger = setup_logging()
+def shutdown_logging():
+    """停止后台写入线程（写完队列中剩余的日志）"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        logging.getLogger(ROOT_LOGGER_NAME).handlers = []
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """
+    获取日志器，首次调用时初始化日志
+
+    Args:
+        name: 模块名，如"vector_service"，返回RiskRAG.vector_service；为空时返回根日志器
+
+    Returns:
+        logging.Logger: 日志器
+    """
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}" if name else ROOT_LOGGER_NAME)
+
+
+def __getattr__(name: str):
+    """兼容 from base.logger import logger：首次访问时才初始化日志，导入模块不再产生文件I/O"""
+    if name == "logger":
+        return get_logger()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+# ai code end
 
 
 def process_data(data):
+    # ai code begin && nums:1
+    logger = get_logger()
+    # ai code end
     logger.debug(f"开始处理数据: {data}")
     if not data:
         logger.error("数据为空，无法处理")
@@ -52,6 +233,9 @@ def process_data(data):
 
 
 def main():
+    # ai code begin && nums:1
+    logger = get_logger()
+    # ai code end
     logger.info("程序启动")
     result = process_data("hello")
     if result:
@@ -0,0 +1,251 @@
+"""
+进程内指标注册表
+
+纯Python实现的计数器、仪表盘和直方图，不依赖prometheus_client：
+- 业务代码在模块级声明指标，调用 inc / observe / time 记录
+- 测试直接读取 value / snapshot 断言
+- /metrics 接口调用 render_prometheus 输出Prometheus文本格式
+"""
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# ai code begin && nums:232
+# 默认的耗时分桶（秒），覆盖从1ms的缓存命中到数十秒的外部接口调用
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """转义标签值中的特殊字符"""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值（整数不带小数点）"""
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric(abc.ABC):
+    """指标基类：按标签值分组保存样本"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        """按声明顺序取出标签值，标签不匹配时抛出ValueError"""
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标{self.name}需要标签{self.label_names}，实际为{tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        """生成 {a="x",b="y"} 形式的标签字符串"""
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+        if extra:
+            pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[str]:
+        """输出Prometheus文本格式的样本行"""
+
+    @abc.abstractmethod
+    def reset(self):
+        """清空所有样本"""
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """增加计数"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """读取当前计数"""
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield f"{self.name}{self._format_labels(values)} {_format_value(value)}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """可增可减的仪表盘（如队列长度、在途请求数）"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str):
+        """设置当前值"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        """减少当前值"""
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """直方图：记录样本分布、总和与个数"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数（非累计，最后一个为+Inf）, 总和, 个数]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        """记录一个样本"""
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """记录代码块耗时（秒），代码块抛出异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: str) -> Dict[str, object]:
+        """
+        读取某组标签的分布
+
+        Returns:
+            Dict: count、sum以及累计分桶计数 {上界: 个数}
+        """
+        state = self._values.get(self._label_values(labels))
+        if state is None:
+            return {"count": 0, "sum": 0.0, "buckets": {bound: 0 for bound in self.buckets}}
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, state[0]):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": state[2], "sum": state[1], "buckets": buckets}
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(values, list(state[0]), state[1], state[2]) for values, state in self._values.items()]
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = self._format_labels(values, {"le": _format_value(bound)})
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(values)} {_format_value(total)}"
+            yield f"{self.name}_count{self._format_labels(values)} {count}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    同名指标只创建一次（模块被重复导入或多处声明时返回同一个对象），
+    类型或标签不一致时抛出ValueError。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, label_names: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, label_names, **kwargs)
+            elif type(metric) is not cls or metric.label_names != tuple(label_names):
+                raise ValueError(f"指标{name}已按不同的类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """声明（或获取）计数器"""
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        """声明（或获取）仪表盘"""
+        return self._get_or_create(Gauge, name, documentation, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """声明（或获取）直方图"""
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """按名称获取指标"""
+        return self._metrics.get(name)
+
+    def list_metrics(self) -> List[str]:
+        """返回所有指标名称"""
+        return sorted(self._metrics.keys())
+
+    def render_prometheus(self) -> str:
+        """输出Prometheus文本格式（text/plain; version=0.0.4）"""
+        lines = []
+        for name in self.list_metrics():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空所有样本（保留指标声明，供测试使用）"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+# 进程内共享的默认注册表
+metrics = MetricsRegistry()
+# ai code end
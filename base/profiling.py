@@ -0,0 +1,214 @@
+"""
+按需性能剖析
+
+平时不开启，开销只有一次ContextVar读取；对单个请求或单次批处理任务开启后记录：
+- span树：各阶段的嵌套耗时（embed → search → format，load → embed → insert）
+- cProfile统计：按累计耗时排序的热点函数
+
+用法:
+    with profile_session("ingest") as profile:
+        with span("load"):
+            ...
+    profile.dump("../logs/profiles")   # 写出 .json（span树+热点）和 .prof（可用snakeviz等查看）
+
+span在asyncio.to_thread等复制上下文的线程中同样会挂到当前请求的span树上；
+cProfile只统计开启剖析的线程，线程池中的耗时通过span体现。
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import orjson
+
+
+# ai code begin && nums:185
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("risk_rag_profile", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("risk_rag_span", default=None)
+# 未开启剖析时span返回的空上下文（复用同一个对象，不产生分配）
+_NULL_SPAN = nullcontext()
+# 同一时刻只允许一个cProfile（解释器级别的profile钩子不能嵌套）
+_cprofile_lock = threading.Lock()
+
+
+class Span:
+    """一个阶段的耗时记录"""
+
+    __slots__ = ("name", "attrs", "start", "duration", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        """转换为字典，时间以毫秒表示并相对于剖析开始时刻"""
+        return {
+            "name": self.name,
+            "attrs": self.attrs,
+            "start_ms": (self.start - origin) * 1000,
+            "duration_ms": self.duration * 1000 if self.duration is not None else None,
+            "children": [child.to_dict(origin) for child in self.children]
+        }
+
+
+class Profile:
+    """
+    一次剖析会话
+
+    Args:
+        name: 会话名称（请求路径或任务名）
+        use_cprofile: 是否同时采集cProfile统计
+    """
+
+    def __init__(self, name: str, use_cprofile: bool = True):
+        self.name = name
+        # 文件名用的会话ID，请求开始时即可通过响应头告知调用方
+        safe_name = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name).strip("_") or "profile"
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{uuid.uuid4().hex[:8]}"
+        self.root = Span(name)
+        self._lock = threading.Lock()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._use_cprofile = use_cprofile
+        self.cprofile_skipped = False
+
+    def start(self):
+        """开始剖析（cProfile被其他会话占用时只记录span）"""
+        if self._use_cprofile:
+            if _cprofile_lock.acquire(blocking=False):
+                self._profiler = cProfile.Profile()
+                try:
+                    self._profiler.enable()
+                except ValueError:
+                    # 已有其他profile工具（如调试器）在运行
+                    self._profiler = None
+                    self.cprofile_skipped = True
+                    _cprofile_lock.release()
+            else:
+                self.cprofile_skipped = True
+        self.root.start = time.perf_counter()
+
+    def stop(self):
+        """结束剖析"""
+        self.root.duration = time.perf_counter() - self.root.start
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_lock.release()
+
+    def add_child(self, parent: Span, child: Span):
+        """挂接子span（并发阶段可能在多个线程中同时挂接）"""
+        with self._lock:
+            parent.children.append(child)
+
+    def hotspots(self, limit: int = 30) -> str:
+        """cProfile热点函数（按累计耗时排序）的文本报告"""
+        if self._profiler is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def to_dict(self, limit: int = 30) -> Dict[str, Any]:
+        """
+        转换为调试输出
+
+        Returns:
+            Dict: span树、cProfile热点报告，以及cProfile是否因并发剖析被跳过
+        """
+        return {
+            "id": self.profile_id,
+            "name": self.name,
+            "spans": self.root.to_dict(self.root.start),
+            "hotspots": self.hotspots(limit),
+            "cprofile_skipped": self.cprofile_skipped
+        }
+
+    def top_level_timings(self) -> Dict[str, float]:
+        """第一层各阶段的累计耗时（毫秒），用于Server-Timing响应头"""
+        timings: Dict[str, float] = {}
+        for child in self.root.children:
+            if child.duration is not None:
+                timings[child.name] = timings.get(child.name, 0.0) + child.duration * 1000
+        return timings
+
+    def dump(self, output_dir: str) -> str:
+        """
+        写出剖析结果
+
+        Args:
+            output_dir: 输出目录
+
+        Returns:
+            str: JSON文件路径（同名.prof文件为cProfile原始数据）
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, self.profile_id)
+        with open(base + ".json", "wb") as f:
+            f.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2))
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + ".prof")
+        return base + ".json"
+
+
+def is_profiling() -> bool:
+    """当前上下文是否开启了剖析"""
+    return _current_profile.get() is not None
+
+
+@contextmanager
+def _record_span(profile: Profile, name: str, attrs: Dict[str, Any]):
+    parent = _current_span.get() or profile.root
+    current = Span(name, attrs)
+    profile.add_child(parent, current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+
+
+def span(name: str, **attrs: Any):
+    """
+    记录一个阶段（未开启剖析时为空操作）
+
+    Args:
+        name: 阶段名称，如embed、search、format
+        attrs: 附加信息，如collection、batch_size
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NULL_SPAN
+    return _record_span(profile, name, attrs)
+
+
+@contextmanager
+def profile_session(name: str, use_cprofile: bool = True):
+    """
+    开启一次剖析会话，会话内的span都挂在该会话的span树上
+
+    Args:
+        name: 会话名称
+        use_cprofile: 是否同时采集cProfile统计
+
+    Yields:
+        Profile: 剖析会话，结束后可调用to_dict或dump
+    """
+    profile = Profile(name, use_cprofile)
+    profile_token = _current_profile.set(profile)
+    span_token = _current_span.set(profile.root)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _current_span.reset(span_token)
+        _current_profile.reset(profile_token)
+# ai code end
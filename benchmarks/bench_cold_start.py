@@ -0,0 +1,99 @@
+"""
+冷启动基准测试
+
+测量三项指标：
+1. 导入 app.services.vector_service 的耗时（独立子进程，避免模块缓存影响）
+2. 未预热时第一条检索的耗时
+3. 预热后第一条检索的耗时
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --query "儿童玩具" --collection liangou_regulations --rounds 5
+
+第2、3项需要可用的Milvus和Azure OpenAI配置，不可用时只输出导入耗时。
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# ai code begin && nums:75
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "import app.services.vector_service; "
+    "print(time.perf_counter() - t)"
+)
+
+FIRST_QUERY_SNIPPET = """
+import sys, time
+from app.services.vector_registry import registry
+from app.services.vector_service import VectorService
+query, collection, warm = sys.argv[1], sys.argv[2], sys.argv[3] == "1"
+warmup_elapsed = 0.0
+if warm:
+    t = time.perf_counter()
+    registry.warmup([collection])
+    warmup_elapsed = time.perf_counter() - t
+t = time.perf_counter()
+VectorService(collection).search(query, top_k=10)
+print(warmup_elapsed, time.perf_counter() - t)
+"""
+
+
+def _run_snippet(snippet: str, *args: str) -> str:
+    """在全新的子进程中执行代码片段，返回标准输出"""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", snippet, *args],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+def bench_import(rounds: int) -> list:
+    """测量导入耗时（秒）"""
+    return [float(_run_snippet(IMPORT_SNIPPET)) for _ in range(rounds)]
+
+
+def bench_first_query(query: str, collection: str, warm: bool, rounds: int) -> list:
+    """测量第一条检索耗时，返回 (预热耗时, 首次检索耗时) 列表"""
+    samples = []
+    for _ in range(rounds):
+        output = _run_snippet(FIRST_QUERY_SNIPPET, query, collection, "1" if warm else "0")
+        warmup_elapsed, query_elapsed = output.split()
+        samples.append((float(warmup_elapsed), float(query_elapsed)))
+    return samples
+
+
+def _summary(values: list) -> str:
+    """格式化耗时统计（毫秒）"""
+    return f"median={statistics.median(values) * 1000:.1f}ms min={min(values) * 1000:.1f}ms max={max(values) * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument("--query", default="好看的短袖", help="检索使用的查询文本")
+    parser.add_argument("--collection", default="liangou_regulations", help="检索的集合名称")
+    parser.add_argument("--rounds", type=int, default=3, help="每项测量的重复次数")
+    args = parser.parse_args()
+
+    print(f"导入耗时: {_summary(bench_import(args.rounds))}")
+
+    start = time.perf_counter()
+    try:
+        cold = bench_first_query(args.query, args.collection, warm=False, rounds=args.rounds)
+        warm = bench_first_query(args.query, args.collection, warm=True, rounds=args.rounds)
+    except subprocess.CalledProcessError as e:
+        print(f"⚠️  检索基准跳过（Milvus或Azure不可用）: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+        return
+    print(f"未预热首次检索: {_summary([q for _, q in cold])}")
+    print(f"预热耗时: {_summary([w for w, _ in warm])}")
+    print(f"预热后首次检索: {_summary([q for _, q in warm])}")
+    print(f"总耗时: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
+# ai code end
@@ -0,0 +1,344 @@
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import orjson
+from app.services.column_insert import ColumnInserter
+from base.config import get_config
+from base.metrics import metrics
+from base.profiling import span
+
+if TYPE_CHECKING:
+    from minio import Minio
+    from pymilvus import Collection
+
+
+# ai code begin && nums:324
+FILE_FORMATS = ("parquet", "numpy")
+
+BULK_IMPORT_SECONDS = metrics.histogram(
+    "risk_rag_bulk_import_stage_seconds", "批量导入各阶段耗时（秒）：write / upload / import", ["stage"]
+)
+BULK_IMPORT_BYTES = metrics.counter("risk_rag_bulk_import_uploaded_bytes_total", "批量导入上传到对象存储的字节数")
+
+
+@dataclass
+class BulkImportStats:
+    """批量导入统计"""
+    rows: int = 0
+    files: int = 0
+    uploaded_bytes: int = 0
+    tasks: int = 0
+    imported: int = 0
+    failed: int = 0
+    upload_seconds: float = 0.0
+    import_seconds: float = 0.0
+
+
+def create_minio_client(
+    endpoint: Optional[str] = None,
+    access_key: Optional[str] = None,
+    secret_key: Optional[str] = None,
+    secure: Optional[bool] = None
+) -> "Minio":
+    """
+    创建MinIO客户端（默认取配置BULK_IMPORT_*，即compose中Milvus使用的MinIO）
+
+    Raises:
+        ImportError: 未安装minio
+    """
+    try:
+        from minio import Minio
+    except ImportError:
+        raise ImportError('批量导入需要安装minio（pip install "risk-fda-rag[bulk-import]"）')
+    config = get_config()
+    return Minio(
+        endpoint or config.BULK_IMPORT_ENDPOINT,
+        access_key=access_key or config.BULK_IMPORT_ACCESS_KEY,
+        secret_key=secret_key or config.BULK_IMPORT_SECRET_KEY,
+        secure=config.BULK_IMPORT_SECURE if secure is None else secure
+    )
+
+
+def _parquet_available() -> bool:
+    """是否安装了pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _column_array(name: str, values: Sequence[Any], dtype: Any) -> np.ndarray:
+    """
+    把一列值转换为Milvus导入文件要求的numpy数组
+
+    VARCHAR为Unicode字符串数组（缺失值写空字符串），JSON为序列化后的字符串，数值和布尔按字段类型转换
+    """
+    from pymilvus import DataType
+
+    if dtype == DataType.VARCHAR:
+        return np.array(["" if value is None else str(value) for value in values], dtype=str)
+    if dtype == DataType.JSON:
+        return np.array([orjson.dumps(value).decode() for value in values], dtype=str)
+    numpy_types = {
+        DataType.BOOL: np.bool_,
+        DataType.INT8: np.int8,
+        DataType.INT16: np.int16,
+        DataType.INT32: np.int32,
+        DataType.INT64: np.int64,
+        DataType.FLOAT: np.float32,
+        DataType.DOUBLE: np.float64,
+    }
+    if dtype not in numpy_types:
+        raise ValueError(f"字段{name}的类型{dtype}不支持批量导入")
+    if any(value is None for value in values):
+        raise ValueError(f"字段{name}存在缺失值，数值字段不能为空")
+    return np.asarray(values, dtype=numpy_types[dtype])
+
+
+def write_numpy_files(
+    columns: Dict[str, np.ndarray],
+    vectors: np.ndarray,
+    vector_field: str,
+    directory: str
+) -> List[str]:
+    """
+    按numpy格式写出一块数据：每个字段一个 {字段名}.npy（Milvus按文件名匹配字段）
+
+    Returns:
+        List[str]: 本地文件路径
+    """
+    paths = []
+    for name, array in list(columns.items()) + [(vector_field, np.ascontiguousarray(vectors, dtype=np.float32))]:
+        path = os.path.join(directory, f"{name}.npy")
+        np.save(path, array)
+        paths.append(path)
+    return paths
+
+
+def write_parquet_file(
+    columns: Dict[str, np.ndarray],
+    vectors: np.ndarray,
+    vector_field: str,
+    directory: str
+) -> List[str]:
+    """
+    按Parquet格式写出一块数据：一个文件，向量列为list<float>（由float32矩阵直接构建，不逐行转换）
+
+    Returns:
+        List[str]: 本地文件路径
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rows, dim = vectors.shape
+    offsets = pa.array(np.arange(0, rows * dim + 1, dim, dtype=np.int32))
+    arrays = [pa.array(array) for array in columns.values()]
+    arrays.append(pa.ListArray.from_arrays(offsets, pa.array(vectors.reshape(-1))))
+    table = pa.Table.from_arrays(arrays, names=list(columns.keys()) + [vector_field])
+    path = os.path.join(directory, "data.parquet")
+    pq.write_table(table, path)
+    return [path]
+
+
+class BulkImporter:
+    """
+    通过对象存储批量导入Milvus
+
+    全量重建时逐批gRPC写入的开销（序列化、RPC往返、逐批落盘）随行数线性增长；批量导入把数据
+    按块写成Parquet/numpy文件上传到Milvus所用的存储桶，再由Milvus的do_bulk_insert任务直接读取文件
+    生成分段，总耗时主要取决于文件上传速度。每块上传后立即提交导入任务，Milvus导入前一块时继续上传下一块。
+
+    Parquet需要pyarrow（"risk-fda-rag[bulk]"），未安装时改用numpy格式；上传需要minio（"risk-fda-rag[bulk-import]"）。
+    """
+
+    def __init__(
+        self,
+        collection: "Collection",
+        vector_field: Optional[str] = None,
+        client: Optional["Minio"] = None,
+        bucket: Optional[str] = None,
+        file_format: Optional[str] = None,
+        chunk_rows: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        cleanup: bool = True
+    ):
+        """
+        初始化导入器
+
+        Args:
+            collection: 目标集合
+            vector_field: 向量字段名，为None时使用集合中唯一的FLOAT_VECTOR字段
+            client: MinIO客户端，默认按配置创建
+            bucket: Milvus的存储桶，默认取配置BULK_IMPORT_BUCKET
+            file_format: parquet / numpy，默认取配置BULK_IMPORT_FORMAT
+            chunk_rows: 每个导入任务的行数，默认取配置BULK_IMPORT_CHUNK_ROWS
+            poll_interval: 查询导入进度的间隔（秒）
+            timeout: 等待全部任务完成的最长时间（秒）
+            cleanup: 导入完成后是否删除上传的文件
+
+        Raises:
+            ValueError: 不支持的文件格式
+        """
+        config = get_config()
+        file_format = file_format or config.BULK_IMPORT_FORMAT
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"不支持的导入格式: {file_format}，可选 {FILE_FORMATS}")
+        if file_format == "parquet" and not _parquet_available():
+            print("⚠️  未安装pyarrow，改用numpy格式导入")
+            file_format = "numpy"
+
+        self.collection = collection
+        # 字段列表、类型和向量维度与按列写入保持一致
+        self.schema = ColumnInserter(collection, vector_field)
+        self.client = client or create_minio_client()
+        self.bucket = bucket or config.BULK_IMPORT_BUCKET
+        self.file_format = file_format
+        self.chunk_rows = chunk_rows or config.BULK_IMPORT_CHUNK_ROWS
+        self.poll_interval = config.BULK_IMPORT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.timeout = config.BULK_IMPORT_TIMEOUT if timeout is None else timeout
+        self.cleanup = cleanup
+        # 本次导入的对象前缀，多次运行互不覆盖
+        self.prefix = f"bulk_import/{collection.name}/{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    def write_chunk(self, columns: Dict[str, Sequence[Any]], vectors: np.ndarray, directory: str) -> List[str]:
+        """
+        把一块数据写为本地导入文件
+
+        Args:
+            columns: 标量字段 {字段名: 整列取值}，须包含集合的全部标量字段
+            vectors: 形状为(行数, dim)的向量矩阵
+            directory: 输出目录
+
+        Returns:
+            List[str]: 本地文件路径
+
+        Raises:
+            ValueError: 缺少字段、行数不一致或向量维度不匹配
+        """
+        vectors = np.asarray(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.schema.dim:
+            raise ValueError(f"向量矩阵形状{vectors.shape}与字段{self.schema.vector_field}的维度{self.schema.dim}不匹配")
+        missing = [name for name in self.schema.scalar_fields if name not in columns]
+        if missing:
+            raise ValueError(f"缺少字段: {missing}")
+        arrays: Dict[str, np.ndarray] = {}
+        for name, dtype in self.schema.field_types.items():
+            if len(columns[name]) != len(vectors):
+                raise ValueError(f"字段{name}的行数{len(columns[name])}与向量数{len(vectors)}不一致")
+            arrays[name] = _column_array(name, columns[name], dtype)
+        writer = write_parquet_file if self.file_format == "parquet" else write_numpy_files
+        return writer(arrays, vectors, self.schema.vector_field, directory)
+
+    def upload_chunk(self, columns: Dict[str, Sequence[Any]], vectors: np.ndarray, index: int) -> Tuple[List[str], int]:
+        """
+        写出一块数据并上传到存储桶
+
+        Returns:
+            Tuple: (对象路径列表（相对存储桶）, 上传字节数)
+        """
+        objects, size = [], 0
+        with tempfile.TemporaryDirectory(prefix="bulk_import_") as directory:
+            with BULK_IMPORT_SECONDS.time(stage="write"), span("write", rows=len(vectors), format=self.file_format):
+                paths = self.write_chunk(columns, vectors, directory)
+            with BULK_IMPORT_SECONDS.time(stage="upload"), span("upload", files=len(paths)):
+                for path in paths:
+                    name = f"{self.prefix}/{index:05d}/{os.path.basename(path)}"
+                    self.client.fput_object(self.bucket, name, path)
+                    objects.append(name)
+                    size += os.path.getsize(path)
+        BULK_IMPORT_BYTES.inc(size)
+        return objects, size
+
+    def submit(self, objects: List[str]) -> int:
+        """提交一个导入任务（numpy格式的一组.npy文件或一个Parquet文件）"""
+        from pymilvus import utility
+
+        return utility.do_bulk_insert(self.collection.name, objects, using=self.collection._using)
+
+    def wait(self, tasks: Dict[int, int], stats: BulkImportStats):
+        """
+        轮询导入任务直到全部结束，打印进度
+
+        Args:
+            tasks: {任务ID: 行数}
+            stats: 按任务结果累计imported / failed
+
+        Raises:
+            TimeoutError: 超过timeout仍有任务未结束
+        """
+        from pymilvus import utility
+        from pymilvus.client.types import BulkInsertState
+
+        failed_states = (BulkInsertState.ImportFailed, BulkInsertState.ImportFailedAndCleaned)
+        pending = dict(tasks)
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            progress = []
+            for task_id in list(pending):
+                state = utility.get_bulk_insert_state(task_id, using=self.collection._using)
+                if state.state == BulkInsertState.ImportCompleted:
+                    stats.imported += state.row_count
+                    del pending[task_id]
+                elif state.state in failed_states:
+                    stats.failed += pending.pop(task_id)
+                    print(f"  ✗ 导入任务 {task_id} 失败: {state.failed_reason}")
+                else:
+                    progress.append(state.progress)
+            done = len(tasks) - len(pending)
+            average = sum(progress) / len(progress) if progress else 100
+            print(f"  导入进度: {done}/{len(tasks)} 个任务完成，进行中任务平均 {average:.0f}%，已导入 {stats.imported} 行")
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(pending)} 个导入任务在 {self.timeout} 秒内未完成: {list(pending)}")
+            time.sleep(self.poll_interval)
+
+    def import_chunks(self, chunks: Iterable[Tuple[Dict[str, Sequence[Any]], np.ndarray]]) -> BulkImportStats:
+        """
+        上传全部数据块并等待导入完成
+
+        Args:
+            chunks: 依次产出 (标量列, 向量矩阵)，每块一个导入任务，建议每块chunk_rows行
+
+        Returns:
+            BulkImportStats: 导入统计
+        """
+        stats = BulkImportStats()
+        tasks: Dict[int, int] = {}
+        objects: List[str] = []
+        start = time.perf_counter()
+        for index, (columns, vectors) in enumerate(chunks):
+            names, size = self.upload_chunk(columns, vectors, index)
+            tasks[self.submit(names)] = len(vectors)
+            objects.extend(names)
+            stats.rows += len(vectors)
+            stats.files += len(names)
+            stats.uploaded_bytes += size
+            print(f"  已上传第 {index + 1} 块: {len(vectors)} 行，{size / 1024 / 1024:.1f} MiB")
+        stats.tasks = len(tasks)
+        stats.upload_seconds = time.perf_counter() - start
+
+        wait_start = time.perf_counter()
+        with BULK_IMPORT_SECONDS.time(stage="import"), span("import", tasks=len(tasks)):
+            self.wait(tasks, stats)
+        stats.import_seconds = time.perf_counter() - wait_start
+        # 出错时保留已上传的文件（可能仍有任务在读取），便于排查或手动重新提交
+        if self.cleanup:
+            self.remove_objects(objects)
+        return stats
+
+    def remove_objects(self, objects: List[str]):
+        """删除上传的导入文件（导入完成后Milvus已生成自己的分段文件）"""
+        for name in objects:
+            try:
+                self.client.remove_object(self.bucket, name)
+            except Exception as e:
+                print(f"  ⚠️  删除导入文件失败 {name}: {str(e)[:200]}")
+# ai code end
@@ -0,0 +1,337 @@
+"""
+商品库批量风险筛查
+
+每晚把整个良购产品库（liangou_regulations）与亚马逊法规库（amazon_regulations）比对，
+直接使用集合中已存储的向量，不调用Embedding接口：
+
+1. export：用query_iterator把两个集合的主键、向量和元数据导出为本地向量归档
+   （vectors.npy / ids.npy / metadata.json），向量文件以内存映射方式被各工作进程共享
+2. screen：把产品向量按块分给多个工作进程，两种计算方式：
+   - matrix：分块矩阵乘法（产品向量块 × 法规向量矩阵），纯本地计算，不访问Milvus
+   - milvus：每个工作进程用大批量nq调用collection.search检索法规库
+3. 分数不低于阈值的(SKU, 法规)命中写入Parquet
+
+用法（在项目根目录执行）:
+    python -m risk_rag_qa.core.bulk_screening export --archive-dir ../data/vectors
+    python -m risk_rag_qa.core.bulk_screening screen --archive-dir ../data/vectors --output ../data/screening/flagged.parquet
+    python -m risk_rag_qa.core.bulk_screening screen --mode milvus --workers 4 --threshold 0.9
+    python -m risk_rag_qa.core.bulk_screening screen --profile   # 记录span树和主进程的cProfile统计
+
+写Parquet需要安装pyarrow（pip install "risk-fda-rag[bulk]"），未安装时改为输出同名CSV。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+import pandas as pd
+from app.services.collection_schema import schema_manager
+from app.services.fanout_search import normalize_score
+from app.services.vector_registry import get_milvus_connection_args
+from base.profiling import profile_session, span
+
+
+# ai code begin && nums:300
+PRODUCT_COLLECTION = "liangou_regulations"
+REGULATION_COLLECTION = "amazon_regulations"
+# 导出和检索时附带的元数据字段
+ARCHIVE_FIELDS = {
+    PRODUCT_COLLECTION: ["title_cn"],
+    REGULATION_COLLECTION: ["restricted_product", "url"],
+}
+# 工作进程使用的Milvus连接别名
+SCREEN_CONNECTION_ALIAS = "bulk_screening"
+
+# 工作进程内的全局状态（由进程初始化函数加载，避免每个任务重复传输大数组）
+_worker_state: Dict[str, Any] = {}
+
+
+def _archive_path(archive_dir: str, collection_name: str, filename: str) -> str:
+    """向量归档中某个文件的路径"""
+    return os.path.join(archive_dir, collection_name, filename)
+
+
+def export_collection_vectors(
+    collection_name: str,
+    archive_dir: str,
+    batch_size: int = 4096
+) -> int:
+    """
+    把集合中已存储的向量导出为本地归档
+
+    Args:
+        collection_name: 集合名称
+        archive_dir: 归档根目录，每个集合一个子目录
+        batch_size: query_iterator每批读取的条数
+
+    Returns:
+        int: 导出的条数
+    """
+    from pymilvus import Collection, connections
+
+    spec = schema_manager.get_spec(collection_name)
+    connections.connect(alias=SCREEN_CONNECTION_ALIAS, **get_milvus_connection_args())
+    collection = Collection(collection_name, using=SCREEN_CONNECTION_ALIAS)
+    output_fields = [spec.primary_field, spec.vector_field] + ARCHIVE_FIELDS.get(collection_name, [])
+
+    ids: List[str] = []
+    metadata: List[Dict[str, Any]] = []
+    blocks: List[np.ndarray] = []
+    iterator = collection.query_iterator(batch_size=batch_size, expr="", output_fields=output_fields)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            blocks.append(np.asarray([row[spec.vector_field] for row in rows], dtype=np.float32))
+            for row in rows:
+                ids.append(row[spec.primary_field])
+                metadata.append({name: row.get(name) for name in ARCHIVE_FIELDS.get(collection_name, [])})
+            print(f"  {collection_name}: 已导出 {len(ids)} 条")
+    finally:
+        iterator.close()
+
+    vectors = np.concatenate(blocks) if blocks else np.zeros((0, spec.dim), dtype=np.float32)
+    os.makedirs(os.path.join(archive_dir, collection_name), exist_ok=True)
+    np.save(_archive_path(archive_dir, collection_name, "vectors.npy"), vectors)
+    np.save(_archive_path(archive_dir, collection_name, "ids.npy"), np.asarray(ids, dtype=str))
+    with open(_archive_path(archive_dir, collection_name, "metadata.json"), "wb") as f:
+        f.write(orjson.dumps(metadata))
+    return len(ids)
+
+
+def load_vector_archive(archive_dir: str, collection_name: str) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+    """
+    读取向量归档
+
+    Args:
+        archive_dir: 归档根目录
+        collection_name: 集合名称
+
+    Returns:
+        Tuple: (主键数组, 向量矩阵（内存映射，只读）, 元数据列表)
+    """
+    ids = np.load(_archive_path(archive_dir, collection_name, "ids.npy"))
+    vectors = np.load(_archive_path(archive_dir, collection_name, "vectors.npy"), mmap_mode="r")
+    with open(_archive_path(archive_dir, collection_name, "metadata.json"), "rb") as f:
+        metadata = orjson.loads(f.read())
+    return ids, vectors, metadata
+
+
+def _init_worker(archive_dir: str, mode: str, search_params: Optional[Dict[str, Any]]):
+    """工作进程初始化：内存映射产品向量，按计算方式加载法规向量或建立Milvus连接"""
+    _, product_vectors, _ = load_vector_archive(archive_dir, PRODUCT_COLLECTION)
+    _worker_state["products"] = product_vectors
+    if mode == "matrix":
+        _, regulation_vectors, _ = load_vector_archive(archive_dir, REGULATION_COLLECTION)
+        # 法规库很小，整体读入内存并转置一次，每个块只做一次矩阵乘法
+        _worker_state["regulations_t"] = np.ascontiguousarray(regulation_vectors.T)
+    else:
+        from pymilvus import Collection, connections
+
+        connections.connect(alias=SCREEN_CONNECTION_ALIAS, **get_milvus_connection_args())
+        spec = schema_manager.get_spec(REGULATION_COLLECTION)
+        _worker_state["collection"] = Collection(REGULATION_COLLECTION, using=SCREEN_CONNECTION_ALIAS)
+        _worker_state["anns_field"] = spec.vector_field
+        _worker_state["metric_type"] = spec.index.metric_type
+        _worker_state["search_params"] = search_params
+
+
+def _screen_block_matrix(start: int, end: int, top_k: int, threshold: float) -> List[Tuple[int, int, float]]:
+    """
+    分块矩阵乘法筛查一个产品块
+
+    Embedding向量已归一化，内积即余弦相似度，与normalize_score的换算方式一致。
+
+    Returns:
+        List[Tuple]: (产品行号, 法规行号, 归一化分数)
+    """
+    block = np.asarray(_worker_state["products"][start:end], dtype=np.float32)
+    cosine = block @ _worker_state["regulations_t"]
+    k = min(top_k, cosine.shape[1])
+    if k == 0:
+        return []
+    # 每行只取前k个，再按阈值过滤（阈值先换算到余弦空间，避免对整个矩阵做换算）
+    top = np.argpartition(-cosine, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(cosine, top, axis=1)
+    rows, cols = np.nonzero(top_scores >= 2.0 * threshold - 1.0)
+    return [
+        (start + int(row), int(top[row, col]), normalize_score(float(top_scores[row, col]), "IP"))
+        for row, col in zip(rows, cols)
+    ]
+
+
+def _screen_block_milvus(start: int, end: int, top_k: int, threshold: float) -> List[Tuple[int, str, float]]:
+    """
+    用一次大批量检索（nq = 块大小）筛查一个产品块
+
+    Returns:
+        List[Tuple]: (产品行号, 法规主键, 归一化分数)
+    """
+    block = np.asarray(_worker_state["products"][start:end], dtype=np.float32)
+    metric_type = _worker_state["metric_type"]
+    results = _worker_state["collection"].search(
+        data=block.tolist(),
+        anns_field=_worker_state["anns_field"],
+        param=schema_manager.search_params(REGULATION_COLLECTION, _worker_state["search_params"], top_k),
+        limit=top_k
+    )
+    hits = []
+    for offset, row_hits in enumerate(results):
+        for hit in row_hits:
+            score = normalize_score(hit.distance, metric_type)
+            if score >= threshold:
+                hits.append((start + offset, hit.id, score))
+    return hits
+
+
+def screen_catalog(
+    archive_dir: str,
+    mode: str = "matrix",
+    top_k: int = 5,
+    threshold: float = 0.9,
+    block_size: int = 2048,
+    workers: Optional[int] = None,
+    search_params: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    全量筛查产品库
+
+    Args:
+        archive_dir: 向量归档根目录
+        mode: matrix（本地分块矩阵乘法）或milvus（批量检索法规库）
+        top_k: 每个产品最多保留的法规命中数
+        threshold: 归一化分数阈值（与多集合检索的score一致，范围[0, 1]）
+        block_size: 每个任务处理的产品数（milvus模式下即每次检索的nq）
+        workers: 工作进程数，默认为CPU核数
+        search_params: milvus模式下覆盖的检索参数，如{"ef": 64}
+
+    Returns:
+        DataFrame: 命中列表，每行包含sku、title_cn、regulation_id、restricted_product、url、score
+    """
+    if mode not in ("matrix", "milvus"):
+        raise ValueError(f"不支持的计算方式: {mode}")
+
+    with span("load"):
+        product_ids, product_vectors, product_metadata = load_vector_archive(archive_dir, PRODUCT_COLLECTION)
+        regulation_ids, _, regulation_metadata = load_vector_archive(archive_dir, REGULATION_COLLECTION)
+    regulation_rows = {str(pk): i for i, pk in enumerate(regulation_ids)}
+    total = len(product_ids)
+    screen_block = _screen_block_matrix if mode == "matrix" else _screen_block_milvus
+
+    hits: List[Tuple[int, Any, float]] = []
+    # 块的计算在工作进程中进行，cProfile只覆盖主进程，工作进程的耗时体现在screen阶段的span上
+    with span("screen", mode=mode, products=total), ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(archive_dir, mode, search_params)
+    ) as executor:
+        futures = [
+            executor.submit(screen_block, start, min(start + block_size, total), top_k, threshold)
+            for start in range(0, total, block_size)
+        ]
+        for i, future in enumerate(futures, 1):
+            hits.extend(future.result())
+            if i % 10 == 0 or i == len(futures):
+                print(f"  已完成 {i}/{len(futures)} 块, 命中 {len(hits)} 条")
+
+    with span("assemble", hits=len(hits)):
+        return _assemble_hits(
+            hits, mode, product_ids, product_metadata, regulation_ids, regulation_metadata, regulation_rows
+        )
+
+
+def _assemble_hits(
+    hits: List[Tuple[int, Any, float]],
+    mode: str,
+    product_ids: np.ndarray,
+    product_metadata: List[Dict[str, Any]],
+    regulation_ids: np.ndarray,
+    regulation_metadata: List[Dict[str, Any]],
+    regulation_rows: Dict[str, int]
+) -> pd.DataFrame:
+    """把命中的(产品行号, 法规, 分数)还原为带SKU和法规信息的结果表"""
+    records = []
+    for product_row, regulation, score in hits:
+        # matrix模式返回法规行号，milvus模式返回法规主键
+        regulation_row = regulation if mode == "matrix" else regulation_rows.get(str(regulation))
+        regulation_info = regulation_metadata[regulation_row] if regulation_row is not None else {}
+        records.append({
+            "sku": str(product_ids[product_row]),
+            "title_cn": product_metadata[product_row].get("title_cn"),
+            "regulation_id": str(regulation_ids[regulation_row]) if regulation_row is not None else str(regulation),
+            "restricted_product": regulation_info.get("restricted_product"),
+            "url": regulation_info.get("url"),
+            "score": score
+        })
+    columns = ["sku", "title_cn", "regulation_id", "restricted_product", "url", "score"]
+    return pd.DataFrame.from_records(records, columns=columns).sort_values(
+        ["sku", "score"], ascending=[True, False], ignore_index=True
+    )
+
+
+def write_results(df: pd.DataFrame, output_path: str) -> str:
+    """
+    写出筛查结果，优先Parquet，未安装pyarrow时写CSV
+
+    Returns:
+        str: 实际写出的文件路径
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    try:
+        df.to_parquet(output_path, index=False)
+        return output_path
+    except ImportError:
+        csv_path = os.path.splitext(output_path)[0] + ".csv"
+        print(f"⚠️  未安装pyarrow，改为输出CSV: {csv_path}")
+        df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        return csv_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="商品库批量风险筛查")
+    parser.add_argument("command", choices=["export", "screen"], help="export导出向量归档，screen执行筛查")
+    parser.add_argument("--archive-dir", default="../data/vectors", help="向量归档根目录")
+    parser.add_argument("--output", default="../data/screening/flagged.parquet", help="筛查结果输出路径")
+    parser.add_argument("--mode", choices=["matrix", "milvus"], default="matrix", help="计算方式")
+    parser.add_argument("--top-k", type=int, default=5, help="每个产品最多保留的命中数")
+    parser.add_argument("--threshold", type=float, default=0.9, help="归一化分数阈值")
+    parser.add_argument("--block-size", type=int, default=2048, help="每个任务处理的产品数")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数")
+    parser.add_argument("--ef", type=int, default=None, help="milvus模式下的HNSW ef")
+    parser.add_argument("--profile", action="store_true", help="记录span树和cProfile统计")
+    parser.add_argument("--profile-dir", default="../logs/profiles", help="剖析结果输出目录")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        profile = stack.enter_context(profile_session(f"bulk_{args.command}")) if args.profile else None
+        if args.command == "export":
+            for collection_name in (PRODUCT_COLLECTION, REGULATION_COLLECTION):
+                with span("export", collection=collection_name):
+                    count = export_collection_vectors(collection_name, args.archive_dir)
+                print(f"✓ {collection_name}: 导出 {count} 条")
+        else:
+            df = screen_catalog(
+                args.archive_dir,
+                mode=args.mode,
+                top_k=args.top_k,
+                threshold=args.threshold,
+                block_size=args.block_size,
+                workers=args.workers,
+                search_params={"ef": args.ef} if args.ef else None
+            )
+            with span("write", rows=len(df)):
+                path = write_results(df, args.output)
+            print(f"✓ 命中 {len(df)} 条，涉及 {df['sku'].nunique()} 个SKU，已写入 {path}")
+    print(f"总耗时: {time.perf_counter() - start:.1f}s")
+    if profile is not None:
+        print(f"剖析结果已写入: {profile.dump(args.profile_dir)}")
+
+
+if __name__ == "__main__":
+    main()
+# ai code end
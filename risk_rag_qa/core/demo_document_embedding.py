@@ -1,21 +1,27 @@
 import os
+import numpy as np
 from dotenv import load_dotenv
 from risk_rag_qa.risk_document_loaders.risk_csvloader import RiskCSVLoader
 from langchain_openai import AzureOpenAIEmbeddings
 from langchain_community.vectorstores import Milvus
+from pymilvus import connections
+from app.services.collection_schema import schema_manager
+from app.services.column_insert import ColumnInserter
+from app.services.token_budget import TokenBudgetEmbeddings
+from app.services.vector_service import get_milvus_connection_args
 
 # 加载环境变量
 load_dotenv()
 
-# ai code begin && nums:22
-# 1. 加载CSV为Document
+# ai code begin && nums:15
+# 1. 加载CSV为列式文档批次
 # 注意：Milvus字段名不支持中文，需要将中文字段名映射为英文
 loader = RiskCSVLoader(
     file_path="../data/processed/处理后产品库标题向量数据.csv",
     content_columns=["lib_main_sku", "关键词"],
     metadata_columns=["受限品", "URL"]
 )
-documents = loader.load()
+documents = loader.load_batch()
 
 # 将元数据中的中文字段名映射为英文（Milvus要求字段名以字母或下划线开头）
 field_mapping = {
@@ -23,40 +29,52 @@ field_mapping = {
     "关键词": "keyword",
     "URL": "url"
 }
-
-for doc in documents:
-    new_metadata = {}
-    for key, value in doc.metadata.items():
-        new_key = field_mapping.get(key, key)
-        new_metadata[new_key] = value
-    doc.metadata = new_metadata
+documents = documents.rename_columns(field_mapping)
 # ai code end
 
-# ai code begin && nums:9
+# ai code begin && nums:8
 # 2. 创建Azure OpenAI Embedding模型
-embeddings = AzureOpenAIEmbeddings(
+# 外层按token预算打包请求，超长文本切段后合并为一个向量
+embeddings = TokenBudgetEmbeddings(AzureOpenAIEmbeddings(
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
     azure_deployment=os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
     api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     api_version=os.getenv("AZURE_OPENAI_API_VERSION")
-
-
-)
+))
 # ai code end
 
 # 3. 存入Milvus向量数据库
-vector_store = Milvus.from_documents(
-    documents=documents,
-    embedding=embeddings,
-    connection_args={
-        "host": os.getenv("MILVUS_HOST"),
-        "port": os.getenv("MILVUS_PORT"),
-        "user": os.getenv("MILVUS_USER"),
-        "password": os.getenv("MILVUS_PASSWORD"),
-        "db_name": os.getenv("MILVUS_DB_NAME")
-    },
-    collection_name="amazon_regulations"
+# 先按声明的结构显式创建集合和索引，再写入数据（主键使用行号）
+connection_args = get_milvus_connection_args()
+connections.connect(alias="amazon_ingest", **connection_args)
+collection_spec = schema_manager.get_spec("amazon_regulations")
+collection = schema_manager.ensure_collection("amazon_regulations", using="amazon_ingest")
+
+# ai code begin && nums:23
+# 按列写入：向量为连续的float32矩阵，标量字段整列取出，不经过add_texts的逐行dict和float列表
+INSERT_BATCH_SIZE = 500
+inserter = ColumnInserter(collection, collection_spec.vector_field)
+for start in range(0, len(documents), INSERT_BATCH_SIZE):
+    batch = documents[start:start + INSERT_BATCH_SIZE]
+    vectors = np.asarray(embeddings.embed_documents(batch.texts.tolist()), dtype=np.float32)
+    columns = {name: batch.column_values(name) for name in ["source", "row_index"] + batch.column_names}
+    columns[collection_spec.primary_field] = [str(i) for i in batch.row_index.tolist()]
+    columns[collection_spec.text_field] = batch.texts.tolist()
+    inserter.insert(columns, vectors)
+collection.flush()
+print(f"Embedding请求统计: {embeddings.get_metrics()}")
+
+vector_store = Milvus(
+    embedding_function=embeddings,
+    connection_args=connection_args,
+    collection_name="amazon_regulations",
+    index_params=collection_spec.index.to_index_params(),
+    search_params=schema_manager.search_params("amazon_regulations"),
+    primary_field=collection_spec.primary_field,
+    text_field=collection_spec.text_field,
+    vector_field=collection_spec.vector_field
 )
+# ai code end
 
 # 4. 检索测试
 results = vector_store.similarity_search("alcohol beer", k=3)
@@ -0,0 +1,264 @@
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+from app.services.collection_schema import CollectionSpec
+from app.services.column_insert import ColumnInserter
+from base.metrics import metrics
+from base.profiling import span
+from app.services.token_budget import TokenBudgetEmbeddings
+from risk_rag_qa.core.title_dedup import DedupResult, TitleDeduplicator
+from risk_rag_qa.risk_document_loaders.document_batch import DocumentBatch
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+    from pymilvus import Collection
+    from risk_rag_qa.core.bulk_import import BulkImporter
+
+
+# ai code begin && nums:243
+# 记录近似重复分组的标量字段
+DUP_GROUP_FIELD = "dup_group"
+
+INGEST_STAGE_SECONDS = metrics.histogram(
+    "risk_rag_ingest_stage_seconds", "入库各阶段耗时（秒）：dedup / embed / insert / bulk_import", ["stage"]
+)
+INGEST_RETRIES = metrics.counter("risk_rag_ingest_retries_total", "入库重试次数", ["action"])
+INGEST_DOCUMENTS = metrics.counter("risk_rag_ingest_documents_total", "入库文档数", ["result"])
+
+
+@dataclass
+class IngestStats:
+    """入库统计"""
+    documents: int = 0
+    groups: int = 0
+    embedded: int = 0
+    inserted: int = 0
+    failed: int = 0
+
+    @property
+    def saved_embeddings(self) -> int:
+        """去重节省的向量化次数"""
+        return self.documents - self.groups
+
+
+class DedupIngestor:
+    """
+    去重入库
+
+    入库前先对标题做近似去重，每组只向量化代表标题一次，
+    组内所有SKU复用代表的向量写入集合，并在dup_group字段记录分组ID（代表的SKU），
+    SKU一条都不少，Embedding调用次数按分组数计算。
+    代表向量保存在一个float32矩阵中，写入时按列组装请求（ColumnInserter），不构建逐行dict。
+    全量重建时可以传入BulkImporter，改为写文件上传到对象存储后由Milvus批量导入。
+    """
+
+    def __init__(
+        self,
+        collection: "Collection",
+        spec: CollectionSpec,
+        embeddings: "Embeddings",
+        deduplicator: Optional[TitleDeduplicator] = None,
+        embed_batch_size: int = 64,
+        insert_batch_size: int = 500,
+        max_retries: int = 3,
+        retry_delay: float = 5.0,
+        bulk_importer: Optional["BulkImporter"] = None
+    ):
+        """
+        初始化入库器
+
+        Args:
+            collection: 目标集合（按spec创建）
+            spec: 集合结构定义
+            embeddings: Embedding模型，非TokenBudgetEmbeddings时自动包装
+            deduplicator: 标题去重器，为None时使用默认参数
+            embed_batch_size: 每次Embedding请求的最大文本数（同时受token预算约束）
+            insert_batch_size: 每次写入Milvus的条数
+            max_retries: 每批最大重试次数
+            retry_delay: 重试前等待秒数
+            bulk_importer: 批量导入器，为None时逐批gRPC写入
+        """
+        self.collection = collection
+        self.spec = spec
+        # 按token预算打包请求：短标题一次请求可以装入更多条，长文本不会让整批超限
+        if not isinstance(embeddings, TokenBudgetEmbeddings):
+            embeddings = TokenBudgetEmbeddings(embeddings, max_items_per_request=embed_batch_size)
+        self.embeddings = embeddings
+        self.deduplicator = deduplicator or TitleDeduplicator()
+        self.embed_batch_size = embed_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # 按列写入：以集合实际的字段为准，重建前的旧集合没有dup_group字段时不写该字段
+        self.inserter = ColumnInserter(collection, spec.vector_field)
+        self.bulk_importer = bulk_importer
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        """是否值得重试：数据本身不合法（缺字段、类型或长度不符）时重试也不会成功"""
+        from pymilvus.exceptions import DataNotMatchException, ParamError
+
+        return not isinstance(error, (ValueError, ParamError, DataNotMatchException))
+
+    def _with_retry(self, action: str, func, *args):
+        """带重试地执行一次调用，重试用尽或遇到不可重试的错误时抛出该异常"""
+        for retry in range(self.max_retries):
+            try:
+                return func(*args)
+            except Exception as e:
+                if retry == self.max_retries - 1 or not self._retryable(e):
+                    raise
+                INGEST_RETRIES.inc(action=action)
+                print(f"  ✗ {action}失败（重试 {retry + 1}/{self.max_retries}）: {str(e)[:200]}")
+                time.sleep(self.retry_delay)
+
+    def embed_representatives(self, texts: List[str], dedup: DedupResult) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        只向量化每组的代表文本
+
+        某次请求重试用尽时记录失败并继续后面的请求，不丢弃已经完成的向量化结果。
+
+        Args:
+            texts: 全部文本
+            dedup: 去重结果
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: float32向量矩阵（第k行是dedup.representative_indexes()[k]的向量）
+                和对应的布尔数组（该行是否向量化成功）
+        """
+        indexes = dedup.representative_indexes()
+        vectors = np.zeros((len(indexes), self.inserter.dim), dtype=np.float32)
+        embedded = np.zeros(len(indexes), dtype=bool)
+        done = 0
+        # 按token预算打包，每个包是一次请求，失败时只重试这一次请求
+        for packed in self.embeddings.pack_texts([texts[i] for i in indexes]):
+            try:
+                with INGEST_STAGE_SECONDS.time(stage="embed"), span("embed", texts=len(packed)):
+                    result = self._with_retry(
+                        "向量化", self.embeddings.embed_documents, [texts[indexes[i]] for i in packed]
+                    )
+            except Exception as e:
+                print(f"  ✗ {len(packed)} 条代表标题向量化失败，对应分组跳过: {str(e)[:200]}")
+                continue
+            # 每次请求的结果立即写入连续矩阵，不保留逐个Python float的列表
+            vectors[packed] = result
+            embedded[packed] = True
+            done += len(packed)
+            print(f"  向量化进度: {done}/{len(indexes)}（本次请求 {len(packed)} 条）")
+        return vectors, embedded
+
+    def _build_columns(self, batch: DocumentBatch, ids: Sequence[str], group_ids: List[str]) -> Dict[str, List[Any]]:
+        """
+        按集合结构构建一批标量列，每个字段从批次中整段取出，不经过逐行的元数据字典
+
+        批次中没有的字段不放入结果，由ColumnInserter报告缺少的字段。
+        """
+        available = set(batch.column_names) | ({"source"} if batch.source is not None else set()) | {"row_index"}
+        columns: Dict[str, List[Any]] = {}
+        for name in self.inserter.scalar_fields:
+            if name == self.spec.primary_field:
+                columns[name] = list(ids)
+            elif name == self.spec.text_field:
+                columns[name] = batch.texts.tolist()
+            elif name == DUP_GROUP_FIELD:
+                columns[name] = group_ids
+            elif name in available:
+                columns[name] = batch.column_values(name)
+        return columns
+
+    def ingest(self, documents: Union[DocumentBatch, List["Document"]], ids: List[str]) -> IngestStats:
+        """
+        去重、向量化并写入全部文档
+
+        Args:
+            documents: 待写入的文档，列式批次（RiskCSVLoader.load_batch）或Document列表
+            ids: 与documents一一对应的主键（SKU）
+
+        Returns:
+            IngestStats: 入库统计
+        """
+        if not isinstance(documents, DocumentBatch):
+            documents = DocumentBatch.from_documents(documents)
+        texts = documents.texts.tolist()
+        with INGEST_STAGE_SECONDS.time(stage="dedup"), span("dedup", texts=len(texts)):
+            dedup = self.deduplicator.group(texts)
+        stats = IngestStats(documents=len(documents), groups=dedup.unique_count)
+        print(f"去重: {len(documents)} 条标题归为 {dedup.unique_count} 组")
+
+        vectors, embedded = self.embed_representatives(texts, dedup)
+        stats.embedded = int(embedded.sum())
+        # 每条文本对应的代表在向量矩阵中的行号
+        vector_rows = np.empty(len(texts), dtype=np.int64)
+        vector_rows[dedup.representative_indexes()] = np.arange(len(vectors))
+        vector_rows = vector_rows[np.asarray(dedup.representatives, dtype=np.int64)]
+        group_ids = [ids[rep] for rep in dedup.representatives]
+
+        # 代表向量化失败的分组整组不写入，计入failed，其余文档照常写入
+        written = embedded[vector_rows]
+        if not written.all():
+            keep = np.flatnonzero(written)
+            skipped = len(documents) - len(keep)
+            stats.failed += skipped
+            INGEST_DOCUMENTS.inc(skipped, result="failed")
+            print(f"  ✗ {skipped} 条文档所属分组向量化失败，不写入")
+            documents = documents.take(keep)
+            ids = [ids[i] for i in keep]
+            group_ids = [group_ids[i] for i in keep]
+            vector_rows = vector_rows[keep]
+        if self.bulk_importer is not None:
+            return self._bulk_import(documents, ids, group_ids, vectors, vector_rows, stats)
+
+        for start in range(0, len(documents), self.insert_batch_size):
+            end = min(start + self.insert_batch_size, len(documents))
+            count = end - start
+            columns = self._build_columns(documents[start:end], ids[start:end], group_ids[start:end])
+            try:
+                with INGEST_STAGE_SECONDS.time(stage="insert"), span("insert", rows=count):
+                    # 按行号取出本批向量（连续的float32矩阵），按列写入
+                    self._with_retry("写入", self.inserter.insert, columns, vectors[vector_rows[start:end]])
+                stats.inserted += count
+                INGEST_DOCUMENTS.inc(count, result="inserted")
+            except Exception as e:
+                stats.failed += count
+                INGEST_DOCUMENTS.inc(count, result="failed")
+                print(f"  ✗ 第 {start + 1}-{end} 条写入失败: {str(e)[:200]}")
+        with span("flush"):
+            self.collection.flush()
+        return stats
+
+    def _bulk_import(
+        self,
+        documents: DocumentBatch,
+        ids: List[str],
+        group_ids: List[str],
+        vectors: np.ndarray,
+        vector_rows: np.ndarray,
+        stats: IngestStats
+    ) -> IngestStats:
+        """按BulkImporter的块大小组装列和向量，上传后等待Milvus导入完成（导入生成的分段无需flush）"""
+        chunk_rows = self.bulk_importer.chunk_rows
+        chunks = (
+            (
+                self._build_columns(
+                    documents[start:start + chunk_rows],
+                    ids[start:start + chunk_rows],
+                    group_ids[start:start + chunk_rows]
+                ),
+                vectors[vector_rows[start:start + chunk_rows]]
+            )
+            for start in range(0, len(documents), chunk_rows)
+        )
+        with INGEST_STAGE_SECONDS.time(stage="bulk_import"), span("bulk_import", rows=len(documents)):
+            result = self.bulk_importer.import_chunks(chunks)
+        stats.inserted = result.imported
+        stats.failed += result.failed
+        INGEST_DOCUMENTS.inc(result.imported, result="inserted")
+        INGEST_DOCUMENTS.inc(result.failed, result="failed")
+        print(
+            f"批量导入: 上传 {result.files} 个文件 {result.uploaded_bytes / 1024 / 1024:.1f} MiB"
+            f"（{result.upload_seconds:.1f}s），导入等待 {result.import_seconds:.1f}s"
+        )
+        return stats
+# ai code end
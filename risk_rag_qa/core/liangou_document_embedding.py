@@ -1,11 +1,37 @@
 import os
+import sys
+from contextlib import ExitStack
+import numpy as np
 from dotenv import load_dotenv
 from risk_rag_qa.risk_document_loaders.risk_csvloader import RiskCSVLoader
 from langchain_openai import AzureOpenAIEmbeddings
 from langchain_community.vectorstores import Milvus
+from pymilvus import connections
+from app.services.collection_schema import schema_manager
+from app.services.collection_versions import CollectionVersionManager
+from app.services.vector_service import get_milvus_connection_args
+from app.services.token_budget import TokenBudgetEmbeddings
+from risk_rag_qa.core.bulk_import import BulkImporter
+from risk_rag_qa.core.ingest_engine import DedupIngestor
+from risk_rag_qa.core.title_dedup import TitleDeduplicator
+from base.config import get_config
+from base.profiling import profile_session, span
 import time
 
 start = time.time()
+# ai code begin && nums:11
+# python liangou_document_embedding.py --profile：记录本次入库的span树（load → dedup → embed → insert）
+# 和cProfile统计，结束后写入PROFILE_DIR
+PROFILE_DIR = "../logs/profiles"
+_profile_stack = ExitStack()
+profile = _profile_stack.enter_context(profile_session("liangou_ingest")) if "--profile" in sys.argv else None
+# python liangou_document_embedding.py --bulk-import：全量重建时把向量和元数据写成文件上传到Milvus的MinIO，
+# 由Milvus批量导入（配置见[bulk_import]节），不再逐批gRPC写入
+BULK_IMPORT = "--bulk-import" in sys.argv
+# python liangou_document_embedding.py --rebuild：全量写入新的版本集合，建好索引、加载并校验通过后
+# 才把集合名（Milvus别名）切换过去，重建期间检索仍由旧版本提供；旧版本保留用于回滚
+REBUILD = "--rebuild" in sys.argv
+# ai code end
 # ============================================================================
 # 环境变量加载
 # ============================================================================
@@ -15,8 +41,8 @@ load_dotenv()
 # ============================================================================
 # 数据字段处理部分
 # ============================================================================
-# ai code begin && nums:22
-# 1. 加载CSV文件为Document对象
+# ai code begin && nums:30
+# 1. 加载CSV文件为列式文档批次（不为每行创建Document和元数据字典）
 # 注意：Milvus字段名不支持中文，需要将中文字段名映射为英文
 loader = RiskCSVLoader(
     file_path="../data/processed/处理后产品库标题向量数据.csv",
@@ -29,7 +55,8 @@ loader = RiskCSVLoader(
     # 元数据字段：metadata（包含"受限品"和"URL"等信息）
     metadata_columns=["lib_main_sku", "title_cn"]
 )
-documents = loader.load()
+with span("load"):
+    documents = loader.load_batch()
 
 # 2. 字段名映射：将中文字段名映射为英文（Milvus要求字段名以字母或下划线开头）
 # 映射规则：
@@ -43,19 +70,8 @@ field_mapping = {
     "URL": "url"
 }
 """
-
-# 遍历所有文档，将元数据中的中文字段名替换为英文字段名
-for doc in documents:
-    new_metadata = {}
-    for key, value in doc.metadata.items():
-        """
-        如果有列名是中文,需要进行替换则加入下面两行
-        # new_key = field_mapping.get(key, key)
-        # new_metadata[new_key] = value
-        """
-
-        new_metadata[key] = value
-    doc.metadata = new_metadata
+# 如果有列名是中文需要替换，只需重命名批次的列（不复制数据）：
+# documents = documents.rename_columns(field_mapping)
 # ai code end
 
 # ============================================================================
@@ -81,148 +97,146 @@ embeddings = AzureOpenAIEmbeddings(
 # ============================================================================
 # 4. 连接Milvus向量数据库（增量插入模式）
 # Milvus是一个开源的向量数据库，专门用于存储和检索高维向量数据
-vector_store = Milvus(
-    embedding_function=embeddings,  # Embedding模型，用于将文本转换为向量
-    # Milvus数据库连接参数
-    connection_args={
-        "host": os.getenv("MILVUS_HOST"),      # Milvus服务器地址
-        "port": os.getenv("MILVUS_PORT"),      # Milvus服务器端口
-        "user": os.getenv("MILVUS_USER"),      # 数据库用户名
-        "password": os.getenv("MILVUS_PASSWORD"),  # 数据库密码
-        "db_name": os.getenv("MILVUS_DB_NAME")     # 数据库名称
-    },
-    # 集合名称（类似关系数据库中的表名）
-    # 如果集合不存在会自动创建，如果存在则追加数据
-    collection_name="liangou_regulations"
-)
+# 集合名称（类似关系数据库中的表名）
+# ai code begin && nums:1
+COLLECTION_NAME = get_config().PRODUCT_COLLECTION
+# ai code end
+# Milvus数据库连接参数（host/port/user/password/db_name，从环境变量读取）
+connection_args = get_milvus_connection_args()
+
+# 按声明的结构显式创建集合和HNSW索引（主键为SKU，标量字段有明确类型）
+# 如果集合已存在则直接复用，追加数据
+connections.connect(alias="liangou_ingest", **connection_args)
+collection_spec = schema_manager.get_spec(COLLECTION_NAME)
+# ai code begin && nums:17
+# 全量重建时数据写入新的版本集合，这里不创建业务集合：
+# 否则首次部署时会先建出一个空的普通集合，切换别名时被当作旧版本改名保留为回滚目标
+collection = None if REBUILD else schema_manager.ensure_collection(COLLECTION_NAME, using="liangou_ingest")
+
+
+def build_vector_store() -> Milvus:
+    """业务集合（重建后为指向新版本的别名）的LangChain检索对象，入库完成后用于检索测试"""
+    return Milvus(
+        embedding_function=embeddings,  # Embedding模型，用于将文本转换为向量
+        connection_args=connection_args,
+        collection_name=COLLECTION_NAME,
+        index_params=collection_spec.index.to_index_params(),
+        search_params=schema_manager.search_params(COLLECTION_NAME),
+        primary_field=collection_spec.primary_field,
+        text_field=collection_spec.text_field,
+        vector_field=collection_spec.vector_field
+    )
+# ai code end
 
 # ============================================================================
-# 断点续传配置部分
+# 去重与重试配置部分
 # ============================================================================
-# ai code begin && nums:15
-# 断点续传配置：手动设置起始批次号（从1开始，设置为1表示从头开始）
-# 例如：如果上次失败在4447批次，则设置为4447，程序会从该批次继续
-START_BATCH_NUM = 4447  # 手动设置起始批次号，从1开始
+# ai code begin && nums:12
+# 以下取值来自base.config（config.ini的[ingest]/[embedding]节，或同名环境变量）
+config = get_config()
+# 标题近似去重：字符2-gram的Jaccard相似度不低于该值的标题归为一组，每组只向量化一次（1.0表示只合并完全相同的标题）
+DEDUP_THRESHOLD = config.DEDUP_THRESHOLD
+# 每次Embedding请求的token预算和最大文本数（两者先达到哪个就发送），每次写入Milvus的条数
+EMBED_TOKENS_PER_REQUEST = config.EMBED_TOKENS_PER_REQUEST
+EMBED_BATCH_SIZE = config.INGEST_EMBED_BATCH_SIZE
+INSERT_BATCH_SIZE = config.INGEST_INSERT_BATCH_SIZE
 
 # 重试配置
-MAX_RETRIES = 3  # 每个批次最大重试次数
-RETRY_DELAY = 5  # 重试前等待时间（秒）
+MAX_RETRIES = config.INGEST_MAX_RETRIES  # 每个批次最大重试次数
+RETRY_DELAY = config.INGEST_RETRY_DELAY  # 重试前等待时间（秒）
 # ai code end
 
 # 5. 增量插入：检查已存在数据，只插入新数据
 print(f"总共加载了 {len(documents)} 个文档")
 
-# 获取已存在的文档标识（使用lib_main_sku作为唯一标识）
-existing_skus = set()
-try:
-    existing_docs = vector_store.similarity_search("", k=10000)
-    for doc in existing_docs:
-        if "lib_main_sku" in doc.metadata:
-            existing_skus.add(str(doc.metadata["lib_main_sku"]))
-    print(f"集合中已存在 {len(existing_skus)} 条记录")
-except Exception:
-    print("集合可能不存在或为空，将创建新集合")
+# ai code begin && nums:26
+# 生成IDs（即集合主键）：使用lib_main_sku作为ID，如果没有则使用行号生成
+all_ids = [
+    str(sku) if sku else f"row_{row_index}"
+    for sku, row_index in zip(documents.column_values("lib_main_sku"), documents.row_index.tolist())
+]
+
+# 断点续传：用主键迭代器读出集合中已有的全部主键（不受检索条数上限影响），已写入的行跳过。
+# Milvus插入时不按主键去重，重复写入会产生重复行，所以读取失败时直接报错，不当作空集合继续写入。
+existing_ids = set()
+if not REBUILD:
+    collection.load()
+    iterator = collection.query_iterator(batch_size=10000, expr="", output_fields=[collection_spec.primary_field])
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            existing_ids.update(str(row[collection_spec.primary_field]) for row in rows)
+    finally:
+        iterator.close()
+    print(f"集合中已存在 {len(existing_ids)} 条记录")
 
-# 过滤出新文档
-new_documents = []
-for doc in documents:
-    sku = doc.metadata.get("lib_main_sku")
-    if sku and str(sku) not in existing_skus:
-        new_documents.append(doc)
-    elif not sku:
-        new_documents.append(doc)
+# 过滤出新文档：按主键计算掩码后取子批次；重建时写入全部文档
+new_mask = np.array([doc_id not in existing_ids for doc_id in all_ids], dtype=bool)
+new_documents = documents.take(new_mask)
+ids = [doc_id for doc_id, is_new in zip(all_ids, new_mask) if is_new]
+# ai code end
 
 print(f"需要新增 {len(new_documents)} 条记录")
 
-# 6. 分批增量插入：每次只添加10条（支持断点续传）
-BATCH_SIZE = 10
-if new_documents:
-    total_batches = (len(new_documents) + BATCH_SIZE - 1) // BATCH_SIZE
-    print(f"将分 {total_batches} 批处理，每批 {BATCH_SIZE} 条记录")
-    
-    # 断点续传：根据手动设置的起始批次号计算起始索引
-    if START_BATCH_NUM > 1:
-        start_index = (START_BATCH_NUM - 1) * BATCH_SIZE
-        if start_index >= len(new_documents):
-            print(f"⚠️  起始批次号 {START_BATCH_NUM} 超出范围，将从第1批次开始\n")
-            start_index = 0
-        else:
-            print(f"🔄 断点续传: 从批次 {START_BATCH_NUM} 开始（索引 {start_index}）\n")
-    else:
-        start_index = 0
-        print("🆕 从头开始插入\n")
-    
-    # 批量插入循环
-    success_count = 0
-    failed_count = 0
-    
-    for i in range(start_index, len(new_documents), BATCH_SIZE):
-        batch = new_documents[i:i + BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-        
-        texts = [doc.page_content for doc in batch]
-        metadatas = [doc.metadata for doc in batch]
-        # 生成IDs：使用lib_main_sku作为ID，如果没有则使用索引生成
-        ids = []
-        for idx, doc in enumerate(batch):
-            sku = doc.metadata.get("lib_main_sku")
-            if sku:
-                ids.append(str(sku))
-            else:
-                # 如果没有SKU，使用批次索引和文档索引生成唯一ID
-                ids.append(f"batch_{batch_num}_doc_{idx}")
-        
-        print(f"【批次 {batch_num}/{total_batches}】插入 {len(batch)} 条记录:")
-        for idx, doc in enumerate(batch, 1):
-            sku = doc.metadata.get("lib_main_sku", "N/A")
-            title = doc.metadata.get("title_cn", doc.page_content[:30])
-            print(f"  [{idx}] ID: {ids[idx-1]} | SKU: {sku} | 标题: {title}")
-        
-        # 重试机制
-        insert_success = False
-        for retry in range(MAX_RETRIES):
-            try:
-                vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
-                print(f"  ✓ 成功插入 {len(batch)} 条记录")
-                insert_success = True
-                success_count += len(batch)
-                time.sleep(1)  # 延迟1秒避免API限流
-                break
-            except Exception as e:
-                error_msg = str(e)
-                if retry < MAX_RETRIES - 1:
-                    print(f"  ✗ 插入失败（重试 {retry + 1}/{MAX_RETRIES}）: {error_msg[:200]}...")
-                    print(f"  ⏳ 等待 {RETRY_DELAY} 秒后重试...")
-                    time.sleep(RETRY_DELAY)
-                else:
-                    print(f"  ✗ 插入失败（已重试 {MAX_RETRIES} 次）: {error_msg[:200]}...")
-                    failed_count += len(batch)
-                    print(f"  ⚠️  当前批次失败，继续处理下一批次...")
-                    print(f"  💡 提示: 如需断点续传，请将 START_BATCH_NUM 设置为 {batch_num}\n")
-                    time.sleep(RETRY_DELAY)
-        
-        print()  # 空行分隔
-        
-        # 每100批次输出一次统计信息
-        if batch_num % 100 == 0:
-            print(f"📊 进度统计: 已处理 {batch_num}/{total_batches} 批次, "
-                  f"成功 {success_count} 条, 失败 {failed_count} 条\n")
-    
-    # 插入完成
+# ai code begin && nums:46
+# 6. 去重入库：近似重复的标题只向量化一次，组内每个SKU都写入集合并记录dup_group
+def ingest_into(target):
+    """去重、向量化并写入target集合，返回成功写入的条数"""
+    ingestor = DedupIngestor(
+        collection=target,
+        spec=collection_spec,
+        embeddings=TokenBudgetEmbeddings(
+            embeddings,
+            max_tokens_per_request=EMBED_TOKENS_PER_REQUEST,
+            max_items_per_request=EMBED_BATCH_SIZE
+        ),
+        deduplicator=TitleDeduplicator(threshold=DEDUP_THRESHOLD),
+        embed_batch_size=EMBED_BATCH_SIZE,
+        insert_batch_size=INSERT_BATCH_SIZE,
+        max_retries=MAX_RETRIES,
+        retry_delay=RETRY_DELAY,
+        bulk_importer=BulkImporter(target, collection_spec.vector_field) if BULK_IMPORT else None
+    )
+    stats = ingestor.ingest(new_documents, ids)
+
     print(f"\n{'='*60}")
-    print(f"✅ 批量插入完成!")
-    print(f"   总批次数: {total_batches}")
-    print(f"   成功插入: {success_count} 条")
-    print(f"   插入失败: {failed_count} 条")
-    if failed_count > 0:
-        print(f"   💡 提示: 如需继续插入失败的记录，请手动设置 START_BATCH_NUM 并重新运行")
+    print(f"✅ 去重入库完成!")
+    print(f"   文档数: {stats.documents}，分组数: {stats.groups}")
+    print(f"   向量化: {stats.embedded} 条（节省 {stats.saved_embeddings} 次）")
+    print(f"   Embedding请求统计: {ingestor.embeddings.get_metrics()}")
+    print(f"   成功插入: {stats.inserted} 条")
+    print(f"   插入失败: {stats.failed} 条")
+    if stats.failed > 0 and not REBUILD:
+        print(f"   💡 提示: 重新运行即可只补写失败的SKU（集合中已有的主键会被跳过）")
     print(f"{'='*60}\n")
+    return stats.inserted
+
+
+if len(new_documents):
+    if REBUILD:
+        def populate(target):
+            # 应写入全部文档：有写入失败的行时行数校验不通过，新版本不会切换上线
+            ingest_into(target)
+            return len(new_documents)
+
+        report = CollectionVersionManager(using="liangou_ingest").rebuild(COLLECTION_NAME, populate)
+        print(f"重建校验: {report}")
+    else:
+        ingest_into(collection)
 else:
     print("所有文档已存在，无需插入新数据")
+# ai code end
 
 end = time.time()
 use_time = end-start
 print('use_time-->',use_time)
+# ai code begin && nums:3
+_profile_stack.close()
+if profile is not None:
+    print(f"剖析结果已写入: {profile.dump(PROFILE_DIR)}")
+# ai code end
 # ============================================================================
 # 检索测试部分
 # ============================================================================
@@ -236,7 +250,10 @@ print('use_time-->',use_time)
 # 检索字段说明：
 #   - 检索基于：page_content字段的向量（由"受限品"+"关键词"合并生成）
 #   - 返回结果包含：page_content（原始文本内容）和metadata（元数据信息）
+# ai code begin && nums:2
+vector_store = build_vector_store()
 results = vector_store.similarity_search("好看的短袖", k=3)
+# ai code end
 for doc in results:
     print(doc.page_content)  # 打印文档的文本内容（向量化的字段）
     print(doc.metadata)      # 打印文档的元数据（非向量化的字段）
@@ -0,0 +1,208 @@
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+import numpy as np
+
+
+# ai code begin && nums:198
+# 归一化时去掉的字符：空白和常见中英文标点
+_STRIP_PATTERN = re.compile(r"[\s\-_/\\|,.;:!?，。；：！？、·（）()【】\[\]{}《》<>\"'“”‘’~～+*#@&]+")
+
+
+def normalize_title(text: str) -> str:
+    """
+    标题归一化：全角转半角、转小写、去掉空白和标点
+
+    Args:
+        text: 原始标题
+
+    Returns:
+        str: 归一化后的标题
+    """
+    return _STRIP_PATTERN.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+def shingles(text: str, ngram: int = 2) -> Set[str]:
+    """
+    字符n-gram集合
+
+    中文标题没有天然分词，使用字符n-gram作为特征；短于n的文本整体作为一个特征。
+
+    Args:
+        text: 归一化后的文本
+        ngram: n-gram长度
+
+    Returns:
+        Set[str]: n-gram集合
+    """
+    if len(text) <= ngram:
+        return {text}
+    return {text[i:i + ngram] for i in range(len(text) - ngram + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """两个集合的Jaccard相似度"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash签名
+
+    每个特征先用crc32映射为整数，再经过num_perm个随机线性哈希 (a * x + b) mod p 取最小值。
+    两个集合签名中相同位置取值相等的概率等于它们的Jaccard相似度。
+    """
+
+    # 梅森素数2^31-1，保证a * x在uint64范围内不溢出
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, self.PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self.PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Set[str]) -> np.ndarray:
+        """计算特征集合的MinHash签名"""
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) & self.PRIME for feature in features),
+            dtype=np.uint64,
+            count=len(features)
+        )
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % self.PRIME).min(axis=1)
+
+
+@dataclass
+class DedupResult:
+    """
+    近似去重结果
+
+    Args:
+        representatives: 每条文本所属分组的代表文本下标（代表自身指向自己）
+        groups: 代表下标 -> 组内全部下标
+    """
+    representatives: List[int]
+    groups: Dict[int, List[int]] = field(default_factory=dict)
+
+    @property
+    def unique_count(self) -> int:
+        """分组数（即需要向量化的文本数）"""
+        return len(self.groups)
+
+    def representative_indexes(self) -> List[int]:
+        """所有代表文本的下标（按原始顺序）"""
+        return sorted(self.groups.keys())
+
+
+class TitleDeduplicator:
+    """
+    标题近似去重（MinHash + 分段LSH）
+
+    1. 归一化后完全相同的标题直接归为一组
+    2. 其余标题计算MinHash签名，签名切成若干段（每段band_rows个值），
+       至少一段完全相同的标题才成为候选对，不必两两比较
+    3. 按出现顺序处理：标题只和候选分组的代表比较字符n-gram的真实Jaccard相似度，
+       不低于threshold时加入相似度最高的分组，否则自己成为新分组的代表（组内下标最小）。
+       只和代表比较而不是和组内任意成员比较，逐字漂移的一串标题不会被串成一个大组，
+       组内每条标题与代表的相似度都不低于threshold（组内SKU复用的正是代表的向量）
+
+    短标题改动一两个字时n-gram集合的Jaccard相似度仍然很高，比SimHash的汉明距离更稳定。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        ngram: int = 2,
+        num_perm: int = 64,
+        band_rows: int = 4,
+        max_candidates: int = 32
+    ):
+        """
+        初始化去重器
+
+        Args:
+            threshold: 视为近似重复的最小Jaccard相似度，1.0表示只合并完全相同的标题
+            ngram: 字符n-gram长度
+            num_perm: MinHash签名长度
+            band_rows: LSH每段的签名值个数（越小召回越高、候选对越多）
+            max_candidates: 每条标题最多复核的候选代表数，避免拥挤的分段退化为两两比较
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold必须在(0, 1]范围内")
+        if num_perm % band_rows:
+            raise ValueError("num_perm必须是band_rows的整数倍")
+        self.threshold = threshold
+        self.ngram = ngram
+        self.band_rows = band_rows
+        self.max_candidates = max_candidates
+        self._hasher = MinHasher(num_perm)
+
+    def group(self, texts: List[str]) -> DedupResult:
+        """
+        对文本列表分组
+
+        Args:
+            texts: 标题列表
+
+        Returns:
+            DedupResult: 每条文本的代表下标和分组
+        """
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                # 下标小的作为根，保证代表是组内最早出现的标题
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        # 1. 完全相同（归一化后）的标题
+        first_by_text: Dict[str, int] = {}
+        for i, text in enumerate(texts):
+            key = normalize_title(text)
+            if key in first_by_text:
+                union(first_by_text[key], i)
+            else:
+                first_by_text[key] = i
+
+        # 2. 近似重复：只对不同的归一化标题计算签名
+        if self.threshold < 1:
+            features = {i: shingles(key, self.ngram) for key, i in first_by_text.items() if key}
+            # LSH分段 -> 落在该段的分组代表（加入已有分组的标题不再登记，桶的大小按分组数增长）
+            buckets: Dict[tuple, List[int]] = {}
+            for i, feature_set in features.items():
+                signature = self._hasher.signature(feature_set)
+                keys = [
+                    (start, signature[start:start + self.band_rows].tobytes())
+                    for start in range(0, len(signature), self.band_rows)
+                ]
+                # 各段的候选代表去重后合并，每段只取最近登记的max_candidates个
+                candidates = list(dict.fromkeys(
+                    j for key in keys for j in reversed(buckets.get(key, [])[-self.max_candidates:])
+                ))[:self.max_candidates]
+                best, best_score = None, 0.0
+                for j in candidates:
+                    score = jaccard(feature_set, features[j])
+                    if score >= self.threshold and score > best_score:
+                        best, best_score = j, score
+                if best is not None:
+                    parent[i] = best
+                else:
+                    for key in keys:
+                        buckets.setdefault(key, []).append(i)
+
+        representatives = [find(i) for i in range(len(texts))]
+        groups: Dict[int, List[int]] = {}
+        for i, representative in enumerate(representatives):
+            groups.setdefault(representative, []).append(i)
+        return DedupResult(representatives=representatives, groups=groups)
+# ai code end
@@ -0,0 +1,297 @@
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# ai code begin && nums:285
+# 字符串列中不同取值占比低于该值时按分类列存储（每个取值只存一份，每行只存一个整数编码）
+CATEGORICAL_RATIO = 0.5
+
+ColumnData = Union[np.ndarray, pd.Categorical]
+
+
+def _to_python(value: Any) -> Any:
+    """把numpy标量转换为Python原生类型，NaN转换为None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and value != value:
+            return None
+    return value
+
+
+def compact_column(values: Union[pd.Series, Sequence[Any]], categorical_ratio: float = CATEGORICAL_RATIO) -> ColumnData:
+    """
+    把一列值压缩为紧凑的列式存储
+
+    - 重复率高的字符串（URL、受限品、设备分类等）转为分类列：取值只存一份，每行一个int8/int16编码
+    - 其余字符串保留为object数组，相同取值共用同一个驻留字符串对象
+    - 数值和布尔列保留为numpy数组
+
+    Args:
+        values: 列值
+        categorical_ratio: 不同取值占比低于该值时使用分类列
+
+    Returns:
+        numpy数组或pandas.Categorical
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    if series.dtype != object:
+        return series.to_numpy()
+    if len(series) and series.nunique(dropna=True) <= len(series) * categorical_ratio:
+        return pd.Categorical(series)
+    return np.array(
+        [sys.intern(value) if isinstance(value, str) else value for value in series.tolist()],
+        dtype=object
+    )
+
+
+class DocumentRow:
+    """
+    DocumentBatch中一行的只读视图
+
+    不复制数据，只保存所属批次和行号；page_content和metadata在访问时才从列中取出。
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "DocumentBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def page_content(self) -> str:
+        """文档内容"""
+        return self._batch.texts[self._index]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """元数据（每次访问新建字典）"""
+        return self._batch.metadata_at(self._index)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """读取单个元数据字段，不构建整个字典"""
+        value = self._batch.value_at(name, self._index)
+        return default if value is None else value
+
+    def to_document(self) -> "Document":
+        """转换为LangChain Document"""
+        from langchain_core.documents import Document
+
+        return Document(page_content=self.page_content, metadata=self.metadata)
+
+    def __repr__(self) -> str:
+        return f"DocumentRow(index={self._index}, content={self.page_content[:50]!r})"
+
+
+class DocumentBatch:
+    """
+    列式文档批次
+
+    一批文档按列存储：文本为一个object数组，每个元数据字段一列（重复字符串为分类列），
+    source这类整批相同的值只存一份。相比每行一个Document加一个元数据字典，
+    大批量加载时每行的固定开销从数百字节降到十几字节。
+
+    只在需要LangChain接口的地方调用to_documents转换，入库流程直接按列读取。
+    """
+
+    def __init__(
+        self,
+        texts: Union[np.ndarray, Sequence[str]],
+        columns: Optional[Dict[str, ColumnData]] = None,
+        source: Optional[str] = None,
+        row_index: Optional[np.ndarray] = None
+    ):
+        """
+        初始化批次
+
+        Args:
+            texts: 每行的文档内容
+            columns: 元数据列 {字段名: 列数据}，长度与texts一致
+            source: 整批共同的数据源名称（元数据中的source字段），为None时不输出
+            row_index: 每行在原始文件中的行号（元数据中的row_index字段），默认0..n-1
+        """
+        self.texts = texts if isinstance(texts, np.ndarray) else np.array(list(texts), dtype=object)
+        self.columns: Dict[str, ColumnData] = dict(columns or {})
+        self.source = source
+        self.row_index = (
+            np.asarray(row_index, dtype=np.int64) if row_index is not None
+            else np.arange(len(self.texts), dtype=np.int64)
+        )
+        for name, column in self.columns.items():
+            if len(column) != len(self.texts):
+                raise ValueError(f"列{name}的长度{len(column)}与文档数{len(self.texts)}不一致")
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[Any], categorical_ratio: float = CATEGORICAL_RATIO) -> "DocumentBatch":
+        """
+        从Document列表（或任何带page_content和metadata的对象）构建批次
+
+        source和row_index会被识别为批次级字段，其余元数据字段按列压缩。
+        """
+        metadata = pd.DataFrame.from_records([doc.metadata for doc in documents])
+        sources = metadata.pop("source").dropna().unique() if "source" in metadata else []
+        if len(sources) > 1:
+            # 多个来源的文档混在一起时保留为普通列
+            metadata["source"] = [doc.metadata.get("source") for doc in documents]
+            sources = []
+        row_index = metadata.pop("row_index").to_numpy() if "row_index" in metadata else None
+        return cls(
+            np.array([doc.page_content for doc in documents], dtype=object),
+            {name: compact_column(metadata[name], categorical_ratio) for name in metadata.columns},
+            source=sources[0] if len(sources) else None,
+            row_index=row_index
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["DocumentBatch"], source: Optional[str] = None) -> "DocumentBatch":
+        """
+        按顺序合并多个批次（如并行加载的各个分块），缺少某字段的批次该字段为None
+
+        Args:
+            batches: 待合并的批次
+            source: 合并后的source，默认取第一个批次的source
+
+        Returns:
+            DocumentBatch: 合并后的批次
+        """
+        if not batches:
+            return cls(np.array([], dtype=object), source=source)
+        names: List[str] = []
+        for batch in batches:
+            names.extend(name for name in batch.column_names if name not in names)
+        columns: Dict[str, ColumnData] = {}
+        for name in names:
+            parts = [batch.columns.get(name) for batch in batches]
+            if all(isinstance(part, pd.Categorical) for part in parts) and len({part.categories.dtype for part in parts}) == 1:
+                columns[name] = union_categoricals(parts)
+            else:
+                columns[name] = compact_column(pd.Series(np.concatenate([
+                    np.full(len(batch), None, dtype=object) if part is None else np.asarray(part, dtype=object)
+                    for batch, part in zip(batches, parts)
+                ]), dtype=object).infer_objects())
+        return cls(
+            np.concatenate([batch.texts for batch in batches]),
+            columns,
+            source=source if source is not None else batches[0].source,
+            row_index=np.concatenate([batch.row_index for batch in batches])
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[DocumentRow]:
+        for i in range(len(self.texts)):
+            yield DocumentRow(self, i)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray, List[int]]) -> Union[DocumentRow, "DocumentBatch"]:
+        """整数下标返回行视图，切片/下标数组/布尔掩码返回新批次"""
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            return DocumentRow(self, index)
+        return self.take(key)
+
+    @property
+    def column_names(self) -> List[str]:
+        """元数据字段名（不含source和row_index）"""
+        return list(self.columns.keys())
+
+    def take(self, indices: Union[slice, np.ndarray, List[int]]) -> "DocumentBatch":
+        """按切片、下标数组或布尔掩码选取子批次（分类列的取值表共享，不复制）"""
+        if not isinstance(indices, slice):
+            indices = np.asarray(indices)
+        return DocumentBatch(
+            self.texts[indices],
+            {name: column[indices] for name, column in self.columns.items()},
+            source=self.source,
+            row_index=self.row_index[indices]
+        )
+
+    def rename_columns(self, mapping: Dict[str, str]) -> "DocumentBatch":
+        """重命名元数据字段（如把中文列名映射为Milvus支持的英文字段名），只替换列名不复制数据"""
+        return DocumentBatch(
+            self.texts,
+            {mapping.get(name, name): column for name, column in self.columns.items()},
+            source=self.source,
+            row_index=self.row_index
+        )
+
+    def value_at(self, name: str, index: int) -> Any:
+        """读取某行某字段的值（Python原生类型，缺失值为None）"""
+        if name == "source":
+            return self.source
+        if name == "row_index":
+            return int(self.row_index[index])
+        column = self.columns.get(name)
+        return None if column is None else _to_python(column[index])
+
+    def column_values(self, name: str) -> List[Any]:
+        """
+        读取一整列（Python原生类型，缺失值为None），用于按列写入Milvus
+
+        Args:
+            name: 字段名，支持source和row_index
+
+        Returns:
+            List: 每行的取值
+        """
+        if name == "source":
+            return [self.source] * len(self)
+        if name == "row_index":
+            return self.row_index.tolist()
+        column = self.columns[name]
+        if isinstance(column, pd.Categorical):
+            categories = [_to_python(value) for value in column.categories]
+            return [categories[code] if code >= 0 else None for code in column.codes]
+        return [_to_python(value) for value in column.tolist()]
+
+    def metadata_at(self, index: int) -> Dict[str, Any]:
+        """构建某行的元数据字典（字段顺序与逐行加载时一致：source、row_index在前）"""
+        metadata: Dict[str, Any] = {}
+        if self.source is not None:
+            metadata["source"] = self.source
+        metadata["row_index"] = int(self.row_index[index])
+        for name, column in self.columns.items():
+            metadata[name] = _to_python(column[index])
+        return metadata
+
+    def iter_documents(self) -> Iterator["Document"]:
+        """逐条转换为LangChain Document（不在内存中同时保留整批Document）"""
+        for row in self:
+            yield row.to_document()
+
+    def to_documents(self) -> List["Document"]:
+        """整批转换为LangChain Document列表（只在需要LangChain接口的边界处使用）"""
+        return list(self.iter_documents())
+
+    def nbytes(self) -> int:
+        """估算批次占用的内存（字节），包括文本和字符串对象本身"""
+        total = self.texts.nbytes + self.row_index.nbytes
+        total += sum(sys.getsizeof(text) for text in self.texts)
+        for column in self.columns.values():
+            if isinstance(column, pd.Categorical):
+                total += column.codes.nbytes + sum(sys.getsizeof(value) for value in column.categories)
+            else:
+                total += column.nbytes
+                if column.dtype == object:
+                    # 驻留后相同的字符串只计一次
+                    total += sum(sys.getsizeof(value) for value in {id(v): v for v in column}.values())
+        return total
+
+    def __repr__(self) -> str:
+        return f"DocumentBatch(rows={len(self)}, columns={self.column_names}, source={self.source!r})"
+# ai code end
@@ -1,7 +1,8 @@
 import pandas as pd
 from typing import List, Dict, Any
+from risk_rag_qa.risk_document_loaders.document_batch import DocumentBatch, compact_column
 
-# ai code begin && nums:85
+# ai code begin && nums:100
 class FDADeviceDocument:
     """FDA医疗器械文档类，适合RAG使用"""
     
@@ -13,6 +14,82 @@ class FDADeviceDocument:
         return f"FDADeviceDocument(content={self.page_content[:100]}...)"
 
 
+def _text_column(df: pd.DataFrame, name: str) -> pd.Series:
+    """按列取字符串并去掉首尾空白（缺失列为空字符串，缺失值为'nan'，与逐行str()的结果一致）"""
+    if name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].astype(object).map(str).str.strip()
+
+
+def fda_devices_to_batch(df: pd.DataFrame, source: str) -> DocumentBatch:
+    """
+    把FDA医疗器械表按列转换为文档批次，内容与元数据与逐行构建的结果一致
+
+    Args:
+        df: 医疗器械表
+        source: 数据来源（文件路径）
+
+    Returns:
+        DocumentBatch: 每个器械一行
+    """
+    device_name = _text_column(df, 'DEVICENAME')
+    device_class = _text_column(df, 'DEVICECLASS')
+    product_code = _text_column(df, 'PRODUCTCODE')
+    specialty_cn = _text_column(df, '医学专科')
+    specialty_en = _text_column(df, 'MEDICALSPECIALTY')
+    regulation_num = _text_column(df, 'REGULATIONNUMBER')
+    regulation_citation = _text_column(df, '法规大类 Regulation Citation (21CFR)')
+    product_type = _text_column(df, '产品类型')
+    definition = _text_column(df, 'DEFINITION')
+    is_implant = _text_column(df, 'Implant_Flag') == 'Y'
+    is_life_sustain = _text_column(df, 'Life_Sustain_support_flag') == 'Y'
+
+    def optional_line(mask: pd.Series, line: pd.Series) -> pd.Series:
+        """满足条件的行追加一行内容"""
+        return ("\n" + line).where(mask, "")
+
+    content = "设备名称: " + device_name + "\n设备分类: Class " + device_class + "\n产品代码: " + product_code
+    content += optional_line(specialty_cn != "", "医学专科: " + specialty_cn + " (" + specialty_en + ")")
+    content += optional_line(
+        (regulation_num != "") & (regulation_num != "nan"),
+        "法规编号: " + regulation_citation + " " + regulation_num
+    )
+    content += optional_line((product_type != "") & (product_type != "nan"), "产品类型: " + product_type)
+    content += optional_line((definition != "") & (definition != "nan"), "产品定义: " + definition)
+    content += optional_line(is_implant, pd.Series("特性: 植入物", index=df.index))
+    content += optional_line(is_life_sustain, pd.Series("特性: 生命支持设备", index=df.index))
+
+    return DocumentBatch(
+        content.to_numpy(dtype=object),
+        {
+            "product_code": compact_column(product_code),
+            "device_name": compact_column(device_name),
+            "device_class": compact_column(device_class),
+            "specialty": compact_column(specialty_cn),
+            "regulation_number": compact_column(regulation_num),
+            "product_type": compact_column(product_type),
+            "is_implant": is_implant.to_numpy(dtype=bool),
+            "is_life_sustain": is_life_sustain.to_numpy(dtype=bool),
+        },
+        source=source,
+        row_index=df.index.to_numpy()
+    )
+
+
+def load_fda_devices_batch(file_path: str, sheet_name: str = "总表1") -> DocumentBatch:
+    """
+    加载FDA医疗器械数据为列式文档批次（入库使用，不为每行创建文档对象和元数据字典）
+
+    Args:
+        file_path: Excel文件路径
+        sheet_name: 工作表名称
+
+    Returns:
+        DocumentBatch: 每个器械一行
+    """
+    return fda_devices_to_batch(pd.read_excel(file_path, sheet_name=sheet_name), file_path)
+
+
 def load_fda_devices(file_path: str, sheet_name: str = "总表1") -> List[FDADeviceDocument]:
     """
     加载FDA医疗器械数据，转换为RAG文档格式
@@ -24,73 +101,9 @@ def load_fda_devices(file_path: str, sheet_name: str = "总表1") -> List[FDADev
     Returns:
         FDADeviceDocument列表
     """
-    df = pd.read_excel(file_path, sheet_name=sheet_name)
-    documents = []
-    
-    for idx, row in df.iterrows():
-        # 构建文档内容 - 将关键信息组合成易于检索的文本
-        content_parts = []
-        
-        # 设备基本信息
-        device_name = str(row.get('DEVICENAME', '')).strip()
-        device_class = str(row.get('DEVICECLASS', '')).strip()
-        product_code = str(row.get('PRODUCTCODE', '')).strip()
-        
-        content_parts.append(f"设备名称: {device_name}")
-        content_parts.append(f"设备分类: Class {device_class}")
-        content_parts.append(f"产品代码: {product_code}")
-        
-        # 医学专科
-        specialty_cn = str(row.get('医学专科', '')).strip()
-        specialty_en = str(row.get('MEDICALSPECIALTY', '')).strip()
-        if specialty_cn:
-            content_parts.append(f"医学专科: {specialty_cn} ({specialty_en})")
-        
-        # 法规信息
-        regulation_num = str(row.get('REGULATIONNUMBER', '')).strip()
-        regulation_citation = str(row.get('法规大类 Regulation Citation (21CFR)', '')).strip()
-        if regulation_num and regulation_num != 'nan':
-            content_parts.append(f"法规编号: {regulation_citation} {regulation_num}")
-        
-        # 产品类型
-        product_type = str(row.get('产品类型', '')).strip()
-        if product_type and product_type != 'nan':
-            content_parts.append(f"产品类型: {product_type}")
-        
-        # 产品定义
-        definition = str(row.get('DEFINITION', '')).strip()
-        if definition and definition != 'nan':
-            content_parts.append(f"产品定义: {definition}")
-        
-        # 特殊标识
-        implant_flag = str(row.get('Implant_Flag', '')).strip()
-        life_sustain_flag = str(row.get('Life_Sustain_support_flag', '')).strip()
-        if implant_flag == 'Y':
-            content_parts.append("特性: 植入物")
-        if life_sustain_flag == 'Y':
-            content_parts.append("特性: 生命支持设备")
-        
-        # 组合内容
-        content = "\n".join(content_parts)
-        
-        # 构建元数据
-        metadata = {
-            "source": file_path,
-            "product_code": product_code,
-            "device_name": device_name,
-            "device_class": device_class,
-            "specialty": specialty_cn,
-            "regulation_number": regulation_num,
-            "product_type": product_type,
-            "is_implant": implant_flag == 'Y',
-            "is_life_sustain": life_sustain_flag == 'Y',
-            "row_index": idx
-        }
-        
-        doc = FDADeviceDocument(content=content, metadata=metadata)
-        documents.append(doc)
-    
-    return documents
+    batch = load_fda_devices_batch(file_path, sheet_name)
+    return [FDADeviceDocument(content=row.page_content, metadata=row.metadata) for row in batch]
+
 # ai code end
 
 
@@ -0,0 +1,136 @@
+import io
+from typing import List, Optional, Tuple
+import pandas as pd
+
+
+# ai code begin && nums:129
+UTF8_BOM = b"\xef\xbb\xbf"
+# 默认每个分块的大小（字节），分块越大进程间传输和调度开销占比越小
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+# 扫描引号时每次读取的大小
+_SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def split_csv_ranges(
+    file_path: str,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    quotechar: bytes = b'"'
+) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """
+    把CSV文件按字节切分为若干分块，每个分块都从一条完整记录的开头开始
+
+    只在引号外的换行处切分：从文件开头累计引号个数，个数为偶数时的换行才是记录边界，
+    所以带引号的多行字段（包括转义的双引号""）不会被切断。
+    UTF-8和GBK的多字节字符中都不会出现引号和换行字节，可以直接按字节扫描。
+
+    Args:
+        file_path: CSV文件路径
+        chunk_bytes: 每个分块的目标大小（字节），实际分块会延伸到下一个记录边界
+        quotechar: 引号字符
+
+    Returns:
+        Tuple: (表头起始偏移（跳过UTF-8 BOM）, 数据起始偏移（表头之后）, [(分块起始, 分块结束), ...])
+    """
+    with open(file_path, "rb") as f:
+        header_start = len(UTF8_BOM) if f.read(len(UTF8_BOM)) == UTF8_BOM else 0
+        f.seek(header_start)
+
+        boundaries: List[int] = []
+        # 下一个需要寻找边界的位置：第一个边界是表头的结尾
+        target = header_start
+        offset = header_start
+        parity = 0
+        while True:
+            block = f.read(_SCAN_BLOCK_BYTES)
+            if not block:
+                break
+            counted = 0
+            search_from = max(target - offset, 0)
+            while search_from < len(block):
+                newline = block.find(b"\n", search_from)
+                if newline == -1:
+                    break
+                parity ^= block.count(quotechar, counted, newline) & 1
+                counted = newline
+                if parity == 0:
+                    boundary = offset + newline + 1
+                    boundaries.append(boundary)
+                    target = boundary + chunk_bytes
+                search_from = max(newline + 1, target - offset)
+            parity ^= block.count(quotechar, counted) & 1
+            offset += len(block)
+        file_size = offset
+
+    if not boundaries:
+        # 只有表头（没有换行结尾）
+        return header_start, file_size, []
+    data_start = boundaries[0]
+    starts = [boundary for boundary in boundaries if boundary < file_size]
+    ends = starts[1:] + [file_size]
+    ranges = [(start, end) for start, end in zip(starts, ends) if end > start]
+    return header_start, data_start, ranges
+
+
+def read_csv_header(file_path: str, header_start: int, data_start: int, encoding: str = "utf-8") -> List[str]:
+    """
+    读取表头（列名）
+
+    Args:
+        file_path: CSV文件路径
+        header_start: 表头起始偏移（已跳过BOM）
+        data_start: 数据起始偏移
+        encoding: 文件编码
+
+    Returns:
+        List[str]: 列名
+    """
+    with open(file_path, "rb") as f:
+        f.seek(header_start)
+        header = f.read(data_start - header_start) if data_start > header_start else f.read()
+    return pd.read_csv(io.BytesIO(header), nrows=0, encoding=_strip_sig(encoding)).columns.tolist()
+
+
+def read_csv_range(
+    file_path: str,
+    start: int,
+    end: int,
+    names: List[str],
+    encoding: str = "utf-8",
+    dtype: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    解析CSV文件中的一个分块（不含表头）
+
+    所有分块使用同一组列名和类型，默认全部按字符串读取（缺失值仍为NaN），
+    保证同一列在每个分块中的解析结果一致，不受分块内类型推断的影响。
+
+    Args:
+        file_path: CSV文件路径
+        start: 分块起始偏移（记录边界）
+        end: 分块结束偏移（记录边界）
+        names: 列名
+        encoding: 文件编码
+        dtype: 列类型，默认全部为字符串
+
+    Returns:
+        pd.DataFrame: 分块数据，索引从0开始
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if not data.strip():
+        # 文件末尾只有空行的分块
+        return pd.DataFrame(columns=names)
+    return pd.read_csv(
+        io.BytesIO(data),
+        header=None,
+        names=names,
+        dtype=dtype if dtype is not None else str,
+        encoding=_strip_sig(encoding)
+    )
+
+
+def _strip_sig(encoding: str) -> str:
+    """BOM已按字节跳过，分块按不带BOM的编码解析"""
+    return "utf-8" if encoding.lower().replace("_", "-") == "utf-8-sig" else encoding
+# ai code end
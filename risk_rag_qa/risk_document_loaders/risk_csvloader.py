@@ -1,9 +1,18 @@
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
 from langchain_core.documents import Document
+from risk_rag_qa.risk_document_loaders.document_batch import DocumentBatch, compact_column
+from risk_rag_qa.risk_document_loaders.parallel_csv import (
+    DEFAULT_CHUNK_BYTES, read_csv_header, read_csv_range, split_csv_ranges
+)
 
 
-# ai code begin && nums:95
+# ai code begin && nums:203
 class RiskCSVLoader:
     """
     通用风险数据CSV加载器
@@ -25,6 +34,9 @@ class RiskCSVLoader:
         ...     metadata_columns=["PRODUCTCODE", "REGULATIONNUMBER"]
         ... )
         >>> documents = loader.load()
+        >>> batch = loader.load_batch()   # 大文件入库使用列式批次，内存占用低得多
+        >>> for batch in loader.iter_batches(max_workers=8):   # 多GB文件按分块多进程解析，按文件顺序返回
+        ...     ...
     """
     
     def __init__(
@@ -43,30 +55,159 @@ class RiskCSVLoader:
         self.encoding = encoding
         self.source_name = source_name or file_path
     
-    def _default_content_formatter(self, row: Dict[str, Any], columns: List[str]) -> str:
-        """默认的内容格式化器：将指定列格式化为 '列名: 值' 的形式"""
-        parts = []
+    def _format_contents(self, df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+        """
+        默认的内容格式化器：按列批量把指定列格式化为 '列名: 值' 的形式（跳过空值），各列之间换行
+
+        Returns:
+            np.ndarray: 每行的内容（object数组）
+        """
+        contents = pd.Series("", index=df.index, dtype=object)
+        has_content = pd.Series(False, index=df.index)
         for col in columns:
-            value = row.get(col, "")
-            if pd.notna(value) and str(value).strip():
-                parts.append(f"{col}: {value}")
-        return "\n".join(parts)
-    
-    def _build_metadata(self, row: Dict[str, Any], columns: List[str], row_index: int) -> Dict[str, Any]:
-        """构建文档元数据"""
-        metadata = {
-            "source": self.source_name,
-            "row_index": row_index
+            if col not in df.columns:
+                continue
+            values = df[col]
+            text = values.astype(str)
+            mask = values.notna() & (text.str.strip() != "")
+            part = f"{col}: " + text
+            # 非第一段前面加换行
+            part = part.where(~has_content, "\n" + part)
+            contents = contents.where(~mask, contents + part)
+            has_content |= mask
+        return contents.to_numpy(dtype=object)
+
+    def load_batch(self) -> DocumentBatch:
+        """
+        加载CSV文件为列式文档批次
+
+        内容按列批量拼接，元数据按列压缩存储（重复的URL、受限品等字符串只存一份），
+        不为每行创建Document和元数据字典。
+
+        Returns:
+            DocumentBatch: 跳过空内容后的文档批次
+        """
+        return self._frame_to_batch(pd.read_csv(self.file_path, encoding=self.encoding))
+
+    def _frame_to_batch(self, df: pd.DataFrame) -> DocumentBatch:
+        """把已解析的表格按列转换为文档批次（row_index为df的索引）"""
+        all_columns = df.columns.tolist()
+        content_cols = self.content_columns if self.content_columns else all_columns
+        metadata_cols = self.metadata_columns if self.metadata_columns else all_columns
+
+        if self.content_formatter:
+            # 自定义格式化函数需要行字典，逐行生成（只保留内容，行字典用完即释放）
+            contents = np.array(
+                [self.content_formatter(row) for row in df.to_dict("records")], dtype=object
+            )
+        else:
+            contents = self._format_contents(df, content_cols)
+
+        # 跳过空内容
+        keep = np.array([bool(content.strip()) for content in contents], dtype=bool)
+        kept = df.loc[keep]
+        columns = {
+            col: compact_column(kept[col]) if col in kept.columns else compact_column([""] * len(kept))
+            for col in metadata_cols
         }
-        for col in columns:
-            value = row.get(col, "")
-            # 处理NaN值
-            if pd.isna(value):
-                metadata[col] = None
-            else:
-                metadata[col] = value
-        return metadata
-    
+        return DocumentBatch(
+            contents[keep],
+            columns,
+            source=self.source_name,
+            row_index=kept.index.to_numpy()
+        )
+
+    def _load_range(self, byte_range: Tuple[int, int], names: List[str], dtype: Dict[str, Any]) -> Tuple[DocumentBatch, int]:
+        """
+        解析并格式化一个分块（在子进程中执行）
+
+        Returns:
+            Tuple: (文档批次（row_index为分块内的行号）, 分块的总行数（含跳过的空内容行）)
+        """
+        df = read_csv_range(self.file_path, byte_range[0], byte_range[1], names, self.encoding, dtype)
+        return self._frame_to_batch(df), len(df)
+
+    def iter_batches(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        dtype: Optional[Dict[str, Any]] = None
+    ) -> Iterator[DocumentBatch]:
+        """
+        多进程并行加载，按文件顺序逐块返回文档批次
+
+        文件按字节切分为在记录边界（引号外的换行）对齐的分块，带引号的多行字段不会被切断，
+        UTF-8 BOM在切分前跳过。各分块在进程池中解析和格式化，结果按分块顺序返回，
+        同时在途的分块不超过max_workers的两倍，内存占用与文件大小无关。
+
+        与load_batch的区别：各分块独立解析，为保证同一列在每个分块中的结果一致，
+        默认所有列按字符串读取（内容中的数字保持文件中的原样，如"5"而不是"5.0"），
+        需要数值类型的列通过dtype指定。
+
+        Windows等使用spawn启动子进程的平台上，调用方脚本需要放在 if __name__ == "__main__": 之下；
+        content_formatter需为模块级函数（可被pickle）。
+
+        Args:
+            max_workers: 进程数，默认为CPU核数；为1或只有一个分块时在当前进程中解析
+            chunk_bytes: 每个分块的目标大小（字节）
+            dtype: 指定列的类型，如{"row_count": "Int64"}，其余列为字符串
+
+        Yields:
+            DocumentBatch: 每个分块的文档批次，row_index为整个文件中的行号
+
+        Raises:
+            ValueError: content_formatter无法传递给子进程
+        """
+        header_start, data_start, ranges = split_csv_ranges(self.file_path, chunk_bytes)
+        names = read_csv_header(self.file_path, header_start, data_start, self.encoding)
+        column_types: Dict[str, Any] = {name: str for name in names}
+        column_types.update(dtype or {})
+        max_workers = max_workers or os.cpu_count() or 1
+
+        row_offset = 0
+        if max_workers == 1 or len(ranges) <= 1:
+            for byte_range in ranges:
+                batch, num_rows = self._load_range(byte_range, names, column_types)
+                batch.row_index = batch.row_index + row_offset
+                row_offset += num_rows
+                yield batch
+            return
+
+        try:
+            pickle.dumps(self)
+        except Exception as e:
+            raise ValueError(f"并行加载时content_formatter需为模块级函数: {e}") from e
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            remaining = iter(ranges)
+            for byte_range in remaining:
+                pending.append(executor.submit(self._load_range, byte_range, names, column_types))
+                if len(pending) >= max_workers * 2:
+                    break
+            while pending:
+                batch, num_rows = pending.popleft().result()
+                next_range = next(remaining, None)
+                if next_range is not None:
+                    pending.append(executor.submit(self._load_range, next_range, names, column_types))
+                batch.row_index = batch.row_index + row_offset
+                row_offset += num_rows
+                yield batch
+
+    def load_parallel(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        dtype: Optional[Dict[str, Any]] = None
+    ) -> DocumentBatch:
+        """
+        多进程并行加载整个文件为一个文档批次（参数和解析规则见iter_batches）
+
+        Returns:
+            DocumentBatch: 按文件顺序合并的文档批次
+        """
+        return DocumentBatch.concat(list(self.iter_batches(max_workers, chunk_bytes, dtype)), self.source_name)
+
     def load(self) -> List[Document]:
         """
         加载CSV文件并转换为Document列表
@@ -74,37 +215,7 @@ class RiskCSVLoader:
         Returns:
             Document对象列表
         """
-        # 读取CSV文件
-        df = pd.read_csv(self.file_path, encoding=self.encoding)
-        
-        # 确定内容列和元数据列
-        all_columns = df.columns.tolist()
-        content_cols = self.content_columns if self.content_columns else all_columns
-        metadata_cols = self.metadata_columns if self.metadata_columns else all_columns
-        
-        documents = []
-        
-        for idx, row in df.iterrows():
-            row_dict = row.to_dict()
-            
-            # 生成文档内容
-            if self.content_formatter:
-                content = self.content_formatter(row_dict)
-            else:
-                content = self._default_content_formatter(row_dict, content_cols)
-            
-            # 跳过空内容
-            if not content.strip():
-                continue
-            
-            # 构建元数据
-            metadata = self._build_metadata(row_dict, metadata_cols, idx)
-            
-            # 创建Document
-            doc = Document(page_content=content, metadata=metadata)
-            documents.append(doc)
-        
-        return documents
+        return self.load_batch().to_documents()
 # ai code end
 
 
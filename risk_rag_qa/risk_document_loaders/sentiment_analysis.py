@@ -1,4 +1,4 @@
-# ai code begin && nums:180
+# ai code begin && nums:317
 """
 评论情感分析脚本
 使用 Coze API 对用户评论进行情感分析，判断评论对销售的影响
@@ -9,7 +9,60 @@ import httpx
 import time
 import json
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from base.config import get_config
+from base.metrics import metrics
+from risk_rag_qa.risk_document_loaders.sentiment_prefilter import LABEL_NAMES, SentimentPrefilter
+
+# Coze调用指标：单次请求耗时（按状态码）、重试次数、分析结果分布
+SENTIMENT_REQUEST_SECONDS = metrics.histogram(
+    "risk_rag_sentiment_request_seconds", "Coze情感分析单次请求耗时（秒）", ["status"]
+)
+SENTIMENT_RETRIES = metrics.counter("risk_rag_sentiment_retries_total", "Coze情感分析重试次数")
+SENTIMENT_RESULTS = metrics.counter("risk_rag_sentiment_results_total", "情感分析结果数", ["result"])
+SENTIMENT_SOURCES = metrics.counter(
+    "risk_rag_sentiment_sources_total", "情感分析结果来源：local（本地分类器）/ coze", ["source"]
+)
+SENTIMENT_BATCH_SPLITS = metrics.counter("risk_rag_sentiment_batch_splits_total", "合并调用结果无法解析而拆分重试的次数")
+
+# 合并调用的提示词：评论按 [编号] 逐条列出，要求逐行输出 编号. 结果
+BATCH_PROMPT = (
+    "以下是{count}条用户评论，请逐条判断每条评论对销售的影响：1-促进销售，2-阻碍销售，3-无影响。\n"
+    "请严格按编号逐行输出，每行格式为“编号. 结果数字”，共{count}行，不要输出其他内容。\n\n"
+)
+# 结果行：编号（可带括号）+ 分隔符 + 可选的"输出"/"结果" + 1/2/3
+_BATCH_ITEM_RE = re.compile(
+    r"^[ \t]*[\[【(（]?[ \t]*(\d+)[ \t]*(?:[\]】)）.．、:：\-]|[ \t])[ \t]*(?:输出|结果)?[ \t]*[:：]?[ \t]*([123])(?![0-9])",
+    re.MULTILINE
+)
+
+
+def build_batch_prompt(comments: List[str]) -> str:
+    """把多条评论拼成带编号的合并提示词"""
+    items = "\n".join(f"[{i}] {' '.join(str(c).split())}" for i, c in enumerate(comments, 1))
+    return BATCH_PROMPT.format(count=len(comments)) + items
+
+
+def parse_batch_output(text: str, count: int) -> Optional[List[int]]:
+    """
+    从合并调用的输出中解析逐条结果
+    
+    Args:
+        text: 工作流输出文本
+        count: 评论条数
+        
+    Returns:
+        Optional[List[int]]: 按编号排列的1/2/3；编号缺失、越界或同一编号结果冲突时返回None（结果有歧义）
+    """
+    verdicts: Dict[int, int] = {}
+    for match in _BATCH_ITEM_RE.finditer(text or ""):
+        number, verdict = int(match.group(1)), int(match.group(2))
+        if not 1 <= number <= count or verdicts.get(number, verdict) != verdict:
+            return None
+        verdicts[number] = verdict
+    if len(verdicts) != count:
+        return None
+    return [verdicts[i] for i in range(1, count + 1)]
 
 
 class SentimentAnalyzer:
@@ -22,8 +75,13 @@ class SentimentAnalyzer:
 
     WORKFLOW_ID = "7586946762297753642"
     
-    def __init__(self):
-        """初始化 Coze API 配置"""
+    def __init__(self, prefilter: Optional[SentimentPrefilter] = None):
+        """
+        初始化 Coze API 配置
+        
+        Args:
+            prefilter: 本地预分类器，为None时按配置SENTIMENT_PREFILTER_ENABLED加载模型文件（不存在则不启用）
+        """
         import os
         
         # 支持从环境变量读取配置（可选，主要用于不同环境）
@@ -40,141 +98,77 @@ class SentimentAnalyzer:
         print(f"   Workflow ID: {self.workflow_id}")
         print(f"   API Key: {self.api_key[:20]}...{self.api_key[-10:]}")
         
-    def analyze_sentiment(self, comment: str, retry_count: int = 3) -> Optional[int]:
+        self.prefilter = prefilter
+        if self.prefilter is None and get_config().SENTIMENT_PREFILTER_ENABLED:
+            self.prefilter = SentimentPrefilter.load()
+        if self.prefilter is not None:
+            print(f"✅ 本地预分类器已启用，置信度阈值: {get_config().SENTIMENT_PREFILTER_THRESHOLD}")
+        
+    def analyze_sentiment(self, comment: str, retry_count: Optional[int] = None) -> Optional[int]:
         """
         调用 Coze API 进行情感分析
         
         Args:
             comment: 评论内容
-            retry_count: 重试次数
+            retry_count: 重试次数，默认为配置SENTIMENT_MAX_RETRIES
             
         Returns:
             情感分析结果：1-促进销售，2-阻碍销售，3-无影响，None-分析失败
         """
         if not comment or pd.isna(comment) or str(comment).strip() == "":
             return None
-            
-        payload = {
-            "workflow_id": self.workflow_id,
-            "parameters": {
-                "CONVERSATION_NAME": "Default",
-                "USER_INPUT": str(comment),
-                "product_detail": "test"
-            },
-            "additional_messages": [
-                {
-                    "content": str(comment),
-                    "content_type": "text",
-                    "role": "user",
-                    "type": "question"
-                }
-            ]
-        }
+        retry_count = retry_count or get_config().SENTIMENT_MAX_RETRIES
+        comment_preview = str(comment)[:50]
         
         for attempt in range(retry_count):
+            if attempt > 0:
+                SENTIMENT_RETRIES.inc()
+                time.sleep(2 ** (attempt - 1))
+            # 每轮只请求一次：请求失败和回答无法解析共用同一个重试次数（与合并调用不同，单条重试不会放大请求量）
+            response = self._post_workflow(str(comment), 1)
+            if response is None:
+                continue
+            
+            if response.status_code == 401:
+                # 401认证错误，不需要重试，返回特殊标记-1
+                error_info = response.text
+                try:
+                    error_json = response.json()
+                    error_msg = error_json.get("msg", "认证失败")
+                except:
+                    error_msg = error_info
+                print(f"❌ API认证失败（401）: {error_msg}")
+                print(f"   请检查 API Key 是否正确或已过期")
+                print(f"   当前使用的 API Key: {self.api_key[:20]}...{self.api_key[-10:]}")
+                print(f"   请在代码中修改 SentimentAnalyzer.API_KEY 或设置环境变量 COZE_API_KEY")
+                return -1  # 返回-1作为401错误的特殊标记
+            
+            response_text = response.text
+            content_type = response.headers.get('Content-Type', '')
+            print(f"📥 响应类型: {content_type}")
+            print(f"📏 响应长度: {len(response_text)} 字符")
+            
+            # 检查是否是SSE流式响应
+            if 'text/event-stream' in content_type:
+                print("🔄 检测到SSE流式响应，开始解析...")
+                # 解析SSE格式的响应
+                sentiment_result = self._parse_sse_response(response_text, comment_preview)
+                if sentiment_result in [1, 2, 3]:
+                    print(f"✅ 成功提取情感分析结果: {sentiment_result}")
+                    return sentiment_result
+                print(f"⚠️  无法从SSE响应中提取结果（尝试 {attempt + 1}/{retry_count}），响应预览: {response_text[:200]}...")
+                continue
+            
+            # 普通JSON响应：解析返回结果，提取情感分析结果（1/2/3）
             try:
-                print(f"📤 正在调用API（尝试 {attempt + 1}/{retry_count}）...")
-                with httpx.Client(timeout=60.0) as client:  # 增加超时时间到60秒
-                    response = client.post(
-                        self.api_url,
-                        headers=self.headers,
-                        json=payload
-                    )
-                
-                print(f"✅ API调用完成，状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    response_text = response.text
-                    content_type = response.headers.get('Content-Type', '')
-                    
-                    print(f"📥 响应类型: {content_type}")
-                    print(f"📏 响应长度: {len(response_text)} 字符")
-                    
-                    # 检查是否是SSE流式响应
-                    if 'text/event-stream' in content_type:
-                        print("🔄 检测到SSE流式响应，开始解析...")
-                        # 解析SSE格式的响应
-                        sentiment_result = self._parse_sse_response(response_text, comment[:50] if len(comment) > 50 else comment)
-                        if sentiment_result in [1, 2, 3]:
-                            print(f"✅ 成功提取情感分析结果: {sentiment_result}")
-                            return sentiment_result
-                        else:
-                            print(f"⚠️  无法从SSE响应中提取结果，响应预览: {response_text[:200]}...")
-                            if attempt < retry_count - 1:
-                                time.sleep(2 ** attempt)
-                                continue
-                            return None
-                    else:
-                        # 普通JSON响应
-                        if not response_text or response_text.strip() == "":
-                            print(f"⚠️  API返回空响应，尝试 {attempt + 1}/{retry_count}")
-                            if attempt < retry_count - 1:
-                                time.sleep(2 ** attempt)
-                                continue
-                            return None
-                        
-                        # 尝试解析JSON
-                        try:
-                            result = response.json()
-                            # 解析返回结果，提取情感分析结果（1/2/3）
-                            sentiment_result = self._parse_response(result, comment[:50] if len(comment) > 50 else comment)
-                            if sentiment_result in [1, 2, 3]:
-                                return sentiment_result
-                            else:
-                                print(f"⚠️  警告：API返回了意外的结果: {sentiment_result}")
-                                return None
-                        except json.JSONDecodeError as e:
-                            print(f"⚠️  JSON解析失败: {str(e)}")
-                            if attempt < retry_count - 1:
-                                time.sleep(2 ** attempt)
-                                continue
-                            return None
-                elif response.status_code == 401:
-                    # 401认证错误，不需要重试，返回特殊标记-1
-                    error_info = response.text
-                    try:
-                        error_json = response.json()
-                        error_msg = error_json.get("msg", "认证失败")
-                    except:
-                        error_msg = error_info
-                    print(f"❌ API认证失败（401）: {error_msg}")
-                    print(f"   请检查 API Key 是否正确或已过期")
-                    print(f"   当前使用的 API Key: {self.api_key[:20]}...{self.api_key[-10:]}")
-                    print(f"   请在代码中修改 SentimentAnalyzer.API_KEY 或设置环境变量 COZE_API_KEY")
-                    return -1  # 返回-1作为401错误的特殊标记
-                else:
-                    # 其他HTTP错误
-                    response_text = response.text[:500] if response.text else "无响应内容"
-                    print(f"⚠️  API调用失败，状态码: {response.status_code}")
-                    print(f"   响应内容: {response_text}")
-                    print(f"   响应头: {dict(response.headers)}")
-                    # 对于非401错误，可以重试
-                    if attempt < retry_count - 1:
-                        time.sleep(2 ** attempt)  # 指数退避
-                        continue
-                    return None
-                    
-            except httpx.TimeoutException:
-                print(f"⚠️  请求超时，尝试 {attempt + 1}/{retry_count}")
-                if attempt < retry_count - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
+                sentiment_result = self._parse_response(response.json(), comment_preview)
             except json.JSONDecodeError as e:
-                print(f"⚠️  JSON解析错误: {str(e)}")
-                print(f"   尝试 {attempt + 1}/{retry_count}")
-                if attempt < retry_count - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
-            except Exception as e:
-                print(f"⚠️  请求异常: {str(e)}")
-                print(f"   异常类型: {type(e).__name__}")
-                print(f"   尝试 {attempt + 1}/{retry_count}")
-                if attempt < retry_count - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
+                print(f"⚠️  JSON解析失败（尝试 {attempt + 1}/{retry_count}）: {str(e)}")
+                continue
+            if sentiment_result in [1, 2, 3]:
+                return sentiment_result
+            print(f"⚠️  警告：API返回了意外的结果: {sentiment_result}")
+            return None
         
         return None
     
@@ -362,13 +356,129 @@ class SentimentAnalyzer:
             print(f"⚠️  解析响应时出错: {str(e)}")
             return None
     
+    def _post_workflow(self, text: str, retry_count: int) -> Optional[httpx.Response]:
+        """
+        调用工作流（逐条和合并调用共用），超时、异常、空响应和非401错误按指数退避重试
+        
+        Args:
+            text: 发给工作流的输入（单条评论或合并提示词）
+            retry_count: 最多请求次数
+        
+        Returns:
+            Optional[httpx.Response]: 状态码200（非空）或401的响应，重试用尽时返回None
+        """
+        payload = {
+            "workflow_id": self.workflow_id,
+            "parameters": {
+                "CONVERSATION_NAME": "Default",
+                "USER_INPUT": text,
+                "product_detail": "test"
+            },
+            "additional_messages": [
+                {
+                    "content": text,
+                    "content_type": "text",
+                    "role": "user",
+                    "type": "question"
+                }
+            ]
+        }
+        for attempt in range(retry_count):
+            if attempt > 0:
+                SENTIMENT_RETRIES.inc()
+                time.sleep(2 ** (attempt - 1))
+            request_start = time.perf_counter()
+            try:
+                with httpx.Client(timeout=get_config().SENTIMENT_TIMEOUT) as client:
+                    response = client.post(self.api_url, headers=self.headers, json=payload)
+            except Exception as e:
+                SENTIMENT_REQUEST_SECONDS.observe(time.perf_counter() - request_start, status="error")
+                print(f"⚠️  请求异常（尝试 {attempt + 1}/{retry_count}）: {type(e).__name__}: {e}")
+                continue
+            SENTIMENT_REQUEST_SECONDS.observe(time.perf_counter() - request_start, status=str(response.status_code))
+            print(f"✅ API调用完成，状态码: {response.status_code}")
+            if response.status_code == 401 or (response.status_code == 200 and response.text.strip()):
+                return response
+            if response.status_code == 200:
+                print(f"⚠️  API返回空响应（尝试 {attempt + 1}/{retry_count}）")
+            else:
+                print(f"⚠️  API调用失败，状态码: {response.status_code}（尝试 {attempt + 1}/{retry_count}）")
+                print(f"   响应内容: {response.text[:500] if response.text else '无响应内容'}")
+        return None
+    
+    @staticmethod
+    def _extract_output(response: httpx.Response) -> str:
+        """
+        取出工作流的回答文本：SSE响应取 conversation.message.completed 事件中回答的output（或content），
+        普通JSON响应取原文
+        """
+        if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+            return response.text
+        outputs = []
+        current_event = None
+        for line in response.text.split('\n'):
+            line = line.strip()
+            if line.startswith('event:'):
+                current_event = line[6:].strip()
+            elif line.startswith('data:') and current_event == 'conversation.message.completed':
+                try:
+                    data_json = json.loads(line[5:].strip())
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(data_json, dict) or data_json.get('type', 'answer') != 'answer':
+                    continue
+                content = data_json.get('content', '')
+                try:
+                    content_json = json.loads(content)
+                    outputs.append(str(content_json.get('output', content)) if isinstance(content_json, dict) else content)
+                except (json.JSONDecodeError, TypeError):
+                    outputs.append(str(content))
+        return '\n'.join(outputs)
+    
+    def analyze_sentiments(self, comments: List[str], retry_count: Optional[int] = None) -> List[Optional[int]]:
+        """
+        合并调用：多条评论编号后放进一次工作流请求，解析逐条结果
+        
+        结果有歧义（编号缺失、重复冲突或无法解析）时把这一批拆成两半分别重试，
+        拆到单条时回退为analyze_sentiment逐条调用；请求本身失败时不拆分，整批返回None。
+        
+        Args:
+            comments: 评论内容（非空）
+            retry_count: 每次请求的重试次数，默认为配置SENTIMENT_MAX_RETRIES
+            
+        Returns:
+            List[Optional[int]]: 与comments一一对应的 1/2/3，None-分析失败，-1-认证失败（401）
+        """
+        if len(comments) <= 1:
+            return [self.analyze_sentiment(comment, retry_count) for comment in comments]
+        retry_count = retry_count or get_config().SENTIMENT_MAX_RETRIES
+        print(f"📤 合并调用API: {len(comments)} 条评论")
+        response = self._post_workflow(build_batch_prompt(comments), retry_count)
+        if response is None:
+            # 请求本身失败（重试已用尽）时拆分只会成倍增加请求，整批记为分析失败
+            print(f"⚠️  合并调用失败，{len(comments)} 条评论记为分析失败")
+            return [None] * len(comments)
+        if response.status_code == 401:
+            print(f"❌ API认证失败（401），请检查 API Key 是否正确或已过期")
+            return [-1] * len(comments)
+        verdicts = parse_batch_output(self._extract_output(response), len(comments))
+        if verdicts is not None:
+            return verdicts
+        SENTIMENT_BATCH_SPLITS.inc()
+        print(f"⚠️  {len(comments)} 条评论的合并结果无法解析，拆分后重试")
+        half = len(comments) // 2
+        first = self.analyze_sentiments(comments[:half], retry_count)
+        if -1 in first:
+            return first + [-1] * (len(comments) - half)
+        return first + self.analyze_sentiments(comments[half:], retry_count)
+    
     def analyze_batch(
         self, 
         csv_path: str, 
         output_path: Optional[str] = None,
         start_idx: int = 0,
         end_idx: Optional[int] = None,
-        delay: float = 0.5
+        delay: Optional[float] = None
     ):
         """
         批量分析评论情感
@@ -378,8 +488,10 @@ class SentimentAnalyzer:
             output_path: 输出CSV文件路径（如果为None，则在原文件名后加_情感分析）
             start_idx: 开始索引（用于分批处理）
             end_idx: 结束索引（如果为None，则处理到最后）
-            delay: API调用间隔（秒），避免限流
+            delay: API调用间隔（秒），避免限流，默认为配置SENTIMENT_REQUEST_DELAY
         """
+        if delay is None:
+            delay = get_config().SENTIMENT_REQUEST_DELAY
         # 确定输出文件路径
         if output_path is None:
             output_path = csv_path.replace(".csv", "_情感分析.csv")
@@ -417,6 +529,9 @@ class SentimentAnalyzer:
             # 在第一列位置插入情感分析列
             df.insert(0, "情感分析", "")
             print("✅ 已在第一列插入'情感分析'列")
+        if self.prefilter is not None and "情感分析来源" not in df.columns:
+            # 记录结果来自本地分类器还是Coze，重新训练时只用Coze的结果
+            df.insert(1, "情感分析来源", "")
         
         # 显示处理范围
         total_to_process = end_idx - start_idx
@@ -465,9 +580,61 @@ class SentimentAnalyzer:
         success_count = 0
         fail_count = 0
         skip_count = 0
+        local_count = 0
+        
+        def record(idx: int, result: Optional[int], source: str):
+            """写入一条分析结果"""
+            nonlocal success_count, fail_count, local_count
+            if result is not None:
+                # 转换为可读的标签
+                sentiment_label = LABEL_NAMES.get(result, str(result))
+                
+                df.at[idx, "情感分析"] = sentiment_label
+                SENTIMENT_RESULTS.inc(result=sentiment_label)
+                success_count += 1
+                if "情感分析来源" in df.columns:
+                    df.at[idx, "情感分析来源"] = source
+                SENTIMENT_SOURCES.inc(source="local" if source == "本地" else "coze")
+                if source == "本地":
+                    local_count += 1
+            else:
+                df.at[idx, "情感分析"] = "分析失败"
+                SENTIMENT_RESULTS.inc(result="分析失败")
+                fail_count += 1
+        
+        def call_coze(batch: List[Tuple[int, str]]) -> bool:
+            """调用API分析一批评论（单条时逐条调用），认证失败时保存进度并返回False"""
+            comments = [comment for _, comment in batch]
+            results = self.analyze_sentiments(comments) if len(batch) > 1 else [self.analyze_sentiment(comments[0])]
+            
+            # 检查是否是401认证错误（通过检查结果是否为特殊标记）
+            if -1 in results:  # 使用-1作为401错误的特殊标记
+                print("\n" + "=" * 50)
+                print("❌ 检测到认证错误，停止批量处理")
+                print("=" * 50)
+                print("请先修复API Key配置后重新运行")
+                # 保存已处理的数据
+                df.to_csv(output_path, index=False, encoding='utf-8-sig')
+                print(f"已保存当前进度到: {output_path}")
+                return False
+            for (idx, _), result in zip(batch, results):
+                record(idx, result, "Coze")
+            
+            # 避免API限流，添加延迟
+            if delay > 0:
+                time.sleep(delay)
+            return True
+        
+        # 等待合并调用的 (行号, 评论)，攒够SENTIMENT_BATCH_SIZE条或达到字符上限时调用一次
+        batch_size = max(get_config().SENTIMENT_BATCH_SIZE, 1)
+        batch_max_chars = get_config().SENTIMENT_BATCH_MAX_CHARS
+        pending: List[Tuple[int, str]] = []
+        pending_chars = 0
         
         # 逐条分析
         print("🚀 开始情感分析...")
+        if batch_size > 1:
+            print(f"📦 合并调用：每次最多 {batch_size} 条、{batch_max_chars} 字符")
         total_rows = min(end_idx, len(df)) - start_idx
         for idx in range(start_idx, min(end_idx, len(df))):
             current_num = idx - start_idx + 1
@@ -484,46 +651,34 @@ class SentimentAnalyzer:
             # 跳过空数据
             if not comment or comment == "nan" or comment.strip() == "":
                 df.at[idx, "情感分析"] = "数据为空"
+                SENTIMENT_RESULTS.inc(result="数据为空")
                 skip_count += 1
                 continue
             
-            # 调用API分析
-            result = self.analyze_sentiment(comment)
-            
-            # 检查是否是401认证错误（通过检查结果是否为特殊标记）
-            if result == -1:  # 使用-1作为401错误的特殊标记
-                print("\n" + "=" * 50)
-                print("❌ 检测到认证错误，停止批量处理")
-                print("=" * 50)
-                print("请先修复API Key配置后重新运行")
-                # 保存已处理的数据
-                df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                print(f"已保存当前进度到: {output_path}")
-                return
-            
+            # 本地分类器置信度足够时直接给出结果（不调用API，无需等待），其余攒批调用API分析
+            result = self.prefilter.classify(comment) if self.prefilter is not None else None
             if result is not None:
-                # 转换为可读的标签
-                sentiment_label = {
-                    1: "促进销售",
-                    2: "阻碍销售",
-                    3: "无影响"
-                }.get(result, str(result))
-                
-                df.at[idx, "情感分析"] = sentiment_label
-                success_count += 1
+                record(idx, result, "本地")
             else:
-                df.at[idx, "情感分析"] = "分析失败"
-                fail_count += 1
-            
-            # 避免API限流，添加延迟
-            if delay > 0:
-                time.sleep(delay)
+                if pending and pending_chars + len(comment) > batch_max_chars:
+                    if not call_coze(pending):
+                        return
+                    pending, pending_chars = [], 0
+                pending.append((idx, comment))
+                pending_chars += len(comment)
+                if len(pending) >= batch_size:
+                    if not call_coze(pending):
+                        return
+                    pending, pending_chars = [], 0
             
             # 每10条保存一次（防止中途中断）
             if (idx + 1) % 10 == 0:
                 df.to_csv(output_path, index=False, encoding='utf-8-sig')
                 print(f"💾 已保存进度到: {output_path}")
         
+        if pending and not call_coze(pending):
+            return
+        
         # 保存最终结果
         df.to_csv(output_path, index=False, encoding='utf-8-sig')
         print(f"\n✅ 分析完成！结果已保存到: {output_path}")
@@ -536,6 +691,8 @@ class SentimentAnalyzer:
         print(sentiment_counts)
         
         print(f"\n✅ 本次成功分析: {success_count} 条")
+        if self.prefilter is not None:
+            print(f"⚡ 其中本地分类器判定: {local_count} 条（未调用API）")
         print(f"❌ 本次分析失败: {fail_count} 条")
         print(f"⏭️  本次跳过（数据为空）: {skip_count} 条")
         print(f"📊 本次总计处理: {success_count + fail_count + skip_count} 条")
@@ -568,8 +725,8 @@ if __name__ == "__main__":
     # 例如：如果已经处理了100条，这里填100，就会从第101条开始处理
     RESUME_FROM_LINE = 23  # ⬅️ 在这里手动填入起始行号
     
-    # API调用间隔（秒），避免限流
-    delay = 0.1
+    # API调用间隔（秒），避免限流（配置SENTIMENT_REQUEST_DELAY，config.ini的[sentiment]节或同名环境变量）
+    delay = get_config().SENTIMENT_REQUEST_DELAY
     # ================================================
     
     print("=" * 50)
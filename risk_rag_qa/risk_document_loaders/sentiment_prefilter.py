@@ -0,0 +1,328 @@
+# ai code begin && nums:326
+"""
+评论情感本地预分类器
+词典 + 哈希n-gram线性模型（多分类逻辑回归），用已有的'情感分析'结果训练，纯CPU、进程内判定。
+置信度达到阈值的评论直接给出 1-促进销售，2-阻碍销售，3-无影响，其余交给Coze工作流。
+
+用法：
+    python sentiment_prefilter.py 已标注.csv            # 留出20%评估，输出各阈值下的准确率/覆盖率
+    python sentiment_prefilter.py 已标注.csv --save     # 评估后用全部数据重新训练并保存模型
+"""
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from base.config import PROJECT_ROOT, get_config
+
+# 结果编号与'情感分析'列中文标签的对应
+LABEL_NAMES = {1: "促进销售", 2: "阻碍销售", 3: "无影响"}
+LABEL_IDS = {name: label for label, name in LABEL_NAMES.items()}
+# 报告中列出的置信度阈值
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98)
+
+# 情感词典：命中时额外产生LEX+/LEX-特征，否定词之后的情感词翻转极性
+POSITIVE_WORDS = {
+    "love", "loved", "loves", "great", "excellent", "perfect", "amazing", "awesome", "good", "nice",
+    "recommend", "recommended", "happy", "best", "favorite", "works", "comfortable", "easy", "sturdy", "worth",
+    "喜欢", "好用", "满意", "推荐", "不错", "很好", "完美", "值得", "好评", "舒服", "方便", "结实", "划算", "超赞",
+}
+NEGATIVE_WORDS = {
+    "broke", "broken", "break", "bad", "terrible", "awful", "worst", "poor", "waste", "return", "returned",
+    "refund", "defective", "disappointed", "disappointing", "cheap", "useless", "stopped", "leak", "leaks", "junk",
+    "坏了", "退货", "失望", "差评", "垃圾", "质量差", "不好", "退款", "破损", "漏", "后悔", "难用", "不值", "故障",
+}
+NEGATIONS = {"not", "no", "never", "don't", "doesn't", "didn't", "isn't", "wasn't", "won't", "can't", "不", "没", "没有", "别"}
+
+_WORD_RE = re.compile(r"[a-z0-9']+|[一-鿿]+")
+
+
+def resolve_model_file(path: Optional[str] = None) -> str:
+    """模型文件的绝对路径（默认取配置SENTIMENT_PREFILTER_MODEL，相对路径按项目根目录解析）"""
+    path = path or get_config().SENTIMENT_PREFILTER_MODEL
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(PROJECT_ROOT, path))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    提取特征词：英文词的1-2元组、中文连续字的1-3元组、词典命中标记
+
+    Args:
+        text: 评论内容
+
+    Returns:
+        List[str]: 特征词（含固定的偏置特征）
+    """
+    tokens = ["__bias__"]
+    words = []
+    for run in _WORD_RE.findall(str(text).lower()):
+        if run[0] < "一":
+            words.append(run)
+            continue
+        # 中文没有分词，用字的n-gram；词典按子串匹配
+        for n in (1, 2, 3):
+            tokens.extend(f"c{n}:{run[i:i + n]}" for i in range(len(run) - n + 1))
+        for word in POSITIVE_WORDS | NEGATIVE_WORDS:
+            if not word.isascii() and word in run:
+                negated = any(neg in run[:run.find(word)][-2:] for neg in NEGATIONS if not neg.isascii())
+                tokens.append("LEX-" if (word in NEGATIVE_WORDS) != negated else "LEX+")
+    tokens.extend(f"w:{w}" for w in words)
+    tokens.extend(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    for i, word in enumerate(words):
+        if word in POSITIVE_WORDS or word in NEGATIVE_WORDS:
+            negated = any(w in NEGATIONS for w in words[max(i - 2, 0):i])
+            tokens.append("LEX-" if (word in NEGATIVE_WORDS) != negated else "LEX+")
+    return tokens
+
+
+class SentimentPrefilter:
+    """
+    本地情感预分类器
+
+    特征词用crc32哈希到固定的n_features个桶（不需要保存词表），每条评论的特征按L2归一化；
+    模型是 n_features x 3 的权重矩阵，用小批量梯度下降训练多分类逻辑回归，
+    判定的置信度是softmax最大概率。只对置信度不低于阈值的评论给出结果。
+    """
+
+    def __init__(self, n_features: int = 1 << 18, weights: Optional[np.ndarray] = None):
+        """
+        初始化分类器
+
+        Args:
+            n_features: 哈希桶数
+            weights: 已训练的权重（n_features x 3），为None时未训练
+        """
+        self.n_features = n_features
+        self.weights = weights
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None
+
+    def _encode(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        哈希编码为稀疏行格式
+
+        Returns:
+            Tuple: (特征桶下标, 特征值, 每行起始位置)，每行至少包含偏置特征
+        """
+        indices, values, starts = [], [], []
+        for text in texts:
+            buckets, counts = np.unique(
+                [zlib.crc32(token.encode("utf-8")) % self.n_features for token in tokenize(text)],
+                return_counts=True
+            )
+            starts.append(len(indices))
+            indices.extend(buckets.tolist())
+            values.extend((counts / np.sqrt(np.sum(counts ** 2))).tolist())
+        return (
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(values, dtype=np.float32),
+            np.asarray(starts, dtype=np.int64)
+        )
+
+    def _probabilities(self, indices: np.ndarray, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """每行三个类别的softmax概率"""
+        logits = np.add.reduceat(self.weights[indices] * values[:, None], starts, axis=0)
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        epochs: int = 8,
+        batch_size: int = 64,
+        learning_rate: float = 1.0,
+        l2: float = 1e-6,
+        seed: int = 0
+    ) -> "SentimentPrefilter":
+        """
+        训练
+
+        Args:
+            texts: 评论内容
+            labels: 结果编号 1/2/3
+            epochs: 遍历数据的轮数
+            batch_size: 小批量大小
+            learning_rate: 初始学习率（每轮按1/sqrt(轮数)衰减）
+            l2: L2正则系数（每轮结束时整体衰减一次权重）
+            seed: 打乱顺序的随机种子
+
+        Returns:
+            SentimentPrefilter: self
+        """
+        indices, values, starts = self._encode(texts)
+        targets = np.asarray(labels, dtype=np.int64) - 1
+        ends = np.append(starts[1:], len(indices))
+        rng = np.random.default_rng(seed)
+        self.weights = np.zeros((self.n_features, len(LABEL_NAMES)), dtype=np.float32)
+        for epoch in range(epochs):
+            rate = learning_rate / np.sqrt(epoch + 1)
+            order = rng.permutation(len(targets))
+            for i in range(0, len(order), batch_size):
+                rows = order[i:i + batch_size]
+                # 取出这一批的稀疏行
+                lengths = ends[rows] - starts[rows]
+                batch_starts = np.cumsum(lengths) - lengths
+                positions = np.repeat(starts[rows] - batch_starts, lengths) + np.arange(lengths.sum())
+                batch_indices = indices[positions]
+                batch_values = values[positions]
+                probs = self._probabilities(batch_indices, batch_values, batch_starts)
+                probs[np.arange(len(rows)), targets[rows]] -= 1.0
+                gradient = np.repeat(probs, lengths, axis=0) * batch_values[:, None]
+                np.add.at(self.weights, batch_indices, (-rate / len(rows)) * gradient.astype(np.float32))
+            if l2 > 0:
+                self.weights *= np.float32(1.0 - rate * l2)
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """每条评论三个类别（1/2/3）的概率"""
+        if not self.trained:
+            raise ValueError("分类器尚未训练")
+        if not len(texts):
+            return np.zeros((0, len(LABEL_NAMES)), dtype=np.float32)
+        return self._probabilities(*self._encode(texts))
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[int, float]]:
+        """
+        批量判定
+
+        Returns:
+            List[Tuple[int, float]]: 每条评论的 (结果编号1/2/3, 置信度)
+        """
+        probs = self.predict_proba(texts)
+        return [(int(p.argmax()) + 1, float(p.max())) for p in probs]
+
+    def classify(self, comment: str, threshold: Optional[float] = None) -> Optional[int]:
+        """
+        判定一条评论，置信度低于阈值时返回None（交给Coze）
+
+        Args:
+            comment: 评论内容
+            threshold: 置信度阈值，默认取配置SENTIMENT_PREFILTER_THRESHOLD
+
+        Returns:
+            Optional[int]: 1/2/3 或 None
+        """
+        threshold = get_config().SENTIMENT_PREFILTER_THRESHOLD if threshold is None else threshold
+        label, confidence = self.predict([comment])[0]
+        return label if confidence >= threshold else None
+
+    def report(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        thresholds: Sequence[float] = REPORT_THRESHOLDS
+    ) -> List[Dict[str, float]]:
+        """
+        按已有标注评估各阈值下的覆盖率（本地判定的比例）和本地判定部分的准确率
+
+        Returns:
+            List[Dict]: 每个阈值的 threshold / coverage / accuracy / local（本地判定条数）
+        """
+        probs = self.predict_proba(texts)
+        predicted = probs.argmax(axis=1) + 1
+        confidence = probs.max(axis=1)
+        correct = predicted == np.asarray(labels)
+        rows = []
+        for threshold in thresholds:
+            local = confidence >= threshold
+            rows.append({
+                "threshold": float(threshold),
+                "coverage": float(local.mean()) if len(local) else 0.0,
+                "accuracy": float(correct[local].mean()) if local.any() else float("nan"),
+                "local": int(local.sum())
+            })
+        return rows
+
+    def save(self, path: Optional[str] = None) -> str:
+        """保存模型（原子替换），返回文件路径"""
+        path = resolve_model_file(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights, n_features=self.n_features)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional["SentimentPrefilter"]:
+        """
+        加载模型
+
+        Returns:
+            Optional[SentimentPrefilter]: 模型文件不存在或无法读取时返回None
+        """
+        path = resolve_model_file(path)
+        try:
+            with np.load(path) as data:
+                return cls(n_features=int(data["n_features"]), weights=data["weights"].astype(np.float32))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def load_labelled(csv_path: str) -> Tuple[List[str], List[int]]:
+    """
+    读取已完成情感分析的CSV（analyze_batch的输出），取Coze给出结果的评论作为训练数据
+
+    本地分类器判定的行（'情感分析来源'为'本地'）不参与训练，避免模型学习自己的输出。
+
+    Returns:
+        Tuple[List[str], List[int]]: (评论内容, 结果编号)
+    """
+    try:
+        df = pd.read_csv(csv_path, encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        df = pd.read_csv(csv_path, encoding="gbk")
+    texts, labels = [], []
+    for _, row in df.iterrows():
+        label = LABEL_IDS.get(str(row.get("情感分析", "")).strip())
+        if label is None or str(row.get("情感分析来源", "")).strip() == "本地":
+            continue
+        comment = str(row.get("评论内容", ""))
+        if not comment or comment == "nan" or comment.strip() == "":
+            comment = str(row.get("评论内容(中文)", ""))
+        if not comment or comment == "nan" or comment.strip() == "":
+            continue
+        texts.append(comment)
+        labels.append(label)
+    return texts, labels
+
+
+def print_report(rows: List[Dict[str, float]]):
+    """打印准确率/覆盖率报告"""
+    threshold = get_config().SENTIMENT_PREFILTER_THRESHOLD
+    print(f"{'阈值':>6} {'覆盖率':>8} {'准确率':>8} {'本地判定':>8}")
+    for row in rows:
+        mark = "  ⬅️ 当前配置" if abs(row["threshold"] - threshold) < 1e-9 else ""
+        print(f"{row['threshold']:>8.2f} {row['coverage']:>10.1%} {row['accuracy']:>10.1%} {row['local']:>10d}{mark}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print("用法：python sentiment_prefilter.py 已标注.csv [--save]")
+        sys.exit(1)
+    texts, labels = load_labelled(args[0])
+    print(f"📊 已标注评论: {len(texts)} 条，分布: "
+          + "，".join(f"{LABEL_NAMES[label]} {labels.count(label)}" for label in LABEL_NAMES))
+    if len(texts) < 50:
+        print("✗ 标注数据太少，无法训练")
+        sys.exit(1)
+
+    # 打乱后留出20%评估
+    order = np.random.default_rng(42).permutation(len(texts))
+    split = int(len(order) * 0.8)
+    train, test = order[:split], order[split:]
+    prefilter = SentimentPrefilter().fit([texts[i] for i in train], [labels[i] for i in train])
+    print(f"\n📈 留出集评估（{len(test)} 条）:")
+    print_report(prefilter.report([texts[i] for i in test], [labels[i] for i in test]))
+
+    if "--save" in sys.argv:
+        path = SentimentPrefilter().fit(texts, labels).save()
+        print(f"\n✅ 已用全部 {len(texts)} 条数据训练并保存模型: {path}")
+# ai code end